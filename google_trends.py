@@ -5,7 +5,7 @@ import plotly.express as px
 from datetime import datetime
 import time
 
-def analyze_government_project_trends(project_name, timeframe='today 12-m', geo='GB'):
+def analyze_government_project_trends(project_name, timeframe='today 12-m', geo='GB', show=True):
     """
     Analyze Google Trends data for a UK government project with Plotly visualizations.
     
@@ -13,6 +13,7 @@ def analyze_government_project_trends(project_name, timeframe='today 12-m', geo=
     - project_name: str, the name of the government project to analyze
     - timeframe: str, time period (e.g., 'today 12-m' for last 12 months, 'today 5-y' for 5 years)
     - geo: str, country code (default 'GB' for United Kingdom)
+    - show: bool, open the figures as well as writing the HTML files
     
     Returns:
     - Dictionary with trends data and insights
@@ -301,30 +302,36 @@ def analyze_government_project_trends(project_name, timeframe='today 12-m', geo=
     print(f"{'='*70}\n")
     
     # Display plots (will open in browser or show in notebook)
-    fig_timeline.show()
-    if fig_regions:
-        fig_regions.show()
-    if fig_queries:
-        fig_queries.show()
+    if show:
+        fig_timeline.show()
+        if fig_regions:
+            fig_regions.show()
+        if fig_queries:
+            fig_queries.show()
     
     return results
 
 
 # Example usage for UK government projects:
+#     python google_trends.py                                # HS2, last 5 years
+#     python google_trends.py HS2 "Sizewell C" --no-show     # several, files only
 if __name__ == "__main__":
-    # Example 1: HS2 Railway Project
-    results = analyze_government_project_trends(
-        project_name="HS2",
-        timeframe="today 5-y",
-        geo="GB"
-    )
-    
-    # Wait before running another query to avoid rate limits
-    # time.sleep(30)
-    
-    # Example 2: Universal Credit
-    # results = analyze_government_project_trends(
-    #     project_name="Universal Credit",
-    #     timeframe="today 12-m",
-    #     geo="GB"
-    # )
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Google Trends report for UK government projects")
+    parser.add_argument("projects", nargs="*", default=["HS2"])
+    parser.add_argument("--timeframe", default="today 5-y")
+    parser.add_argument("--geo", default="GB")
+    parser.add_argument("--no-show", action="store_true", help="write the HTML files without opening them")
+    args = parser.parse_args()
+
+    for i, project in enumerate(args.projects):
+        if i:
+            # Wait before running another query to avoid rate limits
+            time.sleep(30)
+        results = analyze_government_project_trends(
+            project_name=project,
+            timeframe=args.timeframe,
+            geo=args.geo,
+            show=not args.no_show,
+        )
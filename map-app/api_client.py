@@ -0,0 +1,110 @@
+"""
+Client for api_server.py with the same read methods as backend.DashboardData,
+so app.py can use either. Responses are kept with their ETag and revalidated
+with If-None-Match, so unchanged data costs a 304 and no JSON decoding.
+"""
+import json
+import threading
+from collections import OrderedDict
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import pandas as pd
+
+# Revalidated responses kept; least recently used go first
+CACHE_ENTRIES = 256
+
+
+class ApiClient:
+    def __init__(self, base_url: str, timeout: float = 30.0, max_entries: int = CACHE_ENTRIES):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, path: str, **params):
+        url = f"{self.base_url}{path}"
+        if params:
+            url += "?" + urlencode({k: str(v) for k, v in params.items()})
+        with self._lock:
+            cached = self._cache.get(url)
+            if cached:
+                self._cache.move_to_end(url)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        try:
+            with urlopen(Request(url, headers=headers), timeout=self.timeout) as resp:
+                payload = json.loads(resp.read())
+                etag = resp.headers.get("ETag")
+        except HTTPError as e:
+            if e.code == 304 and cached:
+                return cached[1]
+            raise
+        if etag:
+            with self._lock:
+                self._cache[url] = (etag, payload)
+                self._cache.move_to_end(url)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return payload
+
+    @staticmethod
+    def _frame(records: list, columns: list) -> pd.DataFrame:
+        df = pd.DataFrame(records, columns=columns if not records else None)
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"])
+        return df
+
+    @property
+    def version(self) -> str:
+        return self._get("/health")["version"]
+
+    def meta(self) -> dict:
+        return self._get("/meta")
+
+    def memory(self) -> list:
+        return self._get("/memory")
+
+    def hierarchy_nodes(self) -> list:
+        return self._get("/hierarchy")
+
+    def region_values(
+        self, topic: str, day, agg: str = "mean", level: str = "country", within: str | None = None
+    ) -> pd.DataFrame:
+        params = dict(topic=topic, date=day, agg=agg, level=level, **({"within": within} if within else {}))
+        return self._frame(self._get("/region_values", **params), ["region", "interest_value"])
+
+    def mention_values(self, topic: str, day, level: str = "country", within: str | None = None) -> pd.DataFrame:
+        params = dict(topic=topic, date=day, level=level, **({"within": within} if within else {}))
+        return self._frame(self._get("/mentions", **params), ["region", "interest_value"])
+
+    def filtered_rows(self, topic: str, day, limit: int = 50) -> pd.DataFrame:
+        return self._frame(self._get("/rows", topic=topic, date=day, limit=limit), [])
+
+    def level_series(self, topic: str, level: str = "country") -> pd.DataFrame:
+        df = self._frame(self._get("/series", topic=topic, level=level), ["date", "region", "interest_value"])
+        df["topic_name"] = topic
+        return df
+
+    def trends_cube(self, topic: str) -> dict:
+        return self._get("/cube", topic=topic)
+
+    def heatmap(self, topic: str, level: str = "country") -> dict:
+        return self._get("/heatmap", topic=topic, level=level)
+
+    def centroids(self) -> dict:
+        return self._get("/centroids")
+
+    def geometry(self, tolerance: float = 0.0, level: str = "country", within: str | None = None) -> dict:
+        params = dict(tolerance=tolerance, level=level, **({"within": within} if within else {}))
+        return self._get("/geometry", **params)
+
+    def posts(self, topic: str, day) -> dict:
+        out = dict(self._get("/posts", topic=topic, date=day))
+        out["posts"] = [{**p, "created_at": pd.Timestamp(p["created_at"])} for p in out["posts"]]
+        return out
+
+    def sentiment_series(self, topic: str, freq: str = "W-SAT") -> pd.DataFrame:
+        columns = ["date", "posts", "sentiment", "weighted_sentiment", "positive_share", "negative_share"]
+        return self._frame(self._get("/sentiment", topic=topic, freq=freq), columns)
@@ -0,0 +1,202 @@
+"""
+Local HTTP/JSON API over one shared DashboardData.
+
+    python api_server.py --port 8502
+    MAP_API_URL=http://127.0.0.1:8502 streamlit run app.py
+
+Endpoints (all GET, JSON):
+    /health
+    /meta                                   topics, dates, levels, data version
+    /hierarchy                              every region with its level and parent
+    /memory                                 rows and MB held per loaded frame
+    /region_values?topic=&date=&agg=&level=&within=
+                                            one value per region in a level view
+    /mentions?topic=&date=&level=&within=   Hansard speeches in the week, per region
+    /rows?topic=&date=&limit=               filtered raw rows preview
+    /series?topic=&level=                   the topic's full series (long)
+    /cube?topic=                            the topic's full series as a dates x regions matrix
+    /heatmap?topic=&level=                  weekly heatmap frames
+    /centroids                              centroid + label point per region
+    /geometry?tolerance=&level=&within=     (simplified) boundary GeoJSON
+    /posts?topic=&date=                     top BlueSky posts
+    /sentiment?topic=&freq=                 BlueSky post sentiment per week (freq=D: per day)
+
+level is one of lad/region/country (default country); within restricts a
+view to the descendants of one code, for drilling down.
+
+Response bodies are cached per (data version, path, query) and carry an
+ETag, so a client that sends If-None-Match gets a 304 with no body. A
+missing required parameter is a 400, an unknown path a 404, and any other
+error a 500.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import traceback
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import pandas as pd
+
+from backend import DEFAULT_LEVEL, DashboardData
+
+CACHE_ENTRIES = 512
+
+
+def frame_records(df: pd.DataFrame) -> list:
+    out = df.copy()
+    for col in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[col]):
+            out[col] = out[col].dt.strftime("%Y-%m-%d")
+    return json.loads(out.to_json(orient="records"))
+
+
+class Query(dict):
+    """Query parameters; a missing required one is a client error, not a lookup miss."""
+
+    def __missing__(self, key):
+        raise ValueError(f"Missing query parameter: {key}")
+
+
+class NotFound(Exception):
+    """An unknown path. Lookup errors raised by the backend are bugs (500), not 404s."""
+
+
+def route(data: DashboardData, path: str, q: Query):
+    if path == "/health":
+        return {"status": "ok", "version": data.version}
+    level = q.get("level", DEFAULT_LEVEL)
+    within = q.get("within") or None
+    if path == "/meta":
+        return data.meta()
+    if path == "/memory":
+        return data.memory()
+    if path == "/hierarchy":
+        return data.hierarchy_nodes()
+    if path == "/region_values":
+        return frame_records(data.region_values(q["topic"], q["date"], q.get("agg", "mean"), level, within))
+    if path == "/mentions":
+        return frame_records(data.mention_values(q["topic"], q["date"], level, within))
+    if path == "/rows":
+        return frame_records(data.filtered_rows(q["topic"], q["date"], int(q.get("limit", 50))))
+    if path == "/series":
+        return frame_records(data.level_series(q["topic"], level)[["date", "region", "interest_value"]])
+    if path == "/cube":
+        return data.trends_cube(q["topic"])
+    if path == "/heatmap":
+        return data.heatmap(q["topic"], level)
+    if path == "/centroids":
+        return data.centroids()
+    if path == "/geometry":
+        return data.geometry(float(q.get("tolerance", 0)), level, within)
+    if path == "/posts":
+        return data.posts(q["topic"], q["date"])
+    if path == "/sentiment":
+        return frame_records(data.sentiment_series(q["topic"], q.get("freq", "W-SAT")))
+    raise NotFound(path)
+
+
+class ResponseCache:
+    """Small thread-safe LRU of encoded bodies and their ETags."""
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key, body: bytes) -> tuple[bytes, str]:
+        item = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return item
+
+
+def make_handler(data: DashboardData, cache: ResponseCache):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = Query(parse_qsl(url.query))
+            key = (data.version, url.path, tuple(sorted(query.items())))
+
+            item = cache.get(key)
+            if item is None:
+                try:
+                    payload = route(data, url.path, query)
+                except NotFound as e:
+                    return self._send_error(404, f"Not found: {e}")
+                except (ValueError, TypeError) as e:
+                    return self._send_error(400, str(e))
+                except Exception as e:
+                    traceback.print_exc()
+                    return self._send_error(500, f"{type(e).__name__}: {e}")
+                body = json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8")
+                item = cache.put(key, body)
+
+            body, etag = item
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_error(self, status: int, message: str):
+            body = json.dumps({"error": message}).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8502, data: DashboardData | None = None) -> ThreadingHTTPServer:
+    data = data or DashboardData()
+    server = ThreadingHTTPServer((host, port), make_handler(data, ResponseCache()))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the map dashboard's data over HTTP/JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port)
+    print(f"Serving dashboard data on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,19 @@
-import io
+import copy
 import json
+import os
 from datetime import datetime
 
-import numpy as np
 import pandas as pd
 import streamlit as st
 import folium
-from folium import plugins
 from streamlit_folium import st_folium
 
-import matplotlib.pyplot as plt
-import base64
 from calendar import month_name
 
+import backend
+import map_core
+from profiling import RerunProfiler
+
 
 # -----------------------------
 # Dark Mode Styling
@@ -131,126 +132,204 @@ def read_geojson(uploaded_file) -> dict:
     return json.loads(uploaded_file.getvalue().decode("utf-8"))
 
 
-def read_csv(file_path) -> pd.DataFrame:
-    df = pd.read_csv(file_path)
-    # Normalize expected columns
-    # combined_google_trends_data.csv has: date, Program, region, value
-    if "Program" in df.columns:
-        df = df.rename(columns={"Program": "topic_name"})
-    if "value" in df.columns:
-        df = df.rename(columns={"value": "interest_value"})
-    
-    if "region_name" not in df.columns:
-        df["region_name"] = df["region"]
-
-    expected = {"date", "topic_name", "region", "region_name", "interest_value"}
-    missing = expected - set(df.columns)
-    if missing:
-        raise ValueError(f"CSV missing columns: {sorted(missing)}")
-
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df["interest_value"] = pd.to_numeric(df["interest_value"], errors="coerce")
-    df["region"] = df["region"].astype(str)
-    df["topic_name"] = df["topic_name"].astype(str)
-    df["region_name"] = df["region_name"].astype(str)
-
-    df = df.dropna(subset=["date", "interest_value", "region", "topic_name"])
-    return df
-
-
-def sparkline_png_base64(series: pd.Series, title: str = "") -> str:
-    # Dark theme for sparklines
-    plt.style.use('dark_background')
-    fig = plt.figure(figsize=(3.2, 0.9), dpi=150)
-    fig.patch.set_facecolor('#1a1f3a')
-    ax = fig.add_subplot(111)
-    ax.set_facecolor('#1a1f3a')
-    ax.plot(series.index, series.values, color='#4da6ff', linewidth=2)
-    ax.set_xticks([])
-    ax.set_yticks([])
-    ax.set_title(title, fontsize=8, color='#e8eaed')
-    for spine in ax.spines.values():
-        spine.set_visible(False)
-    fig.tight_layout(pad=0.2)
-
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", bbox_inches="tight", pad_inches=0.05, facecolor='#1a1f3a')
-    plt.close(fig)
-
-    b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
-    return f"data:image/png;base64,{b64}"
-
-def polygon_centroid(coords):
+# Only the current version: an older dataset would otherwise stay in memory
+@st.cache_resource(show_spinner=False, max_entries=1)
+def get_data_source(api_url: str | None, data_version: str):
     """
-    coords: list of points, usually [ [lon, lat], ... ]
-    Returns (lat, lon) or None
+    One dataset shared by every session: the HTTP API when MAP_API_URL is
+    set, otherwise an in-process DashboardData (rebuilt when inputs change).
     """
-    xs, ys = [], []
-    for p in coords or []:
-        if not isinstance(p, (list, tuple)) or len(p) < 2:
-            continue
-        x, y = p[0], p[1]
-        if x is None or y is None:
-            continue
-        try:
-            x = float(x)
-            y = float(y)
-        except Exception:
-            continue
-        if not (np.isfinite(x) and np.isfinite(y)):
-            continue
-        xs.append(x)
-        ys.append(y)
-
-    if not xs:
+    if api_url:
+        from api_client import ApiClient
+        return ApiClient(api_url)
+    return backend.DashboardData()
+
+
+def local_data_version() -> str:
+    paths = (*backend.BOUNDARY_FILES.values(), backend.TRENDS_PATH, backend.BLUESKY_PATH, backend.MENTIONS_PATH,
+             backend.SENTIMENT_PATH)
+    return "-".join(str(int(os.path.getmtime(p))) for p in paths if os.path.exists(p))
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def geojson_bytes(_data, data_version: str, level: str, within: str | None) -> int:
+    """Size of a level view's GeoJSON as folium writes it into the page (one dump per view and version)."""
+    return len(json.dumps(_data.geometry(GEOMETRY_TOLERANCE, level, within)).encode("utf-8"))
+
+
+def current_session_id() -> str | None:
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else None
+    except Exception:
         return None
 
-    # return (lat, lon)
-    return (float(np.mean(ys)), float(np.mean(xs)))
-
-
-def feature_centroid(feature):
-    geom = feature.get("geometry") or {}
-    gtype = geom.get("type")
-    coords = geom.get("coordinates") or []
-
-    if gtype == "Polygon":
-        ring = coords[0] if coords else []
-        return polygon_centroid(ring)
-
-    if gtype == "MultiPolygon":
-        best = None
-        best_len = -1
-        for poly in coords:
-            ring = poly[0] if poly else []
-            c = polygon_centroid(ring)
-            if c is not None and len(ring) > best_len:
-                best_len = len(ring)
-                best = c
-        return best
-
-    # Unknown/unsupported geometry type
-    return None
-
-
-def build_region_centroids(geojson: dict) -> dict:
-    centroids = {}
-    for feat in geojson.get("features", []):
-        props = feat.get("properties") or {}
-        # Try country code first, then region code
-        code = props.get("CTRY24CD") or props.get("RGN24CD")
-        if not code:
-            continue
-        c = feature_centroid(feat)
-        if c is None:
-            continue
-        lat, lon = c
-        if lat is None or lon is None:
-            continue
-        if not (np.isfinite(lat) and np.isfinite(lon)):
-            continue
-        centroids[str(code)] = (float(lat), float(lon))
-    return centroids
+
+def render_debug_panel(prof: RerunProfiler, show_cprofile: bool, memory: list | None = None):
+    with st.sidebar:
+        st.subheader("Rerun timings")
+        st.caption(f"Total {prof.total_seconds * 1000:.0f} ms · rerun {prof.rerun_id}")
+        timings = prof.stage_frame()
+        timings["ms"] = (timings["seconds"] * 1000).round(1)
+        timings["share"] = (timings["share"] * 100).round(1)
+        st.dataframe(timings[["stage", "ms", "share"]], hide_index=True, use_container_width=True)
+        st.json(prof.sizes, expanded=False)
+        if memory:
+            st.subheader("Loaded frames")
+            st.dataframe(pd.DataFrame(memory), hide_index=True, use_container_width=True)
+        if show_cprofile:
+            st.code(prof.cprofile_text(), language="text")
+
+
+def render_page(prof: RerunProfiler, mode: str, show_timings: bool):
+    """Everything below the sidebar settings. Returns the data source."""
+    try:
+        with prof.stage("load_data_source"):
+            data_version = "" if API_URL else local_data_version()
+            data = get_data_source(API_URL, data_version)
+            meta = data.meta()
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        st.stop()
+
+    # Resolution: any level view, optionally drilled into one parent region
+    with st.sidebar:
+        # Coarse to fine, so the page opens on countries like the trends data
+        levels = sorted(meta["levels"], key=list(LEVEL_LABELS).index)
+        level = st.radio("Resolution", levels, format_func=LEVEL_LABELS.get, horizontal=True,
+                         index=levels.index("country") if "country" in levels else 0)
+        within = None
+        if level != "country":
+            parent_levels = {"country"} if level == "region" else {"country", "region"}
+            parents = [n for n in data.hierarchy_nodes() if n["level"] in parent_levels]
+            options = [None] + [n["code"] for n in parents]
+            names = {n["code"]: n["name"] for n in parents}
+            within = st.selectbox("Drill into", options, format_func=lambda c: "All" if c is None else names[c])
+
+    try:
+        with prof.stage("load_geojson"):
+            # build_base_map writes tooltip properties, so work on a private copy
+            geojson = copy.deepcopy(data.geometry(GEOMETRY_TOLERANCE, level, within))
+        prof.record(geojson_bytes=geojson_bytes(data, data_version, level, within), api=bool(API_URL))
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        st.stop()
+
+    # Filters
+    topics = meta["topics"]
+
+    c1, c2 = st.columns([2, 2])
+    with c1:
+        topic_sel = st.selectbox("Topic", topics, index=0)
+    with c2:
+        agg = st.selectbox("Aggregation", meta["aggregations"], index=0)
+
+    # Time Slider at the bottom
+    unique_dates = [datetime.fromisoformat(d).date() for d in meta["dates"]]
+    selected_date = st.select_slider(
+        "Select Date",
+        options=unique_dates,
+        value=unique_dates[-1],
+        key="time_slider"
+    )
+
+    prof.set_context(topic=topic_sel, agg=agg, date=str(selected_date), level=level, within=within)
+
+    # One value per region for the choropleth, aggregated by the data source
+    with prof.stage("filter_aggregate"):
+        region_vals = data.region_values(topic_sel, selected_date, agg, level, within)
+
+    if region_vals.empty:
+        st.warning("No rows match your filters.")
+        st.stop()
+
+    # Choropleth + tooltip layers on dark tiles
+    with prof.stage("build_map"):
+        m = map_core.build_base_map(geojson, region_vals, topic_sel, agg, key_prop="code")
+
+    # Parliamentary attention: MPs' speeches on the topic that week, by constituency
+    if "hansard" in meta.get("layers", []):
+        with prof.stage("hansard_layer"):
+            mention_vals = data.mention_values(topic_sel, selected_date, level, within)
+            if not mention_vals.empty:
+                map_core.add_value_layer(m, geojson, mention_vals, f"Hansard mentions: {topic_sel}", show=False)
+        prof.record(hansard_regions=len(mention_vals))
+
+    # Modes that use centroids
+    with prof.stage("centroids"):
+        region_points = data.centroids()
+        label_points = {code: p["label"] for code, p in region_points.items()}
+
+    if mode == "Markers + Sparklines":
+        # One marker per region with a popup sparkline for that region and topic
+        # Label points always fall inside the region, unlike raw centroids
+        with prof.stage("sparkline_markers"):
+            shown = {f["properties"]["code"] for f in geojson["features"]}
+            points = {code: p for code, p in label_points.items() if code in shown}
+            n_markers = map_core.add_sparkline_markers(m, data.level_series(topic_sel, level), topic_sel, points)
+        prof.record(markers=n_markers)
+
+    elif mode == "Animated HeatMap (centroids)":
+        # Weekly frames for the whole topic series, cached per topic
+        with prof.stage("heatmap_frames"):
+            hm = data.heatmap(topic_sel, level)
+            frames, labels = hm["frames"], hm["labels"]
+            map_core.add_heatmap(m, frames, labels)
+        prof.record(heatmap_frames=len(frames), heatmap_points=sum(len(f) for f in frames))
+
+    folium.LayerControl(collapsed=False).add_to(m)
+
+    # Layout: Map on left, BlueSky on right
+    col_map, col_bs = st.columns([3, 1])
+
+    with col_map:
+        st.subheader("Map")
+        with prof.stage("st_folium"):
+            st_folium(m, width=None, height=650)
+        if show_timings:
+            # Rendering the HTML again costs time, so only measure it on request
+            prof.record(map_html_bytes=len(m.get_root().render().encode("utf-8")))
+
+    with col_bs:
+        st.subheader("Top BlueSky Posts")
+    
+        # The BlueSky data might be sparse, so we show posts for the selected month if no exact date match
+        with prof.stage("bluesky_panel"):
+            bs = data.posts(topic_sel, selected_date)
+            posts, fallback_month = bs["posts"], bs["fallback_month"]
+        if fallback_month:
+            st.info(f"Showing posts for {fallback_month}")
+
+        if not posts:
+            st.write("No BlueSky posts found for this period/topic.")
+        else:
+            for post in posts:
+                with st.container(border=True):
+                    st.markdown(f"**@{post['author']}**")
+                    st.write(post['text'])
+                    st.caption(f"❤️ {post['likes']} | 🔁 {post['reposts']} | 💬 {post['replies']}")
+                    st.caption(f"📅 {post['created_at'].strftime('%Y-%m-%d %H:%M')}")
+
+        # Scored offline (bluesky_sentiment.py); only read here
+        with prof.stage("sentiment_panel"):
+            sentiment = data.sentiment_series(topic_sel)
+        if not sentiment.empty:
+            st.subheader("BlueSky sentiment")
+            st.line_chart(sentiment.set_index("date")[["sentiment", "weighted_sentiment"]], height=200)
+            week = sentiment[sentiment["date"] == pd.Timestamp(selected_date)]
+            if not week.empty:
+                row = week.iloc[0]
+                st.caption(
+                    f"Week of {selected_date}: {row['weighted_sentiment']:+.2f} engagement-weighted over "
+                    f"{int(row['posts'])} posts ({row['positive_share']:.0%} positive, "
+                    f"{row['negative_share']:.0%} negative)"
+                )
+
+    st.subheader("Filtered rows preview")
+    st.dataframe(data.filtered_rows(topic_sel, selected_date, limit=50), use_container_width=True)
+
+    return data
 
 
 # -----------------------------
@@ -263,9 +342,10 @@ apply_dark_mode()
 
 st.title("UK Regions Trends Mapper (CSV + GeoJSON)")
 
-GEOJSON_PATH = "data/Countries_December_2024_Boundaries_UK_BUC_7315501150803133753 (1).geojson"
-CSV_PATH = "data/combined_google_trends_data.csv"
-BLUESKY_PATH = "blue_sky_top_posts.csv"
+API_URL = os.environ.get("MAP_API_URL")
+# Degrees; boundaries are simplified once and shared, the map needs no more
+GEOMETRY_TOLERANCE = float(os.environ.get("MAP_GEOMETRY_TOLERANCE", "0.002"))
+LEVEL_LABELS = {"country": "Countries", "region": "Regions", "lad": "Local authorities"}
 
 with st.sidebar:
     st.header("Settings")
@@ -274,235 +354,16 @@ with st.sidebar:
         ["Choropleth", "Markers + Sparklines", "Animated HeatMap (centroids)"],
         index=0,
     )
+    show_timings = st.checkbox("Show rerun timings", value=False)
+    show_cprofile = show_timings and st.checkbox("Include cProfile", value=False)
 
+# Every rerun is timed and logged; the sidebar panel is optional
+prof = RerunProfiler(current_session_id(), enable_cprofile=show_cprofile)
+prof.set_context(mode=mode)
 try:
-    with open(GEOJSON_PATH, "r", encoding="utf-8") as f:
-        geojson = json.load(f)
-    df = read_csv(CSV_PATH)
-    
-    # Load BlueSky data
-    df_bs = pd.read_csv(BLUESKY_PATH)
-    # Specify utc=True to handle mixed timezones and silence the warning
-    df_bs["created_at"] = pd.to_datetime(df_bs["created_at"], errors="coerce", utc=True)
-    # Drop rows where created_at is NaT to avoid .dt accessor error
-    df_bs = df_bs.dropna(subset=["created_at"])
-    # Ensure it's treated as a datetime series
-    df_bs["date_only"] = df_bs["created_at"].dt.date
-except Exception as e:
-    st.error(f"Error loading data: {e}")
-    st.stop()
-
-# Filters
-topics = sorted(df["topic_name"].unique().tolist())
-min_d, max_d = df["date"].min().date(), df["date"].max().date()
-
-c1, c2 = st.columns([2, 2])
-with c1:
-    topic_sel = st.selectbox("Topic", topics, index=0)
-with c2:
-    agg = st.selectbox("Aggregation", ["mean", "sum", "latest"], index=0)
-
-# Time Slider at the bottom
-unique_dates = sorted(df["date"].dt.date.unique())
-selected_date = st.select_slider(
-    "Select Date",
-    options=unique_dates,
-    value=unique_dates[-1],
-    key="time_slider"
-)
-
-mask = (
-    (df["topic_name"] == topic_sel)
-    & (df["date"].dt.date == selected_date)
-)
-df_f = df.loc[mask].copy()
-
-if df_f.empty:
-    st.warning("No rows match your filters.")
-    st.stop()
-
-# Aggregate to one value per region for choropleth
-if agg == "mean":
-    region_vals = df_f.groupby("region", as_index=False)["interest_value"].mean()
-elif agg == "sum":
-    region_vals = df_f.groupby("region", as_index=False)["interest_value"].sum()
-else:  # latest
-    df_latest = df_f.sort_values("date").groupby("region", as_index=False).tail(1)
-    region_vals = df_latest[["region", "interest_value"]].copy()
-
-region_vals["region"] = region_vals["region"].astype(str)
-region_vals["interest_value"] = region_vals["interest_value"].astype(float)
-
-# Center the map (roughly UK) - using dark tiles
-m = folium.Map(location=(54.5, -3.0), zoom_start=5, tiles="CartoDB dark_matter")
-
-# Handle region mapping for Countries
-# The CSV has 'England', 'Wales', 'Scotland', 'Northern Ireland' in the 'region' column.
-# We need to map these to the CTRY24CD in the GeoJSON.
-country_map = {
-    "England": "E92000001",
-    "Northern Ireland": "N92000002",
-    "Scotland": "S92000003",
-    "Wales": "W92000004"
-}
-
-# Create a mapping from country name to code
-region_vals["region_code"] = region_vals["region"].map(country_map)
-
-# Choropleth layer
-folium.Choropleth(
-    geo_data=geojson,
-    data=region_vals.dropna(subset=["region_code"]),
-    columns=["region_code", "interest_value"],
-    key_on="feature.properties.CTRY24CD",
-    fill_opacity=0.75,
-    line_opacity=0.3,
-    nan_fill_opacity=0.1,
-    legend_name=f'{topic_sel} ({agg})',
-).add_to(m)
-
-# Add tooltips showing region name + value
-val_lookup = dict(zip(region_vals["region"], region_vals["interest_value"]))
-for feat in geojson.get("features", []):
-    props = feat.get("properties", {})
-    code = str(props.get("CTRY24CD") or props.get("RGN24CD") or "")
-    name = props.get("CTRY24NM") or props.get("RGN24NM") or ""
-    v = val_lookup.get(name, None)
-    props["_value"] = None if v is None else float(v)
-    props["_tooltip"] = f"{name} ({code}) — {'' if v is None else round(v, 1)}"
-
-folium.GeoJson(
-    geojson,
-    name="regions",
-    style_function=lambda x: {"fillOpacity": 0, "color": "transparent", "weight": 0},
-    tooltip=folium.GeoJsonTooltip(fields=["_tooltip"], aliases=[""], labels=False),
-).add_to(m)
-
-# Modes that use centroids
-centroids = build_region_centroids(geojson)
-
-if mode == "Markers + Sparklines":
-    # One marker per region with a popup sparkline for that region and topic
-    # Build region time series
-    ts = (
-        df.loc[df["topic_name"] == topic_sel]
-        .set_index("date")
-        .sort_index()
-        .groupby("region")["interest_value"]
-    )
-
-    for region_code, (lat, lon) in centroids.items():
-        if region_code not in ts.groups:
-            continue
-        s = ts.get_group(region_code).resample("W").mean()  # weekly mean for smoother sparkline
-        if s.empty:
-            continue
-
-        img = sparkline_png_base64(s, title=f"{topic_sel} — {region_code}")
-        latest = float(s.dropna().iloc[-1]) if s.dropna().shape[0] else None
-
-        popup_html = (
-            f'<div style="background-color: #1a1f3a; padding: 10px; border-radius: 5px;">'
-            f'<b style="color: #e8eaed;">{region_code}</b><br>'
-            f'<span style="color: #9aa0a6;">Latest (weekly): </span><b style="color: #4da6ff;">{" " if latest is None else round(latest, 1)}</b><br>'
-            f'<img src="{img}" style="width:280px; height:auto;" />'
-            f'</div>'
-        )
-
-        folium.Marker(
-            location=(lat, lon),
-            tooltip=region_code,
-            popup=folium.Popup(popup_html, max_width=320),
-        ).add_to(m)
-
-elif mode == "Animated HeatMap (centroids)":
-    # Build time frames from weekly buckets: each frame contains points [lat, lon, weight]
-    df_anim = df_f.copy()
-    df_anim["week"] = df_anim["date"].dt.to_period("W").dt.start_time
-
-    # Aggregate interest per region per week
-    w = df_anim.groupby(["week", "region"], as_index=False)["interest_value"].mean()
-    weeks = sorted(w["week"].unique().tolist())
-
-    frames = []
-    labels = []
-    for wk in weeks:
-        wwk = w[w["week"] == wk]
-        pts = []
-        vals = []
-        for _, row in wwk.iterrows():
-            code = str(row["region"])
-            if code not in centroids:
-                continue
-            lat, lon = centroids[code]
-            val = float(row["interest_value"])
-            pts.append([lat, lon, val])
-            vals.append(val)
-
-        latlon = centroids.get(code)
-        if not latlon:
-            continue
-
-        lat, lon = latlon
-        if lat is None or lon is None:
-            continue
-        if not (np.isfinite(lat) and np.isfinite(lon)):
-            continue
-
-        pts.append([lat, lon, val])
-
-        # Normalize per-frame to 0-100 so the animation contrast stays visible
-        if pts and (max(vals) > min(vals)):
-            vmin, vmax = min(vals), max(vals)
-            pts = [[p[0], p[1], (p[2] - vmin) / (vmax - vmin) * 100.0] for p in pts]
-        elif pts:
-            pts = [[p[0], p[1], 0.0] for p in pts]
-
-        frames.append(pts)
-        labels.append(pd.Timestamp(wk).strftime("%Y-%m-%d"))
-
-    plugins.HeatMapWithTime(
-        data=frames,
-        index=labels,
-        auto_play=True,
-        max_opacity=0.8,
-        radius=25,
-        use_local_extrema=False,
-    ).add_to(m)
-
-folium.LayerControl(collapsed=False).add_to(m)
-
-# Layout: Map on left, BlueSky on right
-col_map, col_bs = st.columns([3, 1])
-
-with col_map:
-    st.subheader("Map")
-    st_folium(m, width=None, height=650)
-
-with col_bs:
-    st.subheader("Top BlueSky Posts")
-    
-    # Filter BlueSky posts for the selected date and topic
-    # The BlueSky data might be sparse, so we show posts for the selected month if no exact date match
-    bs_mask = (df_bs["topic"] == topic_sel) & (df_bs["date_only"] == selected_date)
-    bs_f = df_bs.loc[bs_mask].sort_values("likes", ascending=False)
-    
-    if bs_f.empty:
-        # Fallback to month if no posts for specific day
-        sel_month = selected_date.strftime("%B %Y")
-        bs_mask_m = (df_bs["topic"] == topic_sel) & (df_bs["month"] == sel_month)
-        bs_f = df_bs.loc[bs_mask_m].sort_values("likes", ascending=False)
-        st.info(f"Showing posts for {sel_month}")
-
-    if bs_f.empty:
-        st.write("No BlueSky posts found for this period/topic.")
-    else:
-        for _, post in bs_f.head(10).iterrows():
-            with st.container(border=True):
-                st.markdown(f"**@{post['author']}**")
-                st.write(post['text'])
-                st.caption(f"❤️ {post['likes']} | 🔁 {post['reposts']} | 💬 {post['replies']}")
-                st.caption(f"📅 {post['created_at'].strftime('%Y-%m-%d %H:%M')}")
-
-st.subheader("Filtered rows preview")
-st.dataframe(df_f.head(50), use_container_width=True)
+    data = render_page(prof, mode, show_timings)
+finally:
+    # Also runs when the page stops early (st.stop), so every rerun is logged
+    prof.finish()
+if show_timings:
+    render_debug_panel(prof, show_cprofile, data.memory())
@@ -0,0 +1,237 @@
+"""
+Shared, in-memory dashboard dataset.
+
+One DashboardData instance holds the trends cube, boundary geometry,
+region points and BlueSky post index, and answers the questions the app asks
+with JSON-friendly values. The Streamlit app shares one instance across
+sessions (st.cache_resource); api_server.py serves the same methods over HTTP.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import pandas as pd
+
+import bluesky_data
+import bluesky_index
+import bluesky_sentiment
+import compact
+import geometry
+import hansard_regions
+import heatmap
+import hierarchy
+import map_core
+
+BOUNDARY_FILES = hierarchy.BOUNDARY_FILES
+TRENDS_PATH = "data/combined_google_trends_data.parquet"
+BLUESKY_PATH = bluesky_data.TOP_POSTS_PATH
+MENTIONS_PATH = hansard_regions.VIEW_PATH
+SENTIMENT_PATH = bluesky_sentiment.VIEW_PATH
+AGGREGATIONS = ("mean", "sum", "latest")
+DEFAULT_LEVEL = "country"
+# Derived payloads (geometry, heatmap frames, sentiment series) kept per instance
+CACHE_ENTRIES = 128
+
+
+def _parse_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+class DashboardData:
+    def __init__(
+        self,
+        boundary_files: dict = BOUNDARY_FILES,
+        trends_path: str = TRENDS_PATH,
+        bluesky_path: str = BLUESKY_PATH,
+        mentions_path: str = MENTIONS_PATH,
+        sentiment_path: str = SENTIMENT_PATH,
+    ):
+        self.boundary_files = dict(boundary_files)
+        self.trends_path = trends_path
+        self.bluesky_path = bluesky_path
+        self.mentions_path = mentions_path
+        self.sentiment_path = sentiment_path
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.reload()
+
+    def reload(self) -> None:
+        """(Re)load every input file. Per-request caches are dropped."""
+        layers = {}
+        points = {}
+        for level, path in self.boundary_files.items():
+            with open(path, "r", encoding="utf-8") as f:
+                layers[level] = json.load(f)
+            points.update(geometry.load_region_points(path))
+        regions = hierarchy.load_hierarchy(self.boundary_files)
+        df = map_core.read_csv(self.trends_path)
+        rollups = hierarchy.RollupCube(df, regions)
+        posts = bluesky_index.index_from_top_posts(bluesky_data.load_top_posts(self.bluesky_path))
+        # Optional layer: Hansard mentions, weekly like the trends, on the same roll-ups
+        mentions = None
+        if os.path.exists(self.mentions_path):
+            mentions = hierarchy.RollupCube(hansard_regions.load_view(self.mentions_path), regions)
+        # Optional: daily post sentiment, scored offline by bluesky_sentiment.py
+        sentiment = None
+        if os.path.exists(self.sentiment_path):
+            sentiment = bluesky_sentiment.load_view(self.sentiment_path)
+
+        with self._lock:
+            self.layers = layers
+            self.hierarchy = regions
+            self.code_map = regions.code_map()
+            self.df = df
+            self.rollups = rollups
+            self.mentions = mentions
+            self.sentiment = sentiment
+            self.region_points = points
+            self.post_index = posts
+            inputs = (*self.boundary_files.values(), self.trends_path, self.bluesky_path, self.mentions_path,
+                      self.sentiment_path)
+            self.version = "-".join(str(int(os.path.getmtime(p))) for p in inputs if os.path.exists(p))
+            # Topic slices are what almost every request starts from
+            self._by_topic = {str(t): g for t, g in df.groupby("topic_name", observed=True)}
+            self._dates = [d.isoformat() for d in sorted(df["date"].dt.date.dropna().unique())]
+            self._cache = OrderedDict()
+
+    def _cached(self, key: tuple, build):
+        """
+        build() memoised in this instance's LRU. reload() swaps in an empty
+        cache, and a result built from the old data lands in the old one.
+        """
+        with self._lock:
+            cache = self._cache
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        value = build()
+        with self._lock:
+            cache[key] = value
+            while len(cache) > CACHE_ENTRIES:
+                cache.popitem(last=False)
+        return value
+
+    # -----------------------------
+    # Trends
+    # -----------------------------
+    def meta(self) -> dict:
+        return {
+            "version": self.version,
+            "topics": sorted(self._by_topic),
+            "dates": self._dates,
+            "aggregations": list(AGGREGATIONS),
+            "levels": [lvl for lvl in self.hierarchy.available_levels() if lvl != "uk"],
+            "unmatched_regions": self.rollups.unmatched,
+            "layers": ["hansard"] if self.mentions is not None else [],
+        }
+
+    def memory(self) -> list:
+        """Deep memory use of the loaded frames: frame, rows, mb, bytes_per_row."""
+        with self._lock:
+            frames = {"trends": self.df, "trends_by_topic": list(self._by_topic.values())}
+            if self.sentiment is not None:
+                frames["bluesky_sentiment"] = self.sentiment
+        return compact.memory_report(frames).to_dict("records")
+
+    def topic_rows(self, topic: str) -> pd.DataFrame:
+        return self._by_topic.get(topic, self.df.iloc[0:0])
+
+    def filtered_rows(self, topic: str, day, limit: int | None = None) -> pd.DataFrame:
+        rows = self.topic_rows(topic)
+        rows = rows.loc[rows["date"].dt.date == _parse_date(day)]
+        return rows if limit is None else rows.head(limit)
+
+    def region_values(
+        self, topic: str, day, agg: str = "mean", level: str = DEFAULT_LEVEL, within: str | None = None
+    ) -> pd.DataFrame:
+        """
+        One value per boundary code in a level view (region, interest_value),
+        from the precomputed roll-ups.
+        """
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation: {agg}")
+        if level not in hierarchy.LEVELS:
+            raise ValueError(f"Unknown level: {level}")
+        return self.rollups.values(level, topic, _parse_date(day), agg, within)
+
+    def mention_values(self, topic: str, day, level: str = DEFAULT_LEVEL, within: str | None = None) -> pd.DataFrame:
+        """Hansard speeches mentioning the topic in the slider's week, per boundary code (region, interest_value)."""
+        if level not in hierarchy.LEVELS:
+            raise ValueError(f"Unknown level: {level}")
+        if self.mentions is None:
+            return pd.DataFrame({"region": pd.Series(dtype=str), "interest_value": pd.Series(dtype=float)})
+        return self.mentions.values(level, topic, _parse_date(day), "sum", within)
+
+    def level_series(self, topic: str, level: str = DEFAULT_LEVEL) -> pd.DataFrame:
+        """A topic's full series in a level view, keyed by boundary code."""
+        if level not in hierarchy.LEVELS:
+            raise ValueError(f"Unknown level: {level}")
+        return self.rollups.series(level, topic)
+
+    def trends_cube(self, topic: str) -> dict:
+        """A topic's full series as a dates x regions matrix."""
+        wide = self.topic_rows(topic).pivot_table(
+            index="date", columns="region", values="interest_value", aggfunc="mean", observed=True
+        ).sort_index()
+        return {
+            "topic": topic,
+            "dates": wide.index.strftime("%Y-%m-%d").tolist(),
+            "regions": [str(c) for c in wide.columns],
+            "values": wide.astype(object).where(wide.notna(), None).to_numpy().tolist(),
+        }
+
+    # -----------------------------
+    # Geometry
+    # -----------------------------
+    def centroids(self) -> dict:
+        return self.region_points
+
+    def geometry(self, tolerance: float = 0.0, level: str = DEFAULT_LEVEL, within: str | None = None) -> dict:
+        """
+        Boundaries of a level view, with uniform code/name properties, and
+        simplified when tolerance > 0 (degrees).
+        """
+        if level not in hierarchy.LEVELS:
+            raise ValueError(f"Unknown level: {level}")
+        tolerance = round(float(tolerance), 6)
+        return self._cached(("geometry", tolerance, level, within), lambda: self._geometry(tolerance, level, within))
+
+    def _geometry(self, tolerance: float, level: str, within: str | None) -> dict:
+        geojson = hierarchy.level_geojson(self.hierarchy, self.layers, level, within)
+        if tolerance <= 0:
+            return geojson
+        return geometry.simplify_geojson(geojson, tolerance)
+
+    def hierarchy_nodes(self) -> list:
+        h = self.hierarchy
+        return [
+            {"code": c, "name": n, "level": hierarchy.LEVELS[lvl], "parent": h.codes[p] if p >= 0 else None}
+            for c, n, lvl, p in zip(h.codes, h.names, h.levels.tolist(), h.parent.tolist())
+        ]
+
+    def heatmap(self, topic: str, level: str = DEFAULT_LEVEL) -> dict:
+        frames, labels = self._cached(("heatmap", topic, level), lambda: self._heatmap(topic, level))
+        return {"frames": frames, "labels": labels}
+
+    def _heatmap(self, topic: str, level: str):
+        centroids = {code: p["centroid"] for code, p in self.region_points.items()}
+        return heatmap.build_heatmap_frames(self.level_series(topic, level), centroids)
+
+    # -----------------------------
+    # BlueSky
+    # -----------------------------
+    def posts(self, topic: str, day) -> dict:
+        posts, fallback_month = bluesky_index.lookup_posts(self.post_index, topic, _parse_date(day))
+        return {"posts": posts, "fallback_month": fallback_month}
+
+    def sentiment_series(self, topic: str, freq: str = "W-SAT") -> pd.DataFrame:
+        """Mean and engagement-weighted post sentiment per week (or day, freq="D"); empty if not scored."""
+        return self._cached(("sentiment", topic, freq), lambda: self._sentiment(topic, freq))
+
+    def _sentiment(self, topic: str, freq: str) -> pd.DataFrame:
+        if self.sentiment is None:
+            return pd.DataFrame(columns=["date", "posts", "sentiment", "weighted_sentiment", "positive_share",
+                                         "negative_share"])
+        return bluesky_sentiment.sentiment_series(self.sentiment, topic, freq)
@@ -0,0 +1,245 @@
+"""
+Headless benchmarks for the dashboard's data and render paths.
+
+    python benchmark.py                         # small + medium
+    python benchmark.py --sizes small,large --repeat 5
+    python benchmark.py --grid 50x200x730       # topics x regions x days
+    python benchmark.py --compare benchmarks/abc123.json benchmarks/def456.json
+
+Each size gets a synthetic dataset (seed_fake_data.py) and boundary file, then
+every stage is timed over --repeat runs and traced once with tracemalloc for
+peak memory. Results go to benchmarks/<git commit>.json so runs can be
+compared across commits.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import geometry
+import heatmap
+import map_core
+import seed_fake_data
+
+RESULTS_DIR = "benchmarks"
+REGIONS_GEOJSON = seed_fake_data.GEOJSON_PATH
+
+SIZES = {
+    "small": (3, 9, 365),
+    "medium": (20, 50, 730),
+    "large": (100, 300, 1825),
+}
+STAGES = ["read_csv", "filter_aggregate", "centroids", "heatmap_frames", "sparklines", "folium_map"]
+# Stages whose return value is a dict of payload sizes worth recording
+REPORTING_STAGES = {"sparklines", "folium_map"}
+
+
+# -----------------------------
+# Synthetic inputs
+# -----------------------------
+def synthetic_geojson(regions: dict, n_vertices: int = 200, seed: int = 0) -> dict:
+    """
+    Real English region boundaries for real codes, plus a jittered blob on a
+    grid over Great Britain for every synthetic code.
+    """
+    with open(REGIONS_GEOJSON, "r", encoding="utf-8") as f:
+        real = json.load(f)
+    features = [f for f in real["features"] if f["properties"].get("RGN24CD") in regions]
+
+    rng = np.random.default_rng(seed)
+    synthetic = [c for c in regions if not any(f["properties"]["RGN24CD"] == c for f in features)]
+    side = int(np.ceil(np.sqrt(max(len(synthetic), 1))))
+    for i, code in enumerate(synthetic):
+        cx = -5.5 + 7.0 * (i % side + 0.5) / side
+        cy = 50.2 + 8.0 * (i // side + 0.5) / side
+        t = np.linspace(0, 2 * np.pi, n_vertices, endpoint=False)
+        r = (3.0 / side) * (1 + 0.2 * rng.random(n_vertices))
+        ring = np.column_stack([cx + r * np.cos(t), cy + r * np.sin(t)])
+        ring = np.vstack([ring, ring[:1]]).round(5).tolist()
+        features.append({
+            "type": "Feature",
+            "properties": {"RGN24CD": code, "RGN24NM": regions[code]},
+            "geometry": {"type": "Polygon", "coordinates": [ring]},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def make_dataset(n_topics: int, n_regions: int, n_days: int, out_dir: str, seed: int = 42):
+    """Write a synthetic trends parquet and return (path, geojson, rows)."""
+    regions = seed_fake_data.expand_regions(seed_fake_data.load_regions_from_geojson(REGIONS_GEOJSON), n_regions)
+    topics = seed_fake_data.expand_topics(n_topics)
+    dates = pd.date_range(end="2025-12-31", periods=n_days, freq="D")
+    path = os.path.join(out_dir, f"trends_{n_topics}x{n_regions}x{n_days}.parquet")
+    rows = seed_fake_data.write_trends(seed_fake_data.iter_trends_frames(topics, regions, dates, seed), path, "parquet")
+    return path, synthetic_geojson(regions), rows
+
+
+# -----------------------------
+# Measurement
+# -----------------------------
+def measure(fn, repeat: int, trace_memory: bool = True) -> dict:
+    """Time fn over `repeat` runs, then trace one more run for peak memory."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+
+    peak_mb = None
+    if trace_memory:
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = round(peak / 1e6, 3)
+
+    return {
+        "seconds_min": round(min(times), 6),
+        "seconds_median": round(statistics.median(times), 6),
+        "peak_mb": peak_mb,
+        "result": result,
+    }
+
+
+def run_size(name: str, n_topics: int, n_regions: int, n_days: int, repeat: int, stages: list, work_dir: str,
+             trace_memory: bool = True) -> list:
+    path, geojson, rows = make_dataset(n_topics, n_regions, n_days, work_dir)
+    size = {"size": name, "topics": n_topics, "regions": n_regions, "days": n_days, "rows": rows}
+    print(f"== {name}: {n_topics} topics x {n_regions} regions x {n_days} days ({rows:,} rows)")
+
+    # Shared inputs for the later stages, built outside the timed sections
+    df = map_core.read_csv(path)
+    topic = df["topic_name"].iloc[0]
+    selected_date = df["date"].max().date()
+    df_f = map_core.filter_topic_date(df, topic, selected_date)
+    region_vals = map_core.aggregate_region_values(df_f, "mean")
+    points = geometry.compute_region_points(geojson)
+    centroids = {c: p["centroid"] for c, p in points.items()}
+    labels = {c: p["label"] for c, p in points.items()}
+    df_topic = df.loc[df["topic_name"] == topic, ["date", "region", "interest_value"]]
+
+    def folium_map():
+        m = map_core.build_base_map(json.loads(json.dumps(geojson)), region_vals, topic, "mean", key_prop="RGN24CD")
+        frames, frame_labels = heatmap.build_heatmap_frames(df_topic, centroids)
+        map_core.add_heatmap(m, frames, frame_labels)
+        return {"html_bytes": len(m.get_root().render().encode("utf-8"))}
+
+    def sparklines():
+        m = map_core.build_base_map(json.loads(json.dumps(geojson)), region_vals, topic, "mean", key_prop="RGN24CD")
+        return {"markers": map_core.add_sparkline_markers(m, df, topic, labels)}
+
+    stage_fns = {
+        "read_csv": lambda: map_core.read_csv(path),
+        "filter_aggregate": lambda: map_core.aggregate_region_values(
+            map_core.filter_topic_date(df, topic, selected_date), "mean"
+        ),
+        "centroids": lambda: geometry.compute_region_points(geojson),
+        "heatmap_frames": lambda: heatmap.build_heatmap_frames(df_topic, centroids),
+        "sparklines": sparklines,
+        "folium_map": folium_map,
+    }
+
+    results = []
+    for stage in stages:
+        # Sparklines are ~50 ms each, so don't repeat them for big grids
+        n = 1 if stage == "sparklines" and n_regions > 50 else repeat
+        res = measure(stage_fns[stage], n, trace_memory)
+        extra = res.pop("result")
+        row = {**size, "stage": stage, **res, "extra": extra if stage in REPORTING_STAGES else {}}
+        results.append(row)
+        print(f"  {stage:<18} {row['seconds_median']:>9.4f}s  peak {row['peak_mb']} MB  {row['extra'] or ''}")
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old_path: str, new_path: str) -> None:
+    """Print new/old median time and peak memory ratios per (size, stage)."""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {(r["size"], r["stage"]): r for r in json.load(f)["results"]}
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)["results"]
+
+    print(f"{'size':<10} {'stage':<18} {'old s':>9} {'new s':>9} {'ratio':>7} {'mem ratio':>9}")
+    for r in new:
+        o = old.get((r["size"], r["stage"]))
+        if o is None:
+            continue
+        ratio = r["seconds_median"] / o["seconds_median"] if o["seconds_median"] else float("nan")
+        mem = (r["peak_mb"] / o["peak_mb"]) if o.get("peak_mb") and r.get("peak_mb") else float("nan")
+        flag = "  <-- slower" if ratio > 1.2 else ""
+        print(f"{r['size']:<10} {r['stage']:<18} {o['seconds_median']:>9.4f} {r['seconds_median']:>9.4f} "
+              f"{ratio:>7.2f} {mem:>9.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the map app's data and render paths")
+    parser.add_argument("--sizes", default="small,medium", help=f"comma list of {', '.join(SIZES)}")
+    parser.add_argument("--grid", action="append", default=[], help="extra size as TOPICSxREGIONSxDAYS")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma list of stages to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--out", default=None, help="results file (default: benchmarks/<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files and exit")
+    args = parser.parse_args()
+
+    # folium warns about the CartoDB tile key on every map; irrelevant here
+    warnings.filterwarnings("ignore", message="CartoDB tiles")
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    sizes = [(s, *SIZES[s]) for s in args.sizes.split(",") if s]
+    for g in args.grid:
+        t, r, d = (int(x) for x in g.lower().split("x"))
+        sizes.append((g, t, r, d))
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, t, r, d in sizes:
+            results.extend(run_size(name, t, r, d, args.repeat, stages, work_dir, not args.no_memory))
+
+    commit = git_commit()
+    out_path = args.out or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "commit": commit,
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "numpy": np.__version__,
+                "machine": platform.platform(),
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"Saved results to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Typed BlueSky summary tables, replacing the stringified-dict blue_sky_all.csv.
+
+summary.parquet   one row per (period, topic), numeric metric columns
+top_posts.parquet one row per (period, topic, rank)
+
+period is "YYYY-MM" for months and "YYYY" for whole-year rows; top_posts
+also has "YYYY-MM-DD" day rows. period_type says which. Both files are
+written by bluesky_pipeline.py.
+"""
+import pandas as pd
+
+from compact import STRING
+
+SUMMARY_PATH = "data/blue_sky/summary.parquet"
+TOP_POSTS_PATH = "data/blue_sky/top_posts.parquet"
+
+SUMMARY_DTYPES = {
+    "period": "string",
+    "period_type": "category",
+    "topic": "category",
+    "total_posts": "int64",
+    "total_likes": "int64",
+    "total_reposts": "int64",
+    "total_replies": "int64",
+    "avg_engagement": "float64",
+    "unique_authors": "int64",
+    "posts_with_media": "int64",
+    "first_post_at": "datetime64[ns, UTC]",
+    "last_post_at": "datetime64[ns, UTC]",
+}
+
+TOP_POSTS_DTYPES = {
+    "period": "string",
+    "period_type": "category",
+    "topic": "category",
+    "rank": "int16",
+    "uri": STRING,
+    "author": STRING,
+    "text": STRING,
+    "likes": "int32",
+    "reposts": "int32",
+    "replies": "int32",
+    "engagement": "int32",
+    "created_at": "datetime64[ns, UTC]",
+}
+
+
+def _conform(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    missing = set(dtypes) - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing columns: {sorted(missing)}")
+    return df[list(dtypes)].astype(dtypes)
+
+
+def write_summary(df: pd.DataFrame, path: str = SUMMARY_PATH) -> None:
+    _conform(df, SUMMARY_DTYPES).sort_values(["period_type", "period", "topic"]).to_parquet(path, index=False)
+
+
+def write_top_posts(df: pd.DataFrame, path: str = TOP_POSTS_PATH) -> None:
+    _conform(df, TOP_POSTS_DTYPES).sort_values(["period_type", "period", "topic", "rank"]).to_parquet(
+        path, index=False
+    )
+
+
+def _read(path: str, dtypes: dict, period_type: str | None, topics: list | None, columns: list | None):
+    # Push the filters down to the parquet reader rather than loading everything
+    filters = []
+    if period_type is not None:
+        filters.append(("period_type", "==", period_type))
+    if topics is not None:
+        filters.append(("topic", "in", list(topics)))
+    df = pd.read_parquet(path, columns=columns, filters=filters or None)
+    return df.astype({c: t for c, t in dtypes.items() if c in df.columns})
+
+
+def load_summary(
+    path: str = SUMMARY_PATH,
+    period_type: str | None = None,
+    topics: list | None = None,
+    columns: list | None = None,
+) -> pd.DataFrame:
+    """Summary metrics, optionally only "month" or "year" rows and selected topics."""
+    return _read(path, SUMMARY_DTYPES, period_type, topics, columns)
+
+
+def load_top_posts(
+    path: str = TOP_POSTS_PATH,
+    period_type: str | None = None,
+    topics: list | None = None,
+    columns: list | None = None,
+) -> pd.DataFrame:
+    """Top posts per period and topic, ordered by rank."""
+    return _read(path, TOP_POSTS_DTYPES, period_type, topics, columns)
+
+
+def summary_for(summary: pd.DataFrame, period: str, topic: str) -> dict | None:
+    """Metrics for one (period, topic) as a plain dict, or None."""
+    row = summary[(summary["period"] == period) & (summary["topic"] == topic)]
+    if row.empty:
+        return None
+    return row.iloc[0].to_dict()
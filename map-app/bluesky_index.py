@@ -0,0 +1,75 @@
+from datetime import date
+
+import pandas as pd
+
+POST_FIELDS = ["author", "text", "likes", "reposts", "replies", "created_at"]
+
+
+def prepare_posts(df_bs: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalise a BlueSky posts frame (top-posts extract or monthly raw dump)
+    to topic, created_at (UTC), day, month and engagement columns.
+    """
+    df = df_bs.copy()
+    # Raw monthly dumps call the topic "keyword"
+    if "topic" not in df.columns and "keyword" in df.columns:
+        df = df.rename(columns={"keyword": "topic"})
+
+    # Specify utc=True to handle mixed timezones
+    df["created_at"] = pd.to_datetime(df["created_at"], errors="coerce", utc=True)
+    df = df.dropna(subset=["created_at", "topic"])
+
+    for col in ["likes", "reposts", "replies"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype("int32")
+    df["engagement"] = df["likes"] + df["reposts"] + df["replies"]
+    df["day"] = df["created_at"].dt.date
+    df["month"] = df["created_at"].dt.strftime("%Y-%m")
+    return df
+
+
+def _top_k_by(df: pd.DataFrame, key: str, k: int) -> dict:
+    # One sort for the whole frame, then keep the first k rows of every group
+    ranked = df.sort_values(["topic", key, "engagement", "likes"], ascending=[True, True, False, False])
+    ranked = ranked[ranked.groupby(["topic", key], sort=False, observed=True).cumcount() < k]
+
+    index = {}
+    for (topic, period), grp in ranked.groupby(["topic", key], sort=False, observed=True):
+        index[(str(topic), period)] = grp[POST_FIELDS].to_dict("records")
+    return index
+
+
+def build_post_index(df_bs: pd.DataFrame, k: int = 10) -> dict:
+    """
+    Top-k posts per (topic, day) and (topic, "YYYY-MM"), pre-sorted by
+    engagement (likes + reposts + replies) so the side panel is a dict lookup.
+    """
+    df = prepare_posts(df_bs)
+    return {
+        "day": _top_k_by(df, "day", k),
+        "month": _top_k_by(df, "month", k),
+    }
+
+
+def index_from_top_posts(top_posts: pd.DataFrame, k: int = 10) -> dict:
+    """
+    build_post_index over bluesky_data's top-posts table: days come from its
+    per-day rows and months from its per-month rows, so a day's posts aren't
+    limited to the ones that made the month's top k.
+    """
+    kinds = top_posts["period_type"].astype(str)
+    return {
+        "day": _top_k_by(prepare_posts(top_posts[kinds == "day"]), "day", k),
+        "month": _top_k_by(prepare_posts(top_posts[kinds == "month"]), "month", k),
+    }
+
+
+def lookup_posts(index: dict, topic: str, day: date) -> tuple[list, str | None]:
+    """
+    Posts for a topic on a day, falling back to the whole month when the day
+    has none. Returns (posts, month label if the fallback was used).
+    """
+    posts = index["day"].get((topic, day))
+    if posts:
+        return posts, None
+    posts = index["month"].get((topic, day.strftime("%Y-%m")), [])
+    return posts, day.strftime("%B %Y")
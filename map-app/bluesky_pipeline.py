@@ -0,0 +1,369 @@
+"""
+Consolidate the raw BlueSky monthly dumps into the dashboard's derived datasets.
+
+    python bluesky_pipeline.py            # only months whose raw file changed
+    python bluesky_pipeline.py --force    # rebuild every month
+
+Each data/blue_sky/monthly_raw_YYYY_MM.csv is streamed in chunks into
+per-month parquet aggregates under data/blue_sky/derived/YYYY_MM/. The annual
+outputs are then rebuilt from those small per-month tables, so adding a new
+month only reads that month's raw file.
+"""
+import argparse
+import glob
+import heapq
+import os
+import re
+from collections import defaultdict
+from datetime import datetime
+
+import pandas as pd
+
+import bluesky_data
+from compact import STRING
+from io_utils import file_hash, read_json, write_json_atomic
+
+RAW_DIR = "data/blue_sky"
+RAW_PATTERN = "monthly_raw_*.csv"
+DERIVED_DIR = "data/blue_sky/derived"
+TOP_POSTS_CSV = "blue_sky_top_posts.csv"
+
+TOP_K = 10
+# Per-day top posts for the side panel, so a day isn't limited to the month's top_k
+DAY_K = 10
+# The side-panel extract has always carried the top 3 per month
+EXTRACT_K = 3
+CHUNK_SIZE = 50_000
+METRICS = ["likes", "reposts", "replies"]
+POST_COLUMNS = ["uri", "author", "text", "likes", "reposts", "replies", "created_at"]
+MONTH_TABLES = ["daily_counts", "summary", "top_posts", "daily_top_posts", "authors"]
+# Written by bluesky_stream into a month; a rebuild from the raw file replaces what was streamed
+STREAM_TABLES = ["stream_posts"]
+TOP_POST_COLUMNS = POST_COLUMNS + ["topic", "engagement"]
+# What "top" means everywhere, matching bluesky_index: engagement, then likes
+RANK_BY = ["engagement", "likes"]
+
+
+# -----------------------------
+# Per-month aggregation
+# -----------------------------
+def month_key_from_path(path: str) -> str:
+    m = re.search(r"(\d{4})_(\d{2})", os.path.basename(path))
+    if not m:
+        raise ValueError(f"Can't find YYYY_MM in {path}")
+    return f"{m.group(1)}_{m.group(2)}"
+
+
+def iter_raw_chunks(path: str, chunk_size: int = CHUNK_SIZE):
+    """Raw posts in typed chunks, with the keyword column renamed to topic."""
+    reader = pd.read_csv(
+        path,
+        chunksize=chunk_size,
+        usecols=["uri", "author", "text", "created_at", "likes", "reposts", "replies", "has_media", "keyword"],
+        dtype={"uri": STRING, "author": STRING, "text": STRING, "keyword": "category"},
+    )
+    for chunk in reader:
+        chunk = chunk.rename(columns={"keyword": "topic"})
+        chunk["created_at"] = pd.to_datetime(chunk["created_at"], errors="coerce", utc=True, format="ISO8601")
+        chunk = chunk.dropna(subset=["created_at", "topic"])
+        for col in METRICS:
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce").fillna(0).astype("int32")
+        chunk["has_media"] = chunk["has_media"].astype(str).str.lower().eq("true")
+        yield chunk
+
+
+def iter_unique_chunks(path: str, chunk_size: int = CHUNK_SIZE):
+    """
+    iter_raw_chunks without repeated (uri, topic) rows. A post matched by two
+    keywords is in the dump once per keyword and counts for both topics.
+    """
+    seen = set()
+    for chunk in iter_raw_chunks(path, chunk_size):
+        # One set lookup per post; Series.isin(seen) would rehash every key seen so far for each chunk
+        keep = []
+        for key in zip(chunk["uri"].tolist(), chunk["topic"].tolist()):
+            keep.append(key not in seen)
+            seen.add(key)
+        if not all(keep):
+            chunk = chunk[keep].copy()
+        if not chunk.empty:
+            yield chunk
+
+
+def rank_item(rec: dict) -> tuple:
+    """Heap entry for a top-post candidate, ordered by RANK_BY then uri."""
+    return (int(rec["engagement"]), int(rec["likes"]), rec["uri"], rec)
+
+
+def push_top(heap: list, item: tuple, top_k: int) -> None:
+    """Keep heap as the top_k largest rank_item entries."""
+    if len(heap) < top_k:
+        heapq.heappush(heap, item)
+    elif item[:3] > heap[0][:3]:
+        heapq.heapreplace(heap, item)
+
+
+def heap_table(heaps: dict, columns: list) -> pd.DataFrame:
+    """The records in a dict of push_top heaps, by key and then best first."""
+    return pd.DataFrame(
+        [item[3] for key in sorted(heaps) for item in sorted(heaps[key], reverse=True)], columns=columns
+    )
+
+
+def aggregate_month(path: str, top_k: int = TOP_K, chunk_size: int = CHUNK_SIZE, day_k: int = DAY_K) -> dict:
+    """
+    Stream one raw month file and return its aggregates as typed frames:
+    daily_counts (date, topic, posts), summary (one row per topic),
+    top_posts (top_k per topic by RANK_BY), daily_top_posts (day_k per
+    date and topic) and authors (distinct per topic, kept so annual
+    unique-author counts don't need the raw file again).
+    """
+    daily = []
+    sums = []
+    authors = defaultdict(set)
+    # Min-heaps of rank_item entries per topic, and per (date, topic)
+    heaps = defaultdict(list)
+    day_heaps = defaultdict(list)
+
+    for chunk in iter_unique_chunks(path, chunk_size):
+        chunk["date"] = chunk["created_at"].dt.tz_convert(None).dt.normalize()
+        daily.append(chunk.groupby(["date", "topic"], observed=True).size().rename("posts"))
+        sums.append(
+            chunk.groupby("topic", observed=True).agg(
+                total_posts=("uri", "size"),
+                total_likes=("likes", "sum"),
+                total_reposts=("reposts", "sum"),
+                total_replies=("replies", "sum"),
+                posts_with_media=("has_media", "sum"),
+                first_post_at=("created_at", "min"),
+                last_post_at=("created_at", "max"),
+            )
+        )
+        for topic, grp in chunk.groupby("topic", observed=True)["author"]:
+            authors[str(topic)].update(grp.dropna().tolist())
+
+        # Only the chunk's own top_k per topic can enter the running heaps
+        chunk["engagement"] = chunk[METRICS].sum(axis=1)
+        ranked = chunk.sort_values(RANK_BY, ascending=False)
+        for rec in ranked.groupby("topic", observed=True).head(top_k)[TOP_POST_COLUMNS].to_dict("records"):
+            push_top(heaps[str(rec["topic"])], rank_item(rec), top_k)
+        cand = ranked.groupby(["date", "topic"], observed=True).head(day_k)
+        for rec in cand[["date"] + TOP_POST_COLUMNS].to_dict("records"):
+            push_top(day_heaps[(rec["date"], str(rec["topic"]))], rank_item(rec), day_k)
+
+    month = month_key_from_path(path)
+
+    daily_counts = (
+        pd.concat(daily).groupby(level=["date", "topic"], observed=True).sum().reset_index()
+        if daily else pd.DataFrame({"date": pd.Series(dtype="datetime64[ns]"), "topic": [], "posts": []})
+    )
+
+    summary = pd.DataFrame()
+    if sums:
+        summary = pd.concat(sums).groupby(level="topic", observed=True).agg(
+            {c: "sum" for c in ["total_posts", "total_likes", "total_reposts", "total_replies", "posts_with_media"]}
+            | {"first_post_at": "min", "last_post_at": "max"}
+        )
+        summary["unique_authors"] = [len(authors[str(t)]) for t in summary.index]
+        summary = summary.reset_index()
+        summary.insert(0, "month", month.replace("_", "-"))
+
+    top_posts = heap_table(heaps, TOP_POST_COLUMNS)
+    top_posts.insert(0, "month", month.replace("_", "-"))
+    daily_top_posts = heap_table(day_heaps, ["date"] + TOP_POST_COLUMNS)
+
+    author_rows = pd.DataFrame(
+        [(t, a) for t, names in authors.items() for a in sorted(names)], columns=["topic", "author"]
+    )
+    author_rows.insert(0, "month", month.replace("_", "-"))
+    return {
+        "daily_counts": daily_counts,
+        "summary": summary,
+        "top_posts": top_posts,
+        "daily_top_posts": daily_top_posts,
+        "authors": author_rows,
+    }
+
+
+# -----------------------------
+# Month store + manifest
+# -----------------------------
+def write_month(month: str, tables: dict, derived_dir: str = DERIVED_DIR) -> None:
+    out_dir = os.path.join(derived_dir, month)
+    os.makedirs(out_dir, exist_ok=True)
+    for name, frame in tables.items():
+        frame = frame.copy()
+        if "topic" in frame.columns:
+            frame["topic"] = frame["topic"].astype("string")
+        frame.to_parquet(os.path.join(out_dir, f"{name}.parquet"), index=False)
+
+
+def remove_month(month: str, names: list, derived_dir: str = DERIVED_DIR) -> None:
+    """Delete one month's stored tables; the month directory goes once nothing else is in it."""
+    out_dir = os.path.join(derived_dir, month)
+    for name in names:
+        path = os.path.join(out_dir, f"{name}.parquet")
+        if os.path.exists(path):
+            os.remove(path)
+    if os.path.isdir(out_dir) and not os.listdir(out_dir):
+        os.rmdir(out_dir)
+
+
+def read_months(name: str, derived_dir: str = DERIVED_DIR) -> pd.DataFrame:
+    """Concatenate one per-month table across every stored month."""
+    paths = sorted(glob.glob(os.path.join(derived_dir, "*", f"{name}.parquet")))
+    if not paths:
+        return pd.DataFrame()
+    frame = pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True)
+    if "topic" in frame.columns:
+        frame["topic"] = frame["topic"].astype("category")
+    return frame
+
+
+def read_month(month: str, name: str, derived_dir: str = DERIVED_DIR) -> pd.DataFrame:
+    """One stored table of one month; empty if the month has none."""
+    path = os.path.join(derived_dir, month, f"{name}.parquet")
+    return pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+
+
+def update_months(raw_dir: str = RAW_DIR, derived_dir: str = DERIVED_DIR, force: bool = False) -> list:
+    """
+    Re-aggregate only the raw month files whose content changed, and drop
+    the tables of months whose raw file was deleted. Returns the months
+    rebuilt or removed.
+    """
+    manifest_path = os.path.join(derived_dir, "manifest.json")
+    manifest = read_json(manifest_path, {})
+    rebuilt = []
+    paths = sorted(glob.glob(os.path.join(raw_dir, RAW_PATTERN)))
+    present = {month_key_from_path(p) for p in paths}
+    for month in sorted(set(manifest) - present):
+        print(f"Removing {month}: {manifest[month]['source']} is gone")
+        remove_month(month, MONTH_TABLES + STREAM_TABLES, derived_dir)
+        del manifest[month]
+        rebuilt.append(month)
+    for path in paths:
+        month = month_key_from_path(path)
+        digest = file_hash(path)
+        stored = all(os.path.exists(os.path.join(derived_dir, month, f"{n}.parquet")) for n in MONTH_TABLES)
+        if not force and stored and manifest.get(month, {}).get("sha1") == digest:
+            continue
+        print(f"Aggregating {path}")
+        remove_month(month, STREAM_TABLES, derived_dir)
+        write_month(month, aggregate_month(path), derived_dir)
+        manifest[month] = {
+            "source": os.path.basename(path),
+            "sha1": digest,
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        rebuilt.append(month)
+    if rebuilt:
+        write_json_atomic(manifest, manifest_path)
+    return rebuilt
+
+
+# -----------------------------
+# Annual outputs
+# -----------------------------
+def _ranked(posts: pd.DataFrame, by: list, top_k: int) -> pd.DataFrame:
+    posts = posts.sort_values(by + RANK_BY, ascending=[True] * len(by) + [False] * len(RANK_BY))
+    posts["rank"] = posts.groupby(by, observed=True).cumcount() + 1
+    return posts[posts["rank"] <= top_k]
+
+
+def build_summary(monthly: pd.DataFrame, authors: pd.DataFrame) -> pd.DataFrame:
+    """Typed summary: the monthly rows plus one whole-year row per topic."""
+    monthly = monthly.assign(period=monthly["month"], period_type="month")
+
+    year = monthly["month"].str[:4]
+    yearly = monthly.groupby([year.rename("period"), "topic"], observed=True).agg(
+        {c: "sum" for c in ["total_posts", "total_likes", "total_reposts", "total_replies", "posts_with_media"]}
+        | {"first_post_at": "min", "last_post_at": "max"}
+    )
+    # Distinct authors over the year can't be summed from the months
+    yearly["unique_authors"] = (
+        authors.assign(period=authors["month"].str[:4])
+        .drop_duplicates(subset=["period", "topic", "author"])
+        .groupby(["period", "topic"], observed=True)
+        .size()
+    )
+    yearly = yearly.reset_index().assign(period_type="year")
+
+    summary = pd.concat([monthly, yearly], ignore_index=True)
+    engagement = summary["total_likes"] + summary["total_reposts"] + summary["total_replies"]
+    summary["avg_engagement"] = (engagement / summary["total_posts"]).round(2)
+    summary["unique_authors"] = summary["unique_authors"].fillna(0)
+    return summary
+
+
+def build_top_posts(monthly: pd.DataFrame, daily: pd.DataFrame | None = None, top_k: int = TOP_K) -> pd.DataFrame:
+    """
+    Typed top posts: per month, the year's top_k drawn from the monthly
+    top_k, and per day from the months' daily tables.
+    """
+    months = _ranked(monthly.assign(period=monthly["month"], period_type="month"), ["period", "topic"], top_k)
+    years = _ranked(monthly.assign(period=monthly["month"].str[:4], period_type="year"), ["period", "topic"], top_k)
+    parts = [months, years]
+    if daily is not None and not daily.empty:
+        days = daily.assign(period=pd.to_datetime(daily["date"]).dt.strftime("%Y-%m-%d"), period_type="day")
+        parts.append(_ranked(days.drop(columns="date"), ["period", "topic"], top_k))
+    return pd.concat(parts, ignore_index=True)
+
+
+def write_outputs(raw_dir: str = RAW_DIR, derived_dir: str = DERIVED_DIR, top_posts_csv: str = TOP_POSTS_CSV) -> None:
+    """
+    Rebuild the annual datasets from the per-month tables: the typed
+    summary / top-posts tables (see bluesky_data.py), daily counts as parquet,
+    plus the wide CSVs and top-posts extract.
+    """
+    daily = read_months("daily_counts", derived_dir)
+    monthly = read_months("summary", derived_dir)
+    posts = read_months("top_posts", derived_dir)
+    day_posts = read_months("daily_top_posts", derived_dir)
+    authors = read_months("authors", derived_dir)
+    if daily.empty:
+        print("No monthly aggregates found")
+        return
+
+    daily.to_parquet(os.path.join(derived_dir, "daily_counts.parquet"), index=False)
+    top_posts = build_top_posts(posts, day_posts)
+    bluesky_data.write_summary(build_summary(monthly, authors), os.path.join(raw_dir, "summary.parquet"))
+    bluesky_data.write_top_posts(top_posts, os.path.join(raw_dir, "top_posts.parquet"))
+
+    # Wide per-year CSVs, same shape as before
+    daily["year"] = daily["date"].dt.year
+    for year, grp in daily.groupby("year"):
+        wide = grp.pivot_table(index="date", columns="topic", values="posts", aggfunc="sum", observed=True)
+        wide = wide.sort_index().fillna(0).astype(float)
+        wide.index = wide.index.strftime("%Y-%m-%d")
+        wide.to_csv(os.path.join(raw_dir, f"annual_daily_counts_{year}.csv"), index_label="date")
+
+    for year, grp in monthly.groupby(monthly["month"].str[:4]):
+        wide = grp.pivot_table(index="month", columns="topic", values="total_posts", aggfunc="sum", observed=True)
+        wide.fillna(0).astype("int64").to_csv(os.path.join(raw_dir, f"annual_monthly_counts_{year}.csv"))
+
+    # Top-posts extract (top 3 per month) for spreadsheets / older consumers
+    extract = top_posts[(top_posts["period_type"] == "month") & (top_posts["rank"] <= EXTRACT_K)].copy()
+    months = pd.to_datetime(extract["period"], format="%Y-%m")
+    extract.insert(0, "year", months.dt.year)
+    extract["month"] = months.dt.strftime("%B %Y")
+    extract["created_at"] = pd.to_datetime(extract["created_at"], utc=True).dt.strftime("%Y-%m-%dT%H:%M:%S.%f").str[:-3] + "Z"
+    extract[["year", "month", "topic", "author", "text", "likes", "reposts", "replies", "created_at"]].to_csv(
+        top_posts_csv, index=False
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consolidate BlueSky monthly raw dumps")
+    parser.add_argument("--force", action="store_true", help="rebuild every month, not just changed ones")
+    args = parser.parse_args()
+
+    rebuilt = update_months(force=args.force)
+    print(f"Rebuilt months: {', '.join(rebuilt) if rebuilt else 'none'}")
+    if rebuilt or not os.path.exists(bluesky_data.SUMMARY_PATH):
+        write_outputs()
+    print("done")
+
+
+if __name__ == "__main__":
+    main()
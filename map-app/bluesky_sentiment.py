@@ -0,0 +1,440 @@
+"""
+Per-post sentiment for the BlueSky dumps, and engagement-weighted daily
+sentiment per topic.
+
+    python bluesky_sentiment.py                       # only month files that changed
+    python bluesky_sentiment.py --force --workers 4
+    python bluesky_sentiment.py --lexicon vader_lexicon.txt
+    python bluesky_sentiment.py --score "HS2 is a total waste of money"
+
+Posts are scored with a local valence lexicon in the VADER style: each word
+carries a valence in -4..4, a negation up to three words before it in the
+same clause flips and damps it, a booster ("very", "really") strengthens it,
+and a post's sum s becomes s / sqrt(s^2 + 15) in -1..1. A chunk of posts is
+scored at once: the texts are split into one flat token array, valences come
+from one lexicon lookup, negation and boosters are lagged masks over that
+array, and the per-post sums one bincount. Chunks are spread over worker
+processes.
+
+Each month's raw file gives data/blue_sky/derived/YYYY_MM/post_sentiment.parquet
+(one row per post) and daily_sentiment.parquet (sums per date and topic).
+A manifest of file hashes and the lexicon's hash means a rerun only scores
+the months that changed. The daily view, data/blue_sky/sentiment_daily.parquet,
+is what the app reads; nothing is scored at render time.
+
+A post's weight in the engagement-weighted mean is 1 + log(1 + likes +
+reposts + replies): popular posts count for more without one viral post
+deciding the day.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import bluesky_pipeline
+from io_utils import file_hash, read_json, write_json_atomic
+
+DERIVED_DIR = bluesky_pipeline.DERIVED_DIR
+VIEW_PATH = "data/blue_sky/sentiment_daily.parquet"
+MANIFEST_NAME = "sentiment_manifest.json"
+CHUNK_SIZE = bluesky_pipeline.CHUNK_SIZE
+POST_COLUMNS = ["uri", "topic", "created_at", "sentiment", "scored_words", "engagement"]
+SUM_COLUMNS = ["posts", "scored", "positive", "negative", "sentiment_sum", "weight_sum", "weighted_sum"]
+
+# VADER's constants: normalisation, negation damping, booster increment
+ALPHA = 15.0
+NEGATION_SCALAR = -0.74
+BOOST = 0.293
+NEGATION_WINDOW = 3
+# |compound| at or above this counts as positive / negative
+THRESHOLD = 0.05
+
+
+NEGATIONS = frozenset(
+    "not no never none nobody nothing neither nor nowhere cannot without aint isnt arent wasnt werent dont "
+    "doesnt didnt wont wouldnt shouldnt couldnt cant hasnt havent hadnt".split()
+)
+BOOSTERS = {
+    "very": 1, "really": 1, "so": 1, "extremely": 1, "incredibly": 1, "absolutely": 1, "totally": 1,
+    "completely": 1, "utterly": 1, "hugely": 1, "deeply": 1, "truly": 1, "fucking": 1,
+    "bloody": 1, "particularly": 1, "massively": 1, "slightly": -1, "somewhat": -1, "barely": -1,
+    "hardly": -1, "kinda": -1, "sort": -1, "partly": -1, "marginally": -1,
+}
+
+# Valences on VADER's -4..4 scale: general English opinion words, plus the
+# words the infrastructure debate is argued in (overrun, delay, white elephant)
+LEXICON = {
+    # positive
+    "good": 1.9, "great": 3.1, "excellent": 3.2, "brilliant": 2.8, "fantastic": 2.6, "amazing": 2.8,
+    "awesome": 3.1, "wonderful": 2.7, "superb": 3.1, "outstanding": 3.0, "best": 3.2, "better": 1.9,
+    "nice": 1.8, "love": 3.2, "loved": 2.9, "loves": 2.7, "liked": 1.8, "enjoy": 2.2,
+    "happy": 2.7, "glad": 2.0, "pleased": 1.9, "delighted": 2.9, "proud": 2.1, "excited": 1.4,
+    "exciting": 2.2, "hope": 1.9, "hopeful": 1.6, "optimistic": 1.3, "positive": 2.6, "support": 1.7,
+    "supports": 1.5, "supported": 1.3, "welcome": 2.0, "welcomed": 1.8, "agree": 1.5, "thanks": 1.9,
+    "thank": 1.5, "win": 2.8, "wins": 2.7, "won": 2.7, "success": 2.7, "successful": 2.8,
+    "achieve": 1.3, "achieved": 1.8, "progress": 1.8, "improve": 1.9, "improved": 2.1,
+    "improvement": 2.0, "benefit": 2.0, "benefits": 1.6, "beneficial": 1.9, "boost": 1.7,
+    "boosts": 1.3, "growth": 1.6, "opportunity": 1.8, "opportunities": 1.6, "invest": 1.2,
+    "investment": 1.3, "jobs": 0.8, "clean": 1.7, "green": 0.6, "safe": 1.9, "safer": 1.8,
+    "secure": 1.4, "reliable": 1.6, "efficient": 1.7, "affordable": 1.4, "cheaper": 1.2,
+    "fast": 0.9, "faster": 1.1, "smart": 1.7, "sensible": 1.4, "vital": 1.2, "essential": 1.0,
+    "important": 0.8, "useful": 1.9, "helpful": 1.8, "valuable": 2.1, "worth": 0.9, "worthwhile": 1.6,
+    "fair": 1.3, "right": 0.8, "correct": 1.3, "true": 1.5, "honest": 2.3, "trust": 2.3,
+    "confidence": 2.3, "confident": 2.2, "strong": 2.3, "stronger": 1.6, "fix": 1.0, "fixed": 1.1,
+    "solution": 1.4, "solve": 0.8, "solved": 1.2, "delivered": 1.4, "deliver": 1.0, "complete": 0.8,
+    "completed": 1.2, "finished": 0.6, "open": 0.7, "opened": 0.6, "opens": 0.6, "approved": 1.8,
+    "approve": 1.7, "approval": 1.4, "backed": 1.0, "backing": 1.0, "champion": 2.3, "impressive": 2.3,
+    "beautiful": 2.9, "cool": 1.3, "fun": 2.3, "lol": 1.8, "haha": 2.0, "yay": 2.4, "hooray": 2.3,
+    "congratulations": 2.9, "congrats": 2.4, "celebrate": 2.7, "relief": 2.1, "relieved": 1.6,
+    "thriving": 2.4, "prosper": 2.1, "prosperity": 2.2, "modern": 0.9, "innovative": 1.9,
+    "ambitious": 1.0, "visionary": 1.8, "landmark": 1.1, "milestone": 1.3, "breakthrough": 2.0,
+    "recovery": 1.4, "bargain": 1.9, "value": 1.2, "free": 1.5, "easy": 1.9, "easier": 1.8,
+    "perfect": 2.7, "ideal": 2.4, "yes": 1.7, "agreed": 1.1, "favour": 1.5, "favor": 1.5,
+    # negative
+    "bad": -2.5, "worse": -2.1, "worst": -3.1, "terrible": -2.1, "awful": -2.0, "horrible": -2.5,
+    "dreadful": -2.5, "appalling": -2.9, "disgraceful": -2.8, "disgrace": -2.2, "shameful": -2.5,
+    "shame": -2.1, "pathetic": -2.5, "useless": -1.8, "rubbish": -1.8, "crap": -1.6, "shit": -2.6,
+    "stupid": -2.4, "idiotic": -2.3, "idiots": -2.3, "idiot": -2.3, "ridiculous": -1.5, "absurd": -1.4,
+    "madness": -1.9, "insane": -1.7, "nonsense": -1.7, "joke": -0.9, "farce": -2.1, "fiasco": -2.6,
+    "disaster": -3.1, "disastrous": -2.9, "catastrophe": -3.4, "catastrophic": -3.0, "chaos": -2.2,
+    "chaotic": -1.9, "mess": -1.5, "shambles": -2.4, "failure": -2.3, "failed": -2.3, "fail": -2.5,
+    "fails": -1.8, "failing": -2.3, "collapse": -2.2, "collapsed": -2.0, "crisis": -3.1,
+    "problem": -1.7, "problems": -1.7, "issue": -0.7, "issues": -0.7, "risk": -1.1, "risks": -1.1,
+    "risky": -1.4, "danger": -2.4, "dangerous": -2.1, "unsafe": -2.0, "threat": -2.4,
+    "threatens": -1.9, "harm": -2.5, "harmful": -2.4, "damage": -2.2, "damaging": -2.3,
+    "destroy": -2.5, "destroyed": -2.3, "destruction": -2.7, "waste": -1.8, "wasted": -2.2,
+    "wasteful": -2.1, "wasting": -1.7, "expensive": -1.0, "costly": -1.3, "overrun": -1.7,
+    "overruns": -1.7, "overspend": -1.6, "overbudget": -1.8, "spiralling": -1.4, "ballooning": -1.3,
+    "bloated": -1.6, "delay": -1.3, "delays": -1.4, "delayed": -1.4, "late": -0.7, "behind": -0.5,
+    "cancel": -1.4, "cancelled": -1.6, "canceled": -1.6, "cancellation": -1.6, "scrapped": -1.7,
+    "scrap": -1.2, "axed": -1.8, "abandoned": -2.1, "abandon": -1.9, "halted": -1.3, "paused": -0.8,
+    "cut": -1.1, "cuts": -1.2, "slashed": -1.5, "blocked": -1.3, "stalled": -1.4, "stuck": -1.3,
+    "broken": -2.1, "broke": -1.8, "corrupt": -3.0, "corruption": -3.0, "scandal": -2.7,
+    "lies": -2.4, "lie": -2.0, "lied": -2.5, "liar": -3.1, "liars": -3.1, "dishonest": -2.7,
+    "fraud": -2.8, "incompetent": -2.5, "incompetence": -2.5, "blame": -1.4, "blamed": -2.1,
+    "angry": -2.3, "anger": -2.7, "furious": -2.7, "outrage": -2.3, "outrageous": -2.6,
+    "outraged": -2.5, "annoyed": -1.6, "annoying": -1.8, "frustrated": -1.5, "frustrating": -1.9,
+    "frustration": -2.1, "upset": -1.6, "sad": -2.1, "sadly": -1.8, "unfortunately": -1.7,
+    "disappointed": -2.2, "disappointing": -2.2, "disappointment": -2.3, "worried": -1.2,
+    "worry": -1.9, "worrying": -1.4, "concern": -1.2, "concerns": -1.2, "concerned": -1.0,
+    "fear": -2.2, "fears": -1.8, "afraid": -2.0, "scary": -2.2, "hate": -2.7, "hated": -3.2,
+    "hates": -1.9, "dislike": -1.6, "against": -0.8, "oppose": -0.9, "opposed": -1.0,
+    "opposition": -0.6, "protest": -1.0, "protests": -1.0, "reject": -1.7, "rejected": -2.0,
+    "refuse": -1.2, "refused": -1.2, "wrong": -2.1, "unfair": -2.1, "unjust": -2.3, "poor": -2.1,
+    "poorly": -1.5, "weak": -1.9, "slow": -0.9, "slower": -1.0, "unreliable": -1.7,
+    "unaffordable": -1.6, "pointless": -1.7, "unnecessary": -1.3, "vanity": -1.4,
+    "boondoggle": -2.0, "nightmare": -2.8, "hell": -3.6,
+    "doom": -1.7, "doomed": -3.2, "ruin": -2.8, "ruined": -2.4, "ruining": -2.3, "toxic": -2.3,
+    "pollution": -1.8, "polluting": -1.7, "dirty": -1.9, "leak": -1.3,
+    "leaks": -1.3, "accident": -2.1, "meltdown": -2.1, "bankrupt": -2.6, "debt": -1.5,
+    "loss": -1.3, "losses": -1.7, "lose": -1.3, "losing": -1.6, "lost": -1.3, "sucks": -1.5,
+    "suck": -1.9, "ugh": -1.8, "wtf": -2.8, "fuck": -2.5, "fucked": -3.4, "screwed": -1.5,
+    "betrayal": -2.9, "betrayed": -2.8, "mistake": -1.4, "mistakes": -1.5, "blunder": -1.8,
+    "misery": -2.7, "suffering": -2.1, "suffer": -2.5, "struggle": -1.3, "struggling": -1.6,
+    "nope": -1.2, "pity": -1.2, "tragic": -3.4, "tragedy": -3.4,
+    "greed": -1.7, "greedy": -1.3, "ripoff": -2.1, "overpriced": -1.8,
+    # emoji
+    "\U0001F600": 2.0, "\U0001F602": 1.6, "\U0001F603": 2.0, "\U0001F60A": 2.2, "\U0001F60D": 2.6,
+    "\U0001F44D": 1.9, "\U0001F44F": 1.8, "\U0001F389": 2.4, "\U0001F525": 1.0, "\U0001F64C": 2.0,
+    "❤": 2.7, "☺": 2.0, "\U0001F642": 1.4, "\U0001F60E": 1.9, "\U0001F4AA": 1.6,
+    "\U0001F44E": -1.9, "\U0001F621": -2.8, "\U0001F620": -2.5, "\U0001F92C": -3.0, "\U0001F622": -2.1,
+    "\U0001F62D": -2.0, "\U0001F494": -2.4, "\U0001F92E": -2.5, "\U0001F644": -1.6, "\U0001F926": -1.8,
+    "\U0001F612": -1.5, "\U0001F629": -2.0, "\U0001F62C": -1.0, "☹": -2.0, "\U0001F641": -1.6,
+}
+# "white elephant" and co. are scored as phrases, not word by word
+PHRASES = {"white elephant": -2.1, "value for money": 1.6, "waste of money": -2.6, "money pit": -2.4}
+CLAUSE_BREAKS = frozenset(".,;:!?")
+# Phrases, words, emoji, and the punctuation that ends a clause (negation doesn't carry past it)
+TOKEN_RE = re.compile(
+    "(?:" + "|".join(re.escape(p) for p in PHRASES) + r")\b|[a-z][a-z']*|[\U0001F300-\U0001FAFF☹☺❤]|[.,;:!?]"
+)
+
+
+# -----------------------------
+# Lexicon
+# -----------------------------
+def load_lexicon(path: str | None = None) -> dict:
+    """
+    The built-in lexicon, or one read from `path`: VADER's vader_lexicon.txt
+    (tab-separated word, mean valence, ...) or a CSV with word,valence columns.
+    """
+    if path is None:
+        return dict(LEXICON)
+    if path.endswith(".csv"):
+        df = pd.read_csv(path, dtype={"word": str})
+        return {str(w).lower(): float(v) for w, v in zip(df["word"], df["valence"]) if v}
+    lexicon = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) >= 2:
+                try:
+                    lexicon[parts[0].lower()] = float(parts[1])
+                except ValueError:
+                    continue
+    return lexicon
+
+
+def lexicon_digest(lexicon: dict) -> str:
+    payload = json.dumps([sorted(lexicon.items()), sorted(PHRASES.items()), ALPHA, NEGATION_SCALAR, BOOST])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# -----------------------------
+# Scoring
+# -----------------------------
+_worker = {}
+
+
+def _init_worker(lexicon: dict) -> None:
+    _worker["lexicon"] = lexicon
+
+
+def _lagged(flags: np.ndarray, clauses: np.ndarray, lag: int) -> np.ndarray:
+    """flags of the token `lag` places earlier in the same clause (False at a clause's start)."""
+    out = np.zeros(len(flags), dtype=bool)
+    if lag < len(flags):
+        out[lag:] = flags[:-lag] & (clauses[lag:] == clauses[:-lag])
+    return out
+
+
+def score_texts(texts, lexicon: dict | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compound sentiment (-1..1, float32) and the number of scored words
+    (int16) for each text, computed for the whole batch at once.
+    """
+    lexicon = lexicon if lexicon is not None else _worker.get("lexicon") or load_lexicon()
+    lower = pd.Series(texts, dtype=object).fillna("").astype(str).str.lower().str.replace("’", "'", regex=False)
+    n = len(lower)
+    tokens = lower.str.findall(TOKEN_RE).explode().dropna()
+    if tokens.empty:
+        return np.zeros(n, dtype=np.float32), np.zeros(n, dtype=np.int16)
+    rows = tokens.index.to_numpy()
+
+    # String work is done once per distinct token, then gathered by code
+    codes, vocab = pd.factorize(tokens.to_numpy(dtype=object))
+    vocab = pd.Series(vocab, dtype=object)
+    plain = vocab.str.replace("'", "", regex=False)
+    valence = vocab.map(PHRASES).fillna(plain.map(lexicon)).fillna(0.0).to_numpy(dtype=np.float64)[codes]
+    boost = plain.map(BOOSTERS).fillna(0).to_numpy(dtype=np.float64)[codes]
+    negation = (plain.isin(NEGATIONS) | vocab.str.endswith("n't")).to_numpy()[codes]
+    # A new clause starts at every punctuation token and every new post
+    starts = vocab.isin(CLAUSE_BREAKS).to_numpy()[codes]
+    starts[1:] |= rows[1:] != rows[:-1]
+    clauses = np.cumsum(starts)
+
+    prev_boost = np.zeros(len(boost))
+    prev_boost[1:] = np.where(clauses[1:] == clauses[:-1], boost[:-1], 0.0)
+    valence += np.sign(valence) * BOOST * prev_boost
+    negated = np.zeros(len(negation), dtype=bool)
+    for lag in range(1, NEGATION_WINDOW + 1):
+        negated |= _lagged(negation, clauses, lag)
+    valence = np.where(negated, valence * NEGATION_SCALAR, valence)
+
+    total = np.bincount(rows, weights=valence, minlength=n)
+    hits = np.bincount(rows, weights=valence != 0, minlength=n)
+    compound = total / np.sqrt(total * total + ALPHA)
+    return compound.astype(np.float32), hits.astype(np.int16)
+
+
+def _scored_chunks(chunks, pool: ProcessPoolExecutor | None, lexicon: dict, in_flight: int):
+    """(chunk, (compound, hits)) in order; with a pool, up to in_flight chunks are scored at once."""
+    if pool is None:
+        for chunk in chunks:
+            yield chunk, score_texts(chunk["text"].to_numpy(dtype=object), lexicon)
+        return
+    pending = deque()
+    for chunk in chunks:
+        pending.append((chunk, pool.submit(score_texts, chunk["text"].to_numpy(dtype=object))))
+        if len(pending) >= in_flight:
+            done, future = pending.popleft()
+            yield done, future.result()
+    while pending:
+        done, future = pending.popleft()
+        yield done, future.result()
+
+
+# -----------------------------
+# Per-month tables
+# -----------------------------
+def score_month(
+    path: str,
+    lexicon: dict,
+    pool: ProcessPoolExecutor | None = None,
+    in_flight: int = 2,
+    chunk_size: int = CHUNK_SIZE,
+) -> dict:
+    """
+    Score one raw month file. Returns post_sentiment (uri, topic, created_at,
+    sentiment, scored_words, engagement) and daily_sentiment (sums per date
+    and topic).
+    """
+    posts, daily = [], []
+    chunks = bluesky_pipeline.iter_unique_chunks(path, chunk_size)
+    for chunk, (compound, hits) in _scored_chunks(chunks, pool, lexicon, in_flight):
+        engagement = (chunk["likes"] + chunk["reposts"] + chunk["replies"]).astype("int32")
+        weight = 1.0 + np.log1p(engagement.to_numpy(dtype=np.float64))
+        frame = pd.DataFrame({
+            "uri": chunk["uri"],
+            "topic": chunk["topic"],
+            "created_at": chunk["created_at"],
+            "sentiment": compound,
+            "scored_words": hits,
+            "engagement": engagement,
+        })
+        posts.append(frame)
+        daily.append(
+            pd.DataFrame({
+                "date": chunk["created_at"].dt.tz_convert(None).dt.normalize(),
+                "topic": chunk["topic"],
+                "posts": 1,
+                "scored": hits > 0,
+                "positive": compound >= THRESHOLD,
+                "negative": compound <= -THRESHOLD,
+                "sentiment_sum": compound.astype(np.float64),
+                "weight_sum": weight,
+                "weighted_sum": weight * compound,
+            }).groupby(["date", "topic"], observed=True).sum()
+        )
+
+    if not posts:
+        return {"post_sentiment": pd.DataFrame(columns=POST_COLUMNS),
+                "daily_sentiment": pd.DataFrame(columns=["date", "topic", *SUM_COLUMNS])}
+    daily = pd.concat(daily).groupby(level=["date", "topic"], observed=True).sum().reset_index()
+    return {"post_sentiment": pd.concat(posts, ignore_index=True), "daily_sentiment": daily}
+
+
+def update_months(
+    raw_dir: str = bluesky_pipeline.RAW_DIR,
+    derived_dir: str = DERIVED_DIR,
+    lexicon_path: str | None = None,
+    workers: int | None = 1,
+    force: bool = False,
+) -> list:
+    """
+    Score only the raw month files (or lexicon) that changed, and drop the
+    tables of months whose raw file was deleted. Returns the months rescored
+    or removed.
+    """
+    manifest_path = os.path.join(derived_dir, MANIFEST_NAME)
+    manifest = read_json(manifest_path, {})
+    lexicon = load_lexicon(lexicon_path)
+    digest = lexicon_digest(lexicon)
+    if manifest.get("_lexicon") != digest:
+        force = True
+    months = manifest.setdefault("months", {})
+
+    paths = sorted(glob.glob(os.path.join(raw_dir, bluesky_pipeline.RAW_PATTERN)))
+    removed = sorted(set(months) - {bluesky_pipeline.month_key_from_path(p) for p in paths})
+    for month in removed:
+        print(f"Removing {month}: {months[month]['source']} is gone")
+        bluesky_pipeline.remove_month(month, ["post_sentiment", "daily_sentiment"], derived_dir)
+        del months[month]
+    todo = []
+    for path in paths:
+        month = bluesky_pipeline.month_key_from_path(path)
+        sha1 = file_hash(path)
+        if force or months.get(month, {}).get("sha1") != sha1:
+            todo.append((month, path, sha1))
+    if not todo:
+        if removed:
+            write_json_atomic(manifest, manifest_path)
+        return removed
+
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(lexicon,)) if workers > 1 else None
+    try:
+        for month, path, sha1 in todo:
+            print(f"Scoring {path}")
+            tables = score_month(path, lexicon, pool, in_flight=2 * workers)
+            bluesky_pipeline.write_month(month, tables, derived_dir)
+            posts = tables["post_sentiment"]
+            months[month] = {
+                "source": os.path.basename(path),
+                "sha1": sha1,
+                "built_at": datetime.now().isoformat(timespec="seconds"),
+                "posts": len(posts),
+                "scored": int((posts["scored_words"] > 0).sum()),
+            }
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    manifest["_lexicon"] = digest
+    write_json_atomic(manifest, manifest_path)
+    return removed + [month for month, _, _ in todo]
+
+
+# -----------------------------
+# Daily view
+# -----------------------------
+def write_view(derived_dir: str = DERIVED_DIR, view_path: str = VIEW_PATH) -> pd.DataFrame:
+    """Every month's daily sums in one (date, topic) table."""
+    daily = bluesky_pipeline.read_months("daily_sentiment", derived_dir)
+    if daily.empty:
+        daily = pd.DataFrame(columns=["date", "topic", *SUM_COLUMNS])
+    else:
+        daily = daily.groupby(["date", "topic"], as_index=False, observed=True)[SUM_COLUMNS].sum()
+    daily = daily.astype({"topic": "category", "posts": "int32", "scored": "int32", "positive": "int32",
+                          "negative": "int32"})
+    daily = daily.sort_values(["topic", "date"], ignore_index=True)
+    os.makedirs(os.path.dirname(view_path) or ".", exist_ok=True)
+    daily.to_parquet(view_path + ".tmp", index=False)
+    os.replace(view_path + ".tmp", view_path)
+    return daily
+
+
+def load_view(path: str = VIEW_PATH) -> pd.DataFrame:
+    return pd.read_parquet(path).astype({"topic": "category"})
+
+
+def sentiment_series(view: pd.DataFrame, topic: str, freq: str = "W-SAT") -> pd.DataFrame:
+    """
+    A topic's sentiment over time: date, posts, sentiment (mean),
+    weighted_sentiment (engagement-weighted mean), positive_share,
+    negative_share. The default freq buckets days into the trends'
+    Sunday-labelled weeks; "D" keeps days.
+    """
+    rows = view[view["topic"] == topic]
+    week = pd.to_datetime(rows["date"]).dt.to_period(freq).dt.start_time
+    sums = rows.assign(date=week).groupby("date")[SUM_COLUMNS].sum()
+    out = pd.DataFrame({
+        "posts": sums["posts"].astype("int64"),
+        "sentiment": sums["sentiment_sum"] / sums["posts"],
+        "weighted_sentiment": sums["weighted_sum"] / sums["weight_sum"],
+        "positive_share": sums["positive"] / sums["posts"],
+        "negative_share": sums["negative"] / sums["posts"],
+    }).round(4)
+    return out.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BlueSky post sentiment and daily engagement-weighted sentiment")
+    parser.add_argument("--force", action="store_true", help="rescore every month, not just changed ones")
+    parser.add_argument("--workers", type=int, default=None, help="scoring processes (default: CPU count)")
+    parser.add_argument("--lexicon", default=None, help="vader_lexicon.txt or word,valence CSV instead of the built-in")
+    parser.add_argument("--score", nargs="+", default=None, help="just print the scores of these texts")
+    args = parser.parse_args()
+
+    if args.score:
+        compound, hits = score_texts(args.score, load_lexicon(args.lexicon))
+        for text, c, h in zip(args.score, compound, hits):
+            print(f"{c:+.3f}  ({h} words)  {text}")
+        return
+
+    rescored = update_months(lexicon_path=args.lexicon, workers=args.workers, force=args.force)
+    print(f"Rescored or removed months: {', '.join(rescored) if rescored else 'none'}")
+    if rescored or not os.path.exists(VIEW_PATH):
+        view = write_view()
+        print(f"{len(view)} (date, topic) rows from {int(view['posts'].sum()):,} posts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+Near-real-time BlueSky ingestion.
+
+    python bluesky_stream.py                                   # poll search every 60s
+    python bluesky_stream.py --keywords "HS2,Sizewell C" --interval 30
+    python bluesky_stream.py --replay "data/blue_sky/monthly_raw_2025_*.csv" \\
+        --speed 86400 --out-dir data/blue_sky/replay           # a day per second
+
+Posts are folded one at a time into tumbling month windows holding daily
+counts, per-topic totals, distinct authors and a top-k heap per topic; the
+same tables bluesky_pipeline.aggregate_month builds from a whole file. A
+window starts from the month's stored tables, so streamed posts add to a
+batch-built month instead of replacing it, and a (post, topic) pair the
+store already counted (in its raw dump, or streamed by an earlier run) is
+skipped; a post found by two keywords counts once for each topic, as in the
+batch build. Open windows are flushed to the per-month store every
+--flush-every seconds and the dashboard outputs are rebuilt from it, so the
+app picks up new posts without any raw dump. A month is closed (flushed once
+more and dropped from memory) when posts more than --lateness past its end
+arrive, so memory holds only the open months' counts, heaps and post keys,
+and the authors seen since the last flush. Rebuilding a month from its raw
+file drops what was streamed into it (see bluesky_pipeline.STREAM_TABLES).
+"""
+import argparse
+import glob
+import os
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import pandas as pd
+
+import bluesky_pipeline
+from bluesky_pipeline import POST_COLUMNS, TOP_K, TOP_POST_COLUMNS
+from io_utils import read_json
+
+SEARCH_URL = "https://public.api.bsky.app/xrpc/app.bsky.feed.searchPosts"
+KEYWORDS = ["HS2", "Sizewell C", "New Hospital Programme"]
+FLUSH_EVERY = 60.0
+LATENESS = timedelta(hours=6)
+# Pages of search results fetched per keyword per poll
+MAX_PAGES = 10
+TOTALS = [
+    "total_posts", "total_likes", "total_reposts", "total_replies",
+    "posts_with_media", "first_post_at", "last_post_at",
+]
+
+
+# -----------------------------
+# Windows
+# -----------------------------
+class MonthWindow:
+    """
+    Running aggregates for one calendar month, seeded from whatever the month
+    store already holds for it (a batch build or an earlier stream), so a
+    flush adds to the stored month rather than replacing it. `seen` holds the
+    (uri, topic) of every post the month already counts: raw_path's and the
+    stored stream_posts, plus new ones. Distinct authors and new post keys
+    are only held since the last flush and merged with the stored tables
+    when written.
+    """
+
+    def __init__(self, month: str, derived_dir: str, top_k: int = TOP_K, raw_path: str | None = None):
+        self.month = month
+        self.derived_dir = derived_dir
+        self.top_k = top_k
+        self.daily = defaultdict(int)
+        self.totals = {}
+        self.new_authors = defaultdict(set)
+        self.seen = set()
+        self.new_keys = []
+        self.heaps = defaultdict(list)
+        self.day_heaps = defaultdict(list)
+        self.end = pd.Timestamp(month.replace("_", "-") + "-01", tz="UTC") + pd.offsets.MonthBegin(1)
+        self._seed(raw_path)
+
+    def _stored(self, name: str) -> pd.DataFrame:
+        return bluesky_pipeline.read_month(self.month, name, self.derived_dir)
+
+    def _seed(self, raw_path: str | None) -> None:
+        if raw_path and os.path.exists(raw_path):
+            for chunk in bluesky_pipeline.iter_raw_chunks(raw_path):
+                self.seen.update(zip(chunk["uri"].tolist(), chunk["topic"].astype(str).tolist()))
+        streamed = self._stored("stream_posts")
+        if not streamed.empty:
+            self.seen.update(zip(streamed["uri"].tolist(), streamed["topic"].astype(str).tolist()))
+        for rec in self._stored("daily_counts").to_dict("records"):
+            self.daily[(rec["date"], str(rec["topic"]))] += int(rec["posts"])
+        for rec in self._stored("summary").to_dict("records"):
+            self.totals[str(rec["topic"])] = {c: rec[c] for c in TOTALS}
+        for rec in self._stored("top_posts").to_dict("records"):
+            rec = {c: rec[c] for c in TOP_POST_COLUMNS} | {"topic": str(rec["topic"])}
+            bluesky_pipeline.push_top(self.heaps[rec["topic"]], bluesky_pipeline.rank_item(rec), self.top_k)
+        for rec in self._stored("daily_top_posts").to_dict("records"):
+            rec = {c: rec[c] for c in ["date"] + TOP_POST_COLUMNS} | {"topic": str(rec["topic"])}
+            heap = self.day_heaps[(rec["date"], rec["topic"])]
+            bluesky_pipeline.push_top(heap, bluesky_pipeline.rank_item(rec), bluesky_pipeline.DAY_K)
+
+    def add(self, post: dict) -> bool:
+        """Fold a post in; False if the month already counts it for its topic."""
+        topic = post["topic"]
+        key = (post["uri"], topic)
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        self.new_keys.append(key)
+        created = post["created_at"]
+        day = created.tz_convert(None).normalize()
+        self.daily[(day, topic)] += 1
+
+        t = self.totals.get(topic)
+        if t is None:
+            t = self.totals[topic] = {
+                "total_posts": 0, "total_likes": 0, "total_reposts": 0, "total_replies": 0,
+                "posts_with_media": 0, "first_post_at": created, "last_post_at": created,
+            }
+        t["total_posts"] += 1
+        t["total_likes"] += post["likes"]
+        t["total_reposts"] += post["reposts"]
+        t["total_replies"] += post["replies"]
+        t["posts_with_media"] += int(post["has_media"])
+        t["first_post_at"] = min(t["first_post_at"], created)
+        t["last_post_at"] = max(t["last_post_at"], created)
+        if post.get("author"):
+            self.new_authors[topic].add(post["author"])
+
+        engagement = post["likes"] + post["reposts"] + post["replies"]
+        rec = {c: post[c] for c in POST_COLUMNS} | {"topic": topic, "engagement": engagement}
+        bluesky_pipeline.push_top(self.heaps[topic], bluesky_pipeline.rank_item(rec), self.top_k)
+        item = bluesky_pipeline.rank_item(rec | {"date": day})
+        bluesky_pipeline.push_top(self.day_heaps[(day, topic)], item, bluesky_pipeline.DAY_K)
+        return True
+
+    def tables(self) -> dict:
+        """
+        The month's tables in bluesky_pipeline.aggregate_month's layout, plus
+        the (uri, topic) of the posts streamed into it, so a restart doesn't
+        count them twice.
+        """
+        label = self.month.replace("_", "-")
+        authors = defaultdict(set)
+        stored = self._stored("authors")
+        if not stored.empty:
+            for t, a in stored[["topic", "author"]].itertuples(index=False):
+                authors[str(t)].add(a)
+        for t, names in self.new_authors.items():
+            authors[t] |= names
+
+        daily = pd.DataFrame(
+            [(d, t, n) for (d, t), n in sorted(self.daily.items())], columns=["date", "topic", "posts"]
+        )
+        summary = pd.DataFrame([{"month": label, "topic": t, **v} for t, v in sorted(self.totals.items())])
+        if not summary.empty:
+            summary["unique_authors"] = [len(authors[t]) for t in summary["topic"]]
+        top_posts = bluesky_pipeline.heap_table(self.heaps, TOP_POST_COLUMNS)
+        top_posts.insert(0, "month", label)
+        daily_top_posts = bluesky_pipeline.heap_table(self.day_heaps, ["date"] + TOP_POST_COLUMNS)
+        streamed = pd.concat(
+            [self._stored("stream_posts"), pd.DataFrame(self.new_keys, columns=["uri", "topic"])], ignore_index=True
+        )
+        return {
+            "daily_counts": daily,
+            "summary": summary,
+            "top_posts": top_posts,
+            "daily_top_posts": daily_top_posts,
+            "authors": pd.DataFrame(
+                [(label, t, a) for t in sorted(authors) for a in sorted(authors[t])],
+                columns=["month", "topic", "author"],
+            ),
+            "stream_posts": streamed.astype({"uri": "string", "topic": "string"}),
+        }
+
+    def flushed(self) -> None:
+        """Drop the per-flush deltas once tables() has been written."""
+        self.new_authors.clear()
+        self.new_keys.clear()
+
+
+class StreamAggregator:
+    """Routes posts into month windows and persists them for the map app."""
+
+    def __init__(
+        self,
+        top_k: int = TOP_K,
+        lateness: timedelta = LATENESS,
+        out_dir: str = bluesky_pipeline.RAW_DIR,
+        derived_dir: str = bluesky_pipeline.DERIVED_DIR,
+        top_posts_csv: str = bluesky_pipeline.TOP_POSTS_CSV,
+        flush_every: float = FLUSH_EVERY,
+    ):
+        self.top_k = top_k
+        self.lateness = lateness
+        self.out_dir = out_dir
+        self.derived_dir = derived_dir
+        self.top_posts_csv = top_posts_csv
+        self.flush_every = flush_every
+        self.windows = {}
+        self.closed = set()
+        self.dirty = set()
+        self.watermark = None
+        self.stats = {"posts": 0, "duplicates": 0, "late": 0, "flushes": 0}
+        self._last_flush = time.monotonic()
+
+    def add(self, post: dict) -> None:
+        month = post["created_at"].strftime("%Y_%m")
+        if month in self.closed:
+            self.stats["late"] += 1
+            return
+        window = self.windows.get(month) or self._open(month)
+        if not window.add(post):
+            self.stats["duplicates"] += 1
+            return
+        self.dirty.add(month)
+        self.stats["posts"] += 1
+
+        if self.watermark is None or post["created_at"] > self.watermark:
+            self.watermark = post["created_at"]
+            self._close_finished()
+        if time.monotonic() - self._last_flush >= self.flush_every:
+            self.flush()
+
+    def _open(self, month: str) -> MonthWindow:
+        """A window for month, seeded from the store and the month's raw dump, if it has one."""
+        source = read_json(os.path.join(self.derived_dir, "manifest.json"), {}).get(month, {}).get("source")
+        raw_path = os.path.join(self.out_dir, source) if source else None
+        window = self.windows[month] = MonthWindow(month, self.derived_dir, self.top_k, raw_path)
+        return window
+
+    def _close_finished(self) -> None:
+        finished = [m for m, w in self.windows.items() if w.end + self.lateness <= self.watermark]
+        if finished:
+            self.flush()
+            for month in finished:
+                del self.windows[month]
+                self.closed.add(month)
+
+    def flush(self) -> None:
+        """Write every changed window to the month store and rebuild the outputs."""
+        self._last_flush = time.monotonic()
+        if not self.dirty:
+            return
+        for month in sorted(self.dirty):
+            window = self.windows[month]
+            bluesky_pipeline.write_month(month, window.tables(), self.derived_dir)
+            window.flushed()
+        self.dirty.clear()
+        bluesky_pipeline.write_outputs(self.out_dir, self.derived_dir, self.top_posts_csv)
+        self.stats["flushes"] += 1
+
+
+# -----------------------------
+# Feeds
+# -----------------------------
+def replay(paths: list, speed: float = 0.0):
+    """
+    The monthly raw dumps as a post stream in created_at order. speed is the
+    time acceleration (86400 = one day per second); 0 replays flat out.
+    """
+    prev = None
+    for path in sorted(paths):
+        month = pd.concat(bluesky_pipeline.iter_raw_chunks(path), ignore_index=True).sort_values("created_at", kind="stable")
+        for rec in month.to_dict("records"):
+            if speed and prev is not None:
+                gap = (rec["created_at"] - prev).total_seconds() / speed
+                if gap > 0:
+                    time.sleep(min(gap, 5.0))
+            prev = rec["created_at"]
+            rec["topic"] = str(rec["topic"])
+            yield rec
+
+
+def _search_post(item: dict, keyword: str) -> dict:
+    record = item.get("record") or {}
+    embed = (item.get("embed") or {}).get("$type", "")
+    return {
+        "uri": item["uri"],
+        "author": (item.get("author") or {}).get("handle"),
+        "text": record.get("text", ""),
+        "created_at": pd.Timestamp(record.get("createdAt") or item.get("indexedAt")).tz_convert("UTC"),
+        "likes": int(item.get("likeCount") or 0),
+        "reposts": int(item.get("repostCount") or 0),
+        "replies": int(item.get("replyCount") or 0),
+        "has_media": "images" in embed or "video" in embed,
+        "topic": keyword,
+    }
+
+
+def poll_search(keywords: list, interval: float = 60.0, session=None, max_pages: int = MAX_PAGES):
+    """
+    New posts for each keyword from the public search API, polled forever.
+    Each poll follows the result cursor back to the previous poll's newest
+    post, up to max_pages pages.
+    """
+    import requests
+
+    session = session or requests.Session()
+    since = {k: None for k in keywords}
+    while True:
+        for keyword in keywords:
+            posts, cursor = [], None
+            for _ in range(max_pages):
+                params = {"q": keyword, "sort": "latest", "limit": 100}
+                if since[keyword]:
+                    params["since"] = since[keyword]
+                if cursor:
+                    params["cursor"] = cursor
+                try:
+                    resp = session.get(SEARCH_URL, params=params, timeout=30)
+                    resp.raise_for_status()
+                except requests.RequestException as e:
+                    print(f"Search for {keyword!r} failed: {e}")
+                    break
+                body = resp.json()
+                page = body.get("posts", [])
+                posts += [_search_post(p, keyword) for p in page]
+                cursor = body.get("cursor")
+                if not page or not cursor:
+                    break
+            for post in sorted(posts, key=lambda p: p["created_at"]):
+                yield post
+            if posts:
+                since[keyword] = max(p["created_at"] for p in posts).isoformat().replace("+00:00", "Z")
+        time.sleep(interval)
+
+
+def run(feed, aggregator: StreamAggregator, report_every: int = 10_000) -> dict:
+    try:
+        for i, post in enumerate(feed, 1):
+            aggregator.add(post)
+            if i % report_every == 0:
+                print(f"{i:,} posts seen, watermark {aggregator.watermark}, {aggregator.stats}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        aggregator.flush()
+    return aggregator.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream BlueSky posts into the dashboard's aggregates")
+    parser.add_argument("--keywords", default=",".join(KEYWORDS), help="comma list of keywords to poll")
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between search polls")
+    parser.add_argument("--replay", default=None, help="glob of monthly_raw files to replay instead of polling")
+    parser.add_argument("--speed", type=float, default=0.0, help="replay acceleration; 0 = as fast as possible")
+    parser.add_argument("--out-dir", default=bluesky_pipeline.RAW_DIR, help="where the dashboard outputs go")
+    parser.add_argument("--flush-every", type=float, default=FLUSH_EVERY, help="seconds between flushes")
+    parser.add_argument("--lateness", type=float, default=LATENESS.total_seconds() / 3600, help="hours")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    args = parser.parse_args()
+
+    # Replays into a separate directory keep the real month store untouched
+    live = args.out_dir == bluesky_pipeline.RAW_DIR
+    aggregator = StreamAggregator(
+        top_k=args.top_k,
+        lateness=timedelta(hours=args.lateness),
+        out_dir=args.out_dir,
+        derived_dir=bluesky_pipeline.DERIVED_DIR if live else os.path.join(args.out_dir, "derived"),
+        top_posts_csv=bluesky_pipeline.TOP_POSTS_CSV if live else os.path.join(args.out_dir, "blue_sky_top_posts.csv"),
+        flush_every=args.flush_every,
+    )
+    os.makedirs(args.out_dir, exist_ok=True)
+    if args.replay:
+        feed = replay(glob.glob(args.replay), args.speed)
+    else:
+        feed = poll_search([k for k in args.keywords.split(",") if k], args.interval)
+    print(run(feed, aggregator))
+
+
+if __name__ == "__main__":
+    main()
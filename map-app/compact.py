@@ -0,0 +1,127 @@
+"""
+Compact in-memory layouts for the trends and post frames, and a memory
+report to check them.
+
+    python compact.py                       # trends + top posts as loaded
+    python compact.py --raw "data/blue_sky/monthly_raw_2025_*.csv" --baseline
+
+Repeated labels (topic, region) are categoricals: one small integer code per
+row instead of a Python str. Values are float32 (Google Trends is 0-100 with
+two decimals) and post counts int32. Free text (post text, author, uri) is
+Arrow-backed (bluesky_data / bluesky_pipeline use STRING), so a column is
+two contiguous buffers rather than a pointer to a Python object per row.
+--baseline loads the same files with the old object/float64 layout for
+comparison.
+"""
+import argparse
+import glob
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+
+    STRING = "string[pyarrow]"
+except ImportError:  # pragma: no cover - parquet needs pyarrow anyway
+    STRING = "string"
+
+TRENDS_DTYPES = {
+    "topic_name": "category",
+    "region": "category",
+    "region_name": "category",
+    "interest_value": "float32",
+}
+
+
+# -----------------------------
+# Layouts
+# -----------------------------
+def compact_trends(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype({c: t for c, t in TRENDS_DTYPES.items() if c in df.columns})
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def _nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def memory_report(frames: dict) -> pd.DataFrame:
+    """
+    One row per named frame plus a total: rows, mb (strings included),
+    bytes_per_row. A value may also be a list of frames (e.g. per-topic
+    slices), reported as one.
+    """
+    rows = []
+    for name, df in frames.items():
+        parts = df if isinstance(df, list) else [df]
+        n_rows, n_bytes = sum(len(f) for f in parts), sum(_nbytes(f) for f in parts)
+        rows.append({"frame": name, "rows": n_rows, "bytes": n_bytes})
+    if rows:
+        rows.append({"frame": "total", "rows": sum(r["rows"] for r in rows), "bytes": sum(r["bytes"] for r in rows)})
+    report = pd.DataFrame(rows, columns=["frame", "rows", "bytes"])
+    report["mb"] = (report["bytes"] / 1e6).round(3)
+    report["bytes_per_row"] = (report["bytes"] / report["rows"].clip(lower=1)).round(1)
+    return report.drop(columns="bytes")
+
+
+def column_memory(df: pd.DataFrame) -> pd.DataFrame:
+    """Bytes per column, largest first, for finding what a frame spends memory on."""
+    usage = df.memory_usage(index=False, deep=True)
+    return pd.DataFrame({
+        "column": usage.index,
+        "dtype": [str(df[c].dtype) for c in usage.index],
+        "mb": (usage.to_numpy() / 1e6).round(3),
+    }).sort_values("mb", ascending=False, ignore_index=True)
+
+
+def _baseline(df: pd.DataFrame) -> pd.DataFrame:
+    # The pre-compaction layout: Python str objects and 64-bit numbers
+    out = df.copy()
+    for col in out.columns:
+        if isinstance(out[col].dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(out[col]):
+            out[col] = out[col].astype(str).astype(object)
+        elif pd.api.types.is_float_dtype(out[col]):
+            out[col] = out[col].astype("float64")
+        elif pd.api.types.is_integer_dtype(out[col]):
+            out[col] = out[col].astype("int64")
+    return out
+
+
+def main():
+    import bluesky_data
+    import bluesky_pipeline
+    import map_core
+
+    parser = argparse.ArgumentParser(description="Memory footprint of the dashboard's frames")
+    parser.add_argument("--trends", default="data/combined_google_trends_data.parquet")
+    parser.add_argument("--posts", default=bluesky_data.TOP_POSTS_PATH)
+    parser.add_argument("--raw", default=None, help="glob of monthly_raw files to include")
+    parser.add_argument("--baseline", action="store_true", help="also report the object/float64 layout")
+    parser.add_argument("--columns", action="store_true", help="per-column breakdown")
+    args = parser.parse_args()
+
+    frames = {
+        "trends": map_core.read_csv(args.trends),
+        "top_posts": bluesky_data.load_top_posts(args.posts),
+    }
+    if args.raw:
+        frames["raw_posts"] = pd.concat(
+            [chunk for path in sorted(glob.glob(args.raw)) for chunk in bluesky_pipeline.iter_raw_chunks(path)],
+            ignore_index=True,
+        )
+
+    report = memory_report(frames)
+    if args.baseline:
+        base = memory_report({name: _baseline(df) for name, df in frames.items()})
+        report["baseline_mb"] = base["mb"]
+        report["saving"] = (base["mb"] / report["mb"]).round(1)
+    print(report.to_string(index=False))
+    if args.columns:
+        for name, df in frames.items():
+            print(f"\n{name}\n{column_memory(df).to_string(index=False)}")
+
+
+if __name__ == "__main__":
+    main()
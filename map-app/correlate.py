@@ -0,0 +1,293 @@
+"""
+Cross-source correlation and lead/lag between Google Trends, BlueSky, news
+and Hansard.
+
+    python correlate.py --a hansard --b trends              # weekly, +/- 8 weeks
+    python correlate.py --a bluesky --b trends --freq D --max-lag 14 --window 90
+
+Every source is reduced to one activity series per (topic, period) and put
+on a shared time axis as a (topics x periods) array. Aligned arrays are
+cached in data/cache keyed by the input files' hashes, so repeat questions
+only pay for the FFT. A positive lag means source A moves first.
+"""
+import argparse
+import glob
+import hashlib
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+import trends_combine
+from io_utils import file_hash
+
+CACHE_DIR = "data/cache"
+BLUESKY_DAILY = "data/blue_sky/derived/daily_counts.parquet"
+BLUESKY_ANNUAL_GLOB = "data/blue_sky/annual_daily_counts_*.csv"
+NEWS_PATH = "../news_articles.csv"
+HANSARD_PATH = "../hansard/hansard.csv"
+
+# Google Trends weeks run Sunday-Saturday, labelled by the Sunday
+PERIOD_ALIASES = {"W": "W-SAT"}
+
+# Search terms / spellings per dashboard topic, for text sources
+TOPIC_TERMS = {
+    "HS2": ["HS2", "High Speed 2", "High Speed Two"],
+    "Sizewell C": ["Sizewell"],
+    "New Hospital Programme": ["New Hospital Programme", "New Hospitals Programme"],
+}
+
+
+def canonical_topic(name: str) -> str | None:
+    name = str(name)
+    for topic, terms in TOPIC_TERMS.items():
+        if name == topic or any(t.lower() in name.lower() for t in terms):
+            return topic
+    return None
+
+
+# -----------------------------
+# Sources: each returns long (topic, date, value) at daily or native resolution
+# -----------------------------
+def load_trends(path: str = trends_combine.OUTPUT_PATH) -> pd.DataFrame:
+    """National search interest: the mean over regions per programme and week."""
+    df = pd.read_parquet(path)
+    out = df.groupby(["Program", "date"], observed=True, as_index=False)["value"].mean()
+    return out.rename(columns={"Program": "topic"})
+
+
+def bluesky_paths() -> list:
+    return [BLUESKY_DAILY] if os.path.exists(BLUESKY_DAILY) else sorted(glob.glob(BLUESKY_ANNUAL_GLOB))
+
+
+def load_bluesky(paths: list | None = None) -> pd.DataFrame:
+    """Posts per topic per day, from the pipeline's daily counts."""
+    paths = paths or bluesky_paths()
+    if paths and paths[0].endswith(".parquet"):
+        df = pd.read_parquet(paths[0])
+    else:
+        wide = pd.concat([pd.read_csv(p, parse_dates=["date"]) for p in paths], ignore_index=True)
+        df = wide.melt(id_vars=["date"], var_name="topic", value_name="posts")
+    return df.rename(columns={"posts": "value"})[["topic", "date", "value"]]
+
+
+def load_news(path: str = NEWS_PATH) -> pd.DataFrame:
+    """Articles per topic per day (newsapi.py's news_articles.csv)."""
+    df = pd.read_csv(path, usecols=["publishedAt", "search_query"])
+    df["topic"] = df["search_query"].map(canonical_topic)
+    df["date"] = pd.to_datetime(df["publishedAt"], errors="coerce", utc=True).dt.tz_localize(None).dt.normalize()
+    df = df.dropna(subset=["topic", "date"])
+    return df.groupby(["topic", "date"], as_index=False).size().rename(columns={"size": "value"})
+
+
+def load_hansard(path: str = HANSARD_PATH) -> pd.DataFrame:
+    """
+    Commons speeches mentioning each topic per sitting day. The date comes
+    from the speech id (uk.org.publicwhip/debate/2025-01-08a.123.4).
+    """
+    df = pd.read_csv(path, usecols=["id", "data"])
+    df["date"] = pd.to_datetime(df["id"].str.extract(r"(\d{4}-\d{2}-\d{2})")[0], errors="coerce")
+    text = df["data"].fillna("")
+    frames = []
+    for topic, terms in TOPIC_TERMS.items():
+        pattern = "|".join(re.escape(t) for t in terms)
+        hit = text.str.contains(pattern, case=False, regex=True)
+        counts = df.loc[hit].groupby("date").size()
+        frames.append(pd.DataFrame({"topic": topic, "date": counts.index, "value": counts.to_numpy()}))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["topic", "date", "value"])
+
+
+SOURCES = {
+    "trends": (load_trends, lambda: [trends_combine.OUTPUT_PATH]),
+    "bluesky": (load_bluesky, bluesky_paths),
+    "news": (load_news, lambda: [NEWS_PATH]),
+    "hansard": (load_hansard, lambda: [HANSARD_PATH]),
+}
+# What produces each source's input files
+SOURCE_HINTS = {
+    "trends": "run `python trends_combine.py`",
+    "bluesky": "run `python bluesky_pipeline.py`",
+    "news": "run `python newsapi.py` in the repo root",
+    "hansard": "run `python read_hansard_files.py` in ../hansard",
+}
+
+
+def missing_inputs(sources: list) -> dict:
+    """{source: message} for every source whose input files aren't there."""
+    missing = {}
+    for s in sources:
+        paths = SOURCES[s][1]()
+        absent = [p for p in paths if not os.path.exists(p)]
+        if not paths or absent:
+            missing[s] = f"{s}: {', '.join(absent) or BLUESKY_DAILY} not found; {SOURCE_HINTS[s]} first"
+    return missing
+
+
+# -----------------------------
+# Alignment
+# -----------------------------
+def to_grid(long_df: pd.DataFrame, topics: list, periods: pd.DatetimeIndex, freq: str) -> np.ndarray:
+    """
+    (topics x periods) float array. Counts are summed into each period; a
+    period with no rows is 0 for count sources and NaN for trends (which
+    has a row for every week it covers).
+    """
+    df = long_df.copy()
+    df["topic"] = df["topic"].astype(str).map(lambda t: canonical_topic(t) or t)
+    df["period"] = df["date"].dt.to_period(PERIOD_ALIASES.get(freq, freq)).dt.start_time
+    grid = df.pivot_table(index="topic", columns="period", values="value", aggfunc="sum", observed=True)
+    return grid.reindex(index=topics, columns=periods).to_numpy(dtype=float)
+
+
+def aligned(sources: list, freq: str = "W", cache_dir: str = CACHE_DIR) -> tuple[list, pd.DatetimeIndex, dict]:
+    """
+    (topics, periods, {source: array}) on the union of topics and the span
+    covered by every source. Cached on disk per (inputs, freq).
+    """
+    paths = {s: SOURCES[s][1]() for s in sources}
+    h = hashlib.sha1(freq.encode("utf-8"))
+    for s in sorted(sources):
+        for p in paths[s]:
+            h.update(f"{s}:{p}:{file_hash(p)};".encode("utf-8"))
+    cache_path = os.path.join(cache_dir, f"aligned_{h.hexdigest()[:16]}.npz")
+    if os.path.exists(cache_path):
+        z = np.load(cache_path, allow_pickle=False)
+        return list(z["topics"]), pd.DatetimeIndex(z["periods"]), {s: z[s] for s in sources}
+
+    frames = {s: SOURCES[s][0]() for s in sources}
+    counts = {s for s in sources if s != "trends"}
+    topics = sorted(set(TOPIC_TERMS) & set().union(
+        *({canonical_topic(t) or t for t in f["topic"].astype(str).unique()} for f in frames.values())
+    ))
+    # Shared span: where every source has data
+    start = max(f["date"].min() for f in frames.values())
+    end = min(f["date"].max() for f in frames.values())
+    periods = pd.period_range(start, end, freq=PERIOD_ALIASES.get(freq, freq)).start_time
+
+    arrays = {}
+    for s, f in frames.items():
+        grid = to_grid(f, topics, periods, freq)
+        arrays[s] = np.nan_to_num(grid, nan=0.0) if s in counts else grid
+
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(cache_path, topics=np.array(topics), periods=periods.to_numpy(), **arrays)
+    return topics, periods, arrays
+
+
+# -----------------------------
+# Correlation
+# -----------------------------
+def _xcorr_fft(a: np.ndarray, b: np.ndarray, max_lag: int) -> np.ndarray:
+    """sum_t a[t] * b[t + lag] for lag in -max_lag..max_lag, row-wise, via rFFT."""
+    n = a.shape[1]
+    size = 1 << int(np.ceil(np.log2(2 * n - 1)))
+    full = np.fft.irfft(np.conj(np.fft.rfft(a, size)) * np.fft.rfft(b, size), size)
+    return np.concatenate([full[:, size - max_lag:], full[:, :max_lag + 1]], axis=1)
+
+
+def lag_correlations(a: np.ndarray, b: np.ndarray, max_lag: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson correlation of a[t] with b[t + lag] over the periods where both
+    are present, for every row and lag in -max_lag..max_lag, plus the overlap
+    size. Positive lags mean a leads b. Six FFT cross-correlations give all
+    the per-lag sums at once.
+    """
+    ma, mb = np.isfinite(a), np.isfinite(b)
+    # Centre first so the sums stay small
+    a0 = np.where(ma, a - np.nanmean(np.where(ma, a, np.nan), axis=1, keepdims=True), 0.0)
+    b0 = np.where(mb, b - np.nanmean(np.where(mb, b, np.nan), axis=1, keepdims=True), 0.0)
+    ma, mb = ma.astype(float), mb.astype(float)
+    max_lag = min(max_lag, a.shape[1] - 1)
+
+    n = np.rint(_xcorr_fft(ma, mb, max_lag))
+    sa, sb = _xcorr_fft(a0, mb, max_lag), _xcorr_fft(ma, b0, max_lag)
+    saa, sbb = _xcorr_fft(a0 * a0, mb, max_lag), _xcorr_fft(ma, b0 * b0, max_lag)
+    sab = _xcorr_fft(a0, b0, max_lag)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sab - sa * sb / n
+        var = (saa - sa ** 2 / n) * (sbb - sb ** 2 / n)
+        corr = cov / np.sqrt(np.where(var > 1e-12 * np.maximum(saa * sbb, 1e-300), var, np.nan))
+    corr[n < 3] = np.nan
+    return np.clip(corr, -1.0, 1.0), n.astype(int)
+
+
+def rolling_correlation(a: np.ndarray, b: np.ndarray, window: int, lag: int = 0) -> np.ndarray:
+    """
+    Correlation of a[t - lag] with b[t] over a trailing window, row-wise,
+    from cumulative sums (NaN until the window is full).
+    """
+    if lag > 0:
+        a = np.concatenate([np.full((a.shape[0], lag), np.nan), a[:, :-lag]], axis=1)
+    elif lag < 0:
+        b = np.concatenate([np.full((b.shape[0], -lag), np.nan), b[:, :lag]], axis=1)
+    valid = np.isfinite(a) & np.isfinite(b)
+    a0, b0, m = np.where(valid, a, 0.0), np.where(valid, b, 0.0), valid.astype(float)
+
+    def wsum(x):
+        c = np.cumsum(np.pad(x, ((0, 0), (1, 0))), axis=1)
+        return c[:, window:] - c[:, :-window]
+
+    n, sa, sb = wsum(m), wsum(a0), wsum(b0)
+    saa, sbb, sab = wsum(a0 * a0), wsum(b0 * b0), wsum(a0 * b0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sab - sa * sb / n
+        var = (saa - sa ** 2 / n) * (sbb - sb ** 2 / n)
+        r = cov / np.sqrt(var)
+    r[(n < window // 2) | ~np.isfinite(r)] = np.nan
+    return np.concatenate([np.full((a.shape[0], window - 1), np.nan), r], axis=1)
+
+
+def lead_lag(a_name: str, b_name: str, freq: str = "W", max_lag: int = 8) -> pd.DataFrame:
+    """
+    One row per topic: the lag with the strongest correlation between
+    source A and source B, its correlation, the same-period correlation and
+    the overlap. |corr| above 2/sqrt(n) is flagged as notable.
+    """
+    topics, _, arrays = aligned([a_name, b_name], freq)
+    corr, overlap = lag_correlations(arrays[a_name], arrays[b_name], max_lag)
+    half = corr.shape[1] // 2
+    lags = np.arange(-half, half + 1)
+    filled = np.where(np.isfinite(corr), np.abs(corr), -1)
+    best = filled.argmax(axis=1)
+    rows = np.arange(len(topics))
+    n = overlap[rows, best]
+    best_corr = corr[rows, best]
+    return pd.DataFrame({
+        "topic": topics,
+        "best_lag": lags[best],
+        "corr_at_best": best_corr.round(3),
+        "corr_at_0": corr[:, half].round(3),
+        "periods": n,
+        "notable": np.abs(best_corr) > 2 / np.sqrt(np.maximum(n, 1)),
+        "leader": np.where(lags[best] > 0, a_name, np.where(lags[best] < 0, b_name, "same period")),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lead/lag correlation between two data sources")
+    parser.add_argument("--a", choices=list(SOURCES), default="hansard")
+    parser.add_argument("--b", choices=list(SOURCES), default="trends")
+    parser.add_argument("--freq", default="W", help="pandas period alias: D, W or M")
+    parser.add_argument("--max-lag", type=int, default=8, help="in periods")
+    parser.add_argument("--window", type=int, default=None, help="also print the latest rolling correlation")
+    args = parser.parse_args()
+
+    missing = missing_inputs(sorted({args.a, args.b}))
+    if missing:
+        raise SystemExit("Missing input data:\n  " + "\n  ".join(missing.values()))
+    table = lead_lag(args.a, args.b, args.freq, args.max_lag)
+    if args.window:
+        topics, _, arrays = aligned([args.a, args.b], args.freq)
+        lag_by_topic = dict(zip(table["topic"], table["best_lag"]))
+        latest = []
+        for i, t in enumerate(topics):
+            r = rolling_correlation(arrays[args.a][i:i + 1], arrays[args.b][i:i + 1], args.window, lag_by_topic[t])
+            latest.append(r[0, -1])
+        table[f"rolling_{args.window}"] = np.round(latest, 3)
+    print(f"Positive lag: {args.a} leads {args.b} (periods of {args.freq})")
+    print(table.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Static snapshots of the map for every (topic, date, aggregation), for briefings.
+
+    python export_snapshots.py                              # everything, HTML + PNG
+    python export_snapshots.py --topics HS2 --formats html --since 2025-06-01
+    python export_snapshots.py --level region --workers 8
+
+Each snapshot is built the way the app builds the choropleth view
+(DashboardData.region_values + map_core.build_base_map) in a pool of worker
+processes. The HTML files carry no boundary coordinates: every feature's
+geometry is left null and filled in the browser from one shared, simplified
+geometry_<level>.js next to them, so a snapshot is ~30 KB instead of ~400 KB.
+PNGs are drawn with matplotlib from the same simplified boundaries, on one
+figure per worker that is only re-coloured between snapshots.
+
+A manifest keeps the hash of each snapshot's region values; a rerun only
+renders the combinations whose values changed (in practice the newest
+weeks), so the full set is cheap to refresh nightly. index.html browses them.
+"""
+import argparse
+import copy
+import hashlib
+import html
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+from matplotlib.collections import PolyCollection  # noqa: E402
+
+import backend  # noqa: E402
+import geometry  # noqa: E402
+import map_core  # noqa: E402
+from io_utils import read_json, write_json_atomic  # noqa: E402
+
+OUT_DIR = "exports/snapshots"
+FORMATS = ("html", "png")
+TOLERANCE = 0.002
+BATCH_SIZE = 24
+# Bump when the rendering changes so every snapshot is redrawn
+RENDER_VERSION = "1"
+
+# Runs after Leaflet loads: features arrive with a null geometry and get the
+# shared one by code before Leaflet sees them
+GEOMETRY_SHIM = """<script src="{asset}"></script>
+<script>
+(function () {{
+    var addData = L.GeoJSON.prototype.addData;
+    L.GeoJSON.prototype.addData = function (data) {{
+        (data && data.features || []).forEach(function (f) {{
+            if (!f.geometry && f.properties) f.geometry = SNAPSHOT_GEOMETRY[f.properties.code] || null;
+        }});
+        return addData.call(this, data);
+    }};
+}})();
+</script>
+"""
+
+
+def slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", str(text).lower()).strip("-")
+
+
+def snapshot_name(topic: str, day: str, agg: str) -> str:
+    """Path of a snapshot (without extension), relative to the output directory."""
+    return f"{slug(topic)}/{agg}_{day}"
+
+
+def values_digest(region_vals, level: str, formats: tuple) -> str:
+    payload = region_vals[["region", "interest_value"]].round(4).to_csv(index=False)
+    return hashlib.sha1(f"{RENDER_VERSION}|{level}|{','.join(formats)}|{payload}".encode("utf-8")).hexdigest()
+
+
+# -----------------------------
+# Shared geometry
+# -----------------------------
+def split_geometry(geojson: dict) -> tuple[dict, str]:
+    """
+    (the FeatureCollection with null geometries, JS defining SNAPSHOT_GEOMETRY
+    as {code: geometry}) so every snapshot can share one boundary file.
+    """
+    stub = {
+        "type": "FeatureCollection",
+        "features": [{"type": "Feature", "properties": dict(f["properties"]), "geometry": None}
+                     for f in geojson["features"]],
+    }
+    shapes = {f["properties"]["code"]: f["geometry"] for f in geojson["features"]}
+    return stub, "window.SNAPSHOT_GEOMETRY = " + json.dumps(shapes, separators=(",", ":")) + ";\n"
+
+
+def feature_rings(geojson: dict) -> list:
+    """[(code, [ring arrays])] for drawing PNGs."""
+    return [
+        (f["properties"]["code"], [np.asarray(p[0], dtype=float) for p in geometry._polygons(f["geometry"]) if p])
+        for f in geojson["features"]
+    ]
+
+
+# -----------------------------
+# Rendering
+# -----------------------------
+def render_html(stub: dict, region_vals, topic: str, agg: str, day: str, asset: str) -> str:
+    # build_base_map writes tooltip properties into the features
+    m = map_core.build_base_map(copy.deepcopy(stub), region_vals, topic, agg, key_prop="code")
+    title = f"<title>{html.escape(topic)} ({agg}) {day}</title>\n"
+    return m.get_root().render().replace("</head>", title + GEOMETRY_SHIM.format(asset=asset) + "</head>", 1)
+
+
+class PngRenderer:
+    """
+    One matplotlib figure per worker, re-coloured for each snapshot: the
+    boundaries are drawn once and only face colours, scale and title change.
+    """
+
+    def __init__(self, rings: list, cmap: str = "Blues"):
+        self.codes = [code for code, parts in rings for _ in parts]
+        polys = [ring for _, parts in rings for ring in parts]
+        self.cmap = plt.get_cmap(cmap)
+
+        plt.style.use("dark_background")
+        self.fig, ax = plt.subplots(figsize=(5, 6.5), dpi=120)
+        self.fig.patch.set_facecolor("#1a1f3a")
+        ax.set_facecolor("#1a1f3a")
+        self.polys = PolyCollection(polys, edgecolors="#9aa0a6", linewidths=0.3)
+        ax.add_collection(self.polys)
+        ax.autoscale_view()
+        # Equal-distance aspect at UK latitudes
+        ax.set_aspect(1 / np.cos(np.radians(54.5)))
+        ax.set_axis_off()
+        self.title = ax.set_title("", color="#e8eaed", fontsize=10)
+        self.scale = plt.cm.ScalarMappable(cmap=self.cmap)
+        self.fig.colorbar(self.scale, ax=ax, fraction=0.035, pad=0.02)
+
+    def render(self, region_vals, topic: str, agg: str, day: str, path: str) -> None:
+        values = dict(zip(region_vals["region"].astype(str), region_vals["interest_value"].astype(float)))
+        shades = np.array([values.get(code, np.nan) for code in self.codes])
+        finite = shades[np.isfinite(shades)]
+        lo, hi = (finite.min(), finite.max()) if finite.size and finite.min() < finite.max() else (0.0, 100.0)
+        self.scale.set_clim(lo, hi)
+        colors = self.cmap((shades - lo) / (hi - lo))
+        colors[~np.isfinite(shades)] = (1, 1, 1, 0.1)
+        self.polys.set_facecolor(colors)
+        self.title.set_text(f"{topic} ({agg}) — {day}")
+        self.fig.savefig(path, facecolor=self.fig.get_facecolor())
+
+
+# -----------------------------
+# Workers
+# -----------------------------
+_worker = {}
+
+
+def _init_worker(level: str, within: str | None, tolerance: float) -> None:
+    # One dataset per process; the disk caches make this a fraction of a second
+    data = backend.DashboardData()
+    geojson = data.geometry(tolerance, level, within)
+    stub, _ = split_geometry(geojson)
+    _worker.update(data=data, stub=stub, png=PngRenderer(feature_rings(geojson)), level=level, within=within)
+
+
+def _render_batch(jobs: list, out_dir: str, formats: tuple) -> list:
+    data, level, within = _worker["data"], _worker["level"], _worker["within"]
+    done = []
+    for topic, day, agg in jobs:
+        t0 = time.perf_counter()
+        region_vals = data.region_values(topic, day, agg, level, within)
+        name = snapshot_name(topic, day, agg)
+        os.makedirs(os.path.join(out_dir, os.path.dirname(name)), exist_ok=True)
+        if "html" in formats:
+            page = render_html(_worker["stub"], region_vals, topic, agg, day, f"../geometry_{level}.js")
+            with open(os.path.join(out_dir, name + ".html"), "w", encoding="utf-8") as f:
+                f.write(page)
+        if "png" in formats:
+            _worker["png"].render(region_vals, topic, agg, day, os.path.join(out_dir, name + ".png"))
+        done.append((topic, day, agg, time.perf_counter() - t0))
+    return done
+
+
+# -----------------------------
+# Index
+# -----------------------------
+INDEX_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Map snapshots</title>
+<style>
+body {{ background: #0e1117; color: #e8eaed; font-family: sans-serif; margin: 16px; }}
+select, input {{ margin-right: 12px; }}
+iframe {{ width: 100%; height: 80vh; border: 0; margin-top: 12px; }}
+a {{ color: #4da6ff; }}
+</style></head>
+<body>
+<h2>Map snapshots <small>({level}, generated {generated})</small></h2>
+<label>Topic <select id="topic"></select></label>
+<label>Aggregation <select id="agg"></select></label>
+<label>Date <input id="date" type="range" min="0" value="0"> <span id="day"></span></label>
+<a id="png" target="_blank">PNG</a>
+<iframe id="view"></iframe>
+<script>
+var SNAPSHOTS = {entries};
+var topics = [...new Set(SNAPSHOTS.map(s => s.topic))], aggs = [...new Set(SNAPSHOTS.map(s => s.agg))];
+function fill(id, items) {{ var el = document.getElementById(id); items.forEach(v => el.add(new Option(v, v))); }}
+fill("topic", topics); fill("agg", aggs);
+function current() {{
+    var t = document.getElementById("topic").value, a = document.getElementById("agg").value;
+    return SNAPSHOTS.filter(s => s.topic === t && s.agg === a).sort((x, y) => x.date < y.date ? -1 : 1);
+}}
+function show(keepLatest) {{
+    var rows = current(), slider = document.getElementById("date");
+    slider.max = Math.max(rows.length - 1, 0);
+    if (keepLatest) slider.value = slider.max;
+    var s = rows[+slider.value];
+    if (!s) return;
+    document.getElementById("day").textContent = s.date;
+    document.getElementById("view").src = s.html || s.png;
+    var png = document.getElementById("png");
+    png.style.display = s.png ? "" : "none";
+    if (s.png) png.href = s.png;
+}}
+document.getElementById("topic").onchange = () => show(true);
+document.getElementById("agg").onchange = () => show(true);
+document.getElementById("date").oninput = () => show(false);
+show(true);
+</script>
+</body></html>
+"""
+
+
+def write_index(manifest: dict, out_dir: str, level: str) -> None:
+    entries = [
+        {"topic": e["topic"], "agg": e["agg"], "date": e["date"],
+         **{fmt: f"{name}.{fmt}" for fmt in e["formats"]}}
+        for name, e in sorted(manifest["snapshots"].items())
+    ]
+    page = INDEX_TEMPLATE.format(
+        level=level,
+        generated=manifest.get("generated", ""),
+        entries=json.dumps(entries, separators=(",", ":")).replace("</", "<\\/"),
+    )
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(page)
+
+
+# -----------------------------
+# Export
+# -----------------------------
+def export(
+    out_dir: str = OUT_DIR,
+    topics: list | None = None,
+    aggs: list | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    level: str = backend.DEFAULT_LEVEL,
+    within: str | None = None,
+    formats: tuple = FORMATS,
+    workers: int | None = None,
+    tolerance: float = TOLERANCE,
+    force: bool = False,
+) -> dict:
+    """Render every stale snapshot in parallel; returns counts and timings."""
+    t0 = time.perf_counter()
+    data = backend.DashboardData()
+    meta = data.meta()
+    topics = [t for t in meta["topics"] if not topics or t in topics]
+    aggs = [a for a in meta["aggregations"] if not aggs or a in aggs]
+    dates = [d for d in meta["dates"] if (not since or d >= since) and (not until or d <= until)]
+
+    os.makedirs(out_dir, exist_ok=True)
+    _, asset = split_geometry(data.geometry(tolerance, level, within))
+    with open(os.path.join(out_dir, f"geometry_{level}.js"), "w", encoding="utf-8") as f:
+        f.write(asset)
+
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    manifest = read_json(manifest_path, {})
+    if manifest.get("level") != level or manifest.get("within") != within:
+        manifest = {}
+    snapshots = manifest.setdefault("snapshots", {})
+
+    # Values are a binary search each, so deciding what is stale is cheap
+    stale, digests = [], {}
+    for topic in topics:
+        for agg in aggs:
+            for day in dates:
+                region_vals = data.region_values(topic, day, agg, level, within)
+                if region_vals.empty:
+                    continue
+                name = snapshot_name(topic, day, agg)
+                digest = values_digest(region_vals, level, formats)
+                on_disk = all(os.path.exists(os.path.join(out_dir, f"{name}.{fmt}")) for fmt in formats)
+                if not force and on_disk and snapshots.get(name, {}).get("sha1") == digest:
+                    continue
+                stale.append((topic, day, agg))
+                digests[name] = digest
+
+    render_seconds = []
+    try:
+        if stale:
+            batches = [stale[i:i + BATCH_SIZE] for i in range(0, len(stale), BATCH_SIZE)]
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(level, within, tolerance)) as pool:
+                futures = [pool.submit(_render_batch, batch, out_dir, tuple(formats)) for batch in batches]
+                for i, future in enumerate(as_completed(futures), 1):
+                    for topic, day, agg, seconds in future.result():
+                        name = snapshot_name(topic, day, agg)
+                        snapshots[name] = {"topic": topic, "date": day, "agg": agg, "formats": list(formats),
+                                           "sha1": digests[name]}
+                        render_seconds.append(seconds)
+                    print(f"  {i}/{len(batches)} batches")
+    finally:
+        # A failed batch must not cost the ones already rendered their manifest entries
+        manifest.update(level=level, within=within, generated=time.strftime("%Y-%m-%d %H:%M"))
+        write_json_atomic(manifest, manifest_path)
+        write_index(manifest, out_dir, level)
+    return {
+        "snapshots": len(snapshots),
+        "rendered": len(stale),
+        "seconds": round(time.perf_counter() - t0, 2),
+        "render_seconds_median": round(float(np.median(render_seconds)), 4) if render_seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render map snapshots for every topic, date and aggregation")
+    parser.add_argument("--out-dir", default=OUT_DIR)
+    parser.add_argument("--topics", default=None, help="comma list (default: all)")
+    parser.add_argument("--aggs", default=None, help="comma list of mean,sum,latest (default: all)")
+    parser.add_argument("--since", default=None, help="first date, YYYY-MM-DD")
+    parser.add_argument("--until", default=None, help="last date, YYYY-MM-DD")
+    parser.add_argument("--level", default=backend.DEFAULT_LEVEL)
+    parser.add_argument("--within", default=None, help="only regions under this code")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma list of html,png")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="boundary simplification, degrees")
+    parser.add_argument("--force", action="store_true", help="re-render even unchanged snapshots")
+    args = parser.parse_args()
+
+    split = lambda s: [x for x in s.split(",") if x] if s else None  # noqa: E731
+    stats = export(
+        out_dir=args.out_dir,
+        topics=split(args.topics),
+        aggs=split(args.aggs),
+        since=args.since,
+        until=args.until,
+        level=args.level,
+        within=args.within,
+        formats=tuple(split(args.formats)),
+        workers=args.workers,
+        tolerance=args.tolerance,
+        force=args.force,
+    )
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+import json
+import os
+
+import numpy as np
+
+from io_utils import file_hash, write_json_atomic
+
+# Property names that carry the boundary code, in lookup order
+CODE_PROPS = ("CTRY24CD", "RGN24CD", "LAD24CD")
+CACHE_DIR = "data/cache"
+
+
+# -----------------------------
+# Flattening
+# -----------------------------
+def _clean_ring(ring) -> np.ndarray:
+    """Ring as an (n, 2) float array with non-finite / malformed points dropped."""
+    try:
+        arr = np.asarray(ring, dtype=float)
+    except (TypeError, ValueError):
+        # Ragged ring (e.g. mixed 2D/3D points) - fall back to a per-point pass
+        arr = np.array(
+            [p[:2] for p in ring if isinstance(p, (list, tuple)) and len(p) >= 2],
+            dtype=float,
+        )
+    if arr.ndim != 2 or arr.shape[0] == 0 or arr.shape[1] < 2:
+        return np.empty((0, 2))
+    arr = arr[:, :2]
+    arr = arr[np.isfinite(arr).all(axis=1)]
+    # GeoJSON rings are closed; drop the repeated closing vertex
+    if arr.shape[0] > 1 and np.array_equal(arr[0], arr[-1]):
+        arr = arr[:-1]
+    return arr
+
+
+def _polygons(geometry) -> list:
+    gtype = (geometry or {}).get("type")
+    coords = (geometry or {}).get("coordinates") or []
+    if gtype == "Polygon":
+        return [coords]
+    if gtype == "MultiPolygon":
+        return list(coords)
+    # Unknown/unsupported geometry type
+    return []
+
+
+def flatten_features(features: list):
+    """
+    Flatten Polygon/MultiPolygon features into one coordinate array.
+
+    Returns (xy, ring_start, ring_len, ring_feature, ring_poly, ring_sign) where
+    ring_sign is +1 for exterior rings and -1 for holes, and ring_poly is a
+    global polygon index so MultiPolygon parts can be told apart.
+    """
+    parts, starts, lens, feats, polys, signs = [], [], [], [], [], []
+    offset = 0
+    poly_id = 0
+    for fi, feat in enumerate(features):
+        for poly in _polygons(feat.get("geometry")):
+            for ri, ring in enumerate(poly or []):
+                arr = _clean_ring(ring)
+                if arr.shape[0] < 3:
+                    continue
+                parts.append(arr)
+                starts.append(offset)
+                lens.append(arr.shape[0])
+                feats.append(fi)
+                polys.append(poly_id)
+                signs.append(1.0 if ri == 0 else -1.0)
+                offset += arr.shape[0]
+            poly_id += 1
+
+    xy = np.concatenate(parts) if parts else np.empty((0, 2))
+    return (
+        xy,
+        np.asarray(starts, dtype=np.int64),
+        np.asarray(lens, dtype=np.int64),
+        np.asarray(feats, dtype=np.int64),
+        np.asarray(polys, dtype=np.int64),
+        np.asarray(signs, dtype=float),
+    )
+
+
+# -----------------------------
+# Area-weighted centroids (shoelace)
+# -----------------------------
+def _ring_moments(xy, starts, lens, ref):
+    """
+    Twice the signed area and first moments of every ring, in one pass.
+    ref is a per-vertex reference point subtracted for numerical stability.
+    """
+    n = xy.shape[0]
+    if n == 0:
+        return np.empty(0), np.empty(0), np.empty(0)
+
+    # Index of the next vertex, wrapping back to the ring start at the end
+    nxt = np.arange(1, n + 1)
+    nxt[starts + lens - 1] = starts
+
+    p = xy - ref
+    x0, y0 = p[:, 0], p[:, 1]
+    x1, y1 = x0[nxt], y0[nxt]
+    cross = x0 * y1 - x1 * y0
+
+    a2 = np.add.reduceat(cross, starts)
+    mx = np.add.reduceat((x0 + x1) * cross, starts)
+    my = np.add.reduceat((y0 + y1) * cross, starts)
+    return a2, mx, my
+
+
+def compute_centroids(features: list) -> dict:
+    """
+    Area-weighted centroid of every feature, holes subtracted and MultiPolygon
+    parts combined. Returns {"centroid": (n, 2) lon/lat array, "area": (n,)}
+    with NaN rows for features without usable geometry.
+    """
+    n_feat = len(features)
+    xy, starts, lens, ring_feat, _, ring_sign = flatten_features(features)
+    out_c = np.full((n_feat, 2), np.nan)
+    out_a = np.zeros(n_feat)
+    if xy.shape[0] == 0:
+        return {"centroid": out_c, "area": out_a}
+
+    # Shift each feature to its first vertex so the cross products stay small
+    feat_first = np.full((n_feat, 2), np.nan)
+    first_ring = np.unique(ring_feat, return_index=True)
+    feat_first[first_ring[0]] = xy[starts[first_ring[1]]]
+    vert_feat = np.repeat(ring_feat, lens)
+    ref = feat_first[vert_feat]
+
+    a2, mx, my = _ring_moments(xy, starts, lens, ref)
+
+    # Exteriors count positive and holes negative whatever their winding
+    orient = ring_sign * np.sign(a2)
+    f_a2 = np.bincount(ring_feat, weights=orient * a2, minlength=n_feat)
+    f_mx = np.bincount(ring_feat, weights=orient * mx, minlength=n_feat)
+    f_my = np.bincount(ring_feat, weights=orient * my, minlength=n_feat)
+
+    ok = np.abs(f_a2) > 0
+    out_c[ok, 0] = f_mx[ok] / (3.0 * f_a2[ok]) + feat_first[ok, 0]
+    out_c[ok, 1] = f_my[ok] / (3.0 * f_a2[ok]) + feat_first[ok, 1]
+    out_a[ok] = np.abs(f_a2[ok]) / 2.0
+
+    # Degenerate (zero-area) features fall back to the vertex mean
+    has_pts = np.bincount(vert_feat, minlength=n_feat) > 0
+    bad = ~ok & has_pts
+    if bad.any():
+        cnt = np.bincount(vert_feat, minlength=n_feat)
+        sx = np.bincount(vert_feat, weights=xy[:, 0], minlength=n_feat)
+        sy = np.bincount(vert_feat, weights=xy[:, 1], minlength=n_feat)
+        out_c[bad, 0] = sx[bad] / cnt[bad]
+        out_c[bad, 1] = sy[bad] / cnt[bad]
+
+    return {"centroid": out_c, "area": out_a}
+
+
+# -----------------------------
+# Label points
+# -----------------------------
+def ring_area(xy: np.ndarray) -> float:
+    """Unsigned shoelace area of a single ring."""
+    p = xy - xy[0]
+    return abs(float(np.dot(p[:, 0], np.roll(p[:, 1], -1)) - np.dot(np.roll(p[:, 0], -1), p[:, 1]))) / 2.0
+
+
+def points_in_rings(px, py, xy) -> np.ndarray:
+    """Even-odd ray casting of points (px, py) against one closed ring."""
+    x0, y0 = xy[:, 0], xy[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    px = np.asarray(px, dtype=float)[:, None]
+    py = np.asarray(py, dtype=float)[:, None]
+    straddles = (y0 > py) != (y1 > py)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+    return (straddles & (px < x_cross)).sum(axis=1) % 2 == 1
+
+
+def locate_points(points, features: list) -> np.ndarray:
+    """Index of the feature containing each (lon, lat) point, or -1."""
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    xy, starts, lens, ring_feature, _, _ = flatten_features(features)
+    # Even-odd count over every ring of a feature handles holes and multipolygons
+    hits = np.zeros((len(pts), len(features)), dtype=np.int32)
+    for start, n, fi in zip(starts, lens, ring_feature):
+        ring = xy[start:start + n]
+        in_box = (pts >= ring.min(axis=0)).all(axis=1) & (pts <= ring.max(axis=0)).all(axis=1)
+        cand = np.flatnonzero(in_box)
+        if cand.size:
+            hits[cand, fi] += points_in_rings(pts[cand, 0], pts[cand, 1], ring)
+    inside = hits % 2 == 1
+    return np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+
+
+def _polygon_label_point(rings: list, hint) -> tuple:
+    """
+    A point guaranteed to lie inside the polygon. Uses the hint (usually the
+    centroid) when it is inside, otherwise the middle of the widest interior
+    span over a handful of horizontal scanlines.
+    """
+    inside = points_in_rings([hint[0]], [hint[1]], rings[0])[0]
+    for hole in rings[1:]:
+        inside &= ~points_in_rings([hint[0]], [hint[1]], hole)[0]
+    if inside:
+        return float(hint[0]), float(hint[1])
+
+    ext = rings[0]
+    ymin, ymax = ext[:, 1].min(), ext[:, 1].max()
+    # Try the hint latitude first, then a spread of latitudes across the shape
+    ys = np.concatenate([[hint[1]], np.linspace(ymin, ymax, 9)[1:-1]])
+    best, best_w = None, -1.0
+    for y in ys:
+        xs = []
+        for ring in rings:
+            x0, y0 = ring[:, 0], ring[:, 1]
+            x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+            hit = (y0 > y) != (y1 > y)
+            xs.append(x0[hit] + (y - y0[hit]) * (x1[hit] - x0[hit]) / (y1[hit] - y0[hit]))
+        xs = np.sort(np.concatenate(xs))
+        if xs.size < 2:
+            continue
+        # Even-odd: interior spans are [x0, x1], [x2, x3], ...
+        lo, hi = xs[0:-1:2], xs[1::2]
+        widths = hi - lo
+        i = int(np.argmax(widths))
+        if widths[i] > best_w:
+            best_w = float(widths[i])
+            best = (float((lo[i] + hi[i]) / 2.0), float(y))
+    if best is None:
+        return float(hint[0]), float(hint[1])
+    return best
+
+
+def compute_label_points(features: list, centroids: np.ndarray) -> np.ndarray:
+    """
+    Marker/label position per feature: inside the largest polygon part,
+    as close to the area-weighted centroid as is cheap to find.
+    """
+    out = np.full((len(features), 2), np.nan)
+    for fi, feat in enumerate(features):
+        if not np.isfinite(centroids[fi]).all():
+            continue
+        best_rings, best_area = None, -1.0
+        for poly in _polygons(feat.get("geometry")):
+            rings = [r for r in (_clean_ring(ring) for ring in poly or []) if r.shape[0] >= 3]
+            if not rings:
+                continue
+            area = ring_area(rings[0])
+            if area > best_area:
+                best_area = area
+                best_rings = rings
+        if best_rings is None:
+            out[fi] = centroids[fi]
+            continue
+        out[fi] = _polygon_label_point(best_rings, centroids[fi])
+    return out
+
+
+# -----------------------------
+# Region points + per-file cache
+# -----------------------------
+def feature_code(feature) -> str | None:
+    props = feature.get("properties") or {}
+    for key in CODE_PROPS:
+        if props.get(key):
+            return str(props[key])
+    return None
+
+
+def compute_region_points(geojson: dict) -> dict:
+    """
+    {code: {"centroid": (lat, lon), "label": (lat, lon), "area": float}}
+    for every feature with a known boundary code and usable geometry.
+    """
+    features = [f for f in geojson.get("features", []) if feature_code(f)]
+    res = compute_centroids(features)
+    labels = compute_label_points(features, res["centroid"])
+
+    points = {}
+    for i, feat in enumerate(features):
+        lon, lat = res["centroid"][i]
+        if not (np.isfinite(lat) and np.isfinite(lon)):
+            continue
+        llon, llat = labels[i]
+        points[feature_code(feat)] = {
+            "centroid": (float(lat), float(lon)),
+            "label": (float(llat), float(llon)),
+            "area": float(res["area"][i]),
+        }
+    return points
+
+
+def build_region_centroids(geojson: dict) -> dict:
+    """{code: (lat, lon)} area-weighted centroids."""
+    return {code: p["centroid"] for code, p in compute_region_points(geojson).items()}
+
+
+def load_region_points(geojson_path: str, cache_dir: str = CACHE_DIR) -> dict:
+    """
+    compute_region_points for a GeoJSON file, cached on disk by file content
+    hash so a boundary file is only processed once.
+    """
+    digest = file_hash(geojson_path)
+    cache_path = os.path.join(cache_dir, f"region_points_{digest[:16]}.json")
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        return {
+            code: {"centroid": tuple(p["centroid"]), "label": tuple(p["label"]), "area": p["area"]}
+            for code, p in cached.items()
+        }
+
+    with open(geojson_path, "r", encoding="utf-8") as f:
+        geojson = json.load(f)
+    points = compute_region_points(geojson)
+
+    write_json_atomic(points, cache_path)
+    return points
+
+
+# -----------------------------
+# Simplification
+# -----------------------------
+def simplify_ring(xy: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker on one closed ring (closing vertex not repeated). Each
+    split point is found with a vectorised distance over the whole segment.
+    """
+    n = xy.shape[0]
+    if n <= 4 or tolerance <= 0:
+        return xy
+    keep = np.zeros(n + 1, dtype=bool)
+    pts = np.vstack([xy, xy[:1]])
+    keep[0] = keep[n] = True
+    # Split the closed ring at its farthest vertex from the start so the
+    # first segment isn't degenerate
+    far = int(np.argmax(((xy - xy[0]) ** 2).sum(axis=1)))
+    keep[far] = True
+    stack = [(0, far), (far, n)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        a, b = pts[i], pts[j]
+        seg = pts[i + 1:j]
+        ab = b - a
+        denom = float(np.hypot(*ab))
+        if denom == 0.0:
+            d = np.hypot(seg[:, 0] - a[0], seg[:, 1] - a[1])
+        else:
+            d = np.abs(ab[0] * (seg[:, 1] - a[1]) - ab[1] * (seg[:, 0] - a[0])) / denom
+        k = int(np.argmax(d))
+        if d[k] > tolerance:
+            m = i + 1 + k
+            keep[m] = True
+            stack.append((i, m))
+            stack.append((m, j))
+    out = pts[keep][:-1]
+    return out if out.shape[0] >= 3 else xy
+
+
+def simplify_geojson(geojson: dict, tolerance: float, precision: int = 5) -> dict:
+    """
+    Copy of a FeatureCollection with every ring simplified and coordinates
+    rounded, for sending to browsers. Properties are kept as-is.
+    """
+    features = []
+    for feat in geojson.get("features", []):
+        geom = feat.get("geometry") or {}
+        polys = []
+        for poly in _polygons(geom):
+            rings = []
+            for ring in poly or []:
+                arr = _clean_ring(ring)
+                if arr.shape[0] < 3:
+                    continue
+                arr = np.round(simplify_ring(arr, tolerance), precision)
+                rings.append(np.vstack([arr, arr[:1]]).tolist())
+            if rings:
+                polys.append(rings)
+        if not polys:
+            continue
+        if geom.get("type") == "Polygon":
+            new_geom = {"type": "Polygon", "coordinates": polys[0]}
+        else:
+            new_geom = {"type": "MultiPolygon", "coordinates": polys}
+        features.append({"type": "Feature", "properties": dict(feat.get("properties") or {}), "geometry": new_geom})
+    return {"type": "FeatureCollection", "features": features}
@@ -0,0 +1,268 @@
+"""
+Hansard mentions per (topic, date, region): where in the country the MPs
+talking about each programme sit.
+
+    python hansard_regions.py            # only debate files that changed
+    python hansard_regions.py --force    # rebuild every file
+
+Each debates XML (../hansard/scrapedxml/debates, as read by
+read_hansard_files.py) is reduced to speech counts per topic, sitting day
+and boundary code. A speech is placed by its speaker's constituency on that
+day (parlparse people.json), and the constituency by the ONS lookup to its
+region (English constituencies) or country. Per-file parts live under
+data/hansard/derived with a manifest of file hashes, so a new sitting day
+only parses its own file; the view (data/hansard_mentions.parquet) is the
+sum of the parts. Changing people.json or the lookup rebuilds everything.
+"""
+import argparse
+import glob
+import hashlib
+import os
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import pandas as pd
+
+from correlate import TOPIC_TERMS
+from hierarchy import COUNTRY_BY_PREFIX
+from io_utils import file_hash, read_json, write_json_atomic
+
+DEBATES_DIR = "../hansard/scrapedxml/debates"
+PEOPLE_PATH = "../hansard/people.json"
+# ONS "Westminster Parliamentary Constituency to Region" lookups (PCONyyCD,
+# PCONyyNM, RGNyyCD); several vintages can sit side by side
+LOOKUP_GLOB = "data/constituency_lookup*.csv"
+DERIVED_DIR = "data/hansard/derived"
+VIEW_PATH = "data/hansard_mentions.parquet"
+
+VIEW_COLUMNS = ["date", "topic", "region", "mentions"]
+TOPIC_PATTERNS = {t: re.compile("|".join(re.escape(s) for s in terms), re.I) for t, terms in TOPIC_TERMS.items()}
+
+
+def _norm(name: str) -> str:
+    name = str(name).lower().replace("&", " and ")
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", name).split())
+
+
+# -----------------------------
+# Speakers -> constituencies -> boundary codes
+# -----------------------------
+class SpeakerLocator:
+    """Boundary code for a speech's speaker on a given day, or None (Lords, the Chair, unknown)."""
+
+    def __init__(self, people: dict, lookup: pd.DataFrame):
+        areas = {
+            p["id"]: p.get("area", {}).get("name")
+            for p in people.get("posts", [])
+            if p.get("organization_id") == "house-of-commons"
+        }
+        self.by_member = {}
+        self.by_person = {}
+        for m in people.get("memberships", []):
+            area = areas.get(m.get("post_id"))
+            if not area:
+                continue
+            term = (m.get("start_date", "0000-00-00"), m.get("end_date", "9999-12-31"), area)
+            self.by_member[m["id"]] = area
+            self.by_person.setdefault(m.get("person_id"), []).append(term)
+
+        self.codes = {}
+        # English seats the lookup gives no region: placing them on England itself would
+        # stop the roll-up summing England from its regions, so they stay unplaced
+        self.no_region = set()
+        for row in lookup.itertuples(index=False):
+            code = row.region if isinstance(row.region, str) and row.region.strip() else None
+            if code is None and str(row.code).startswith("E"):
+                self.no_region.add(_norm(row.name))
+                continue
+            self.codes[_norm(row.name)] = code or COUNTRY_BY_PREFIX.get(str(row.code)[:1])
+
+    def constituency(self, attrs: dict, day: str) -> str | None:
+        if attrs.get("person_id"):
+            for start, end, area in self.by_person.get(attrs["person_id"], []):
+                if start <= day <= end:
+                    return area
+            return None
+        return self.by_member.get(attrs.get("speakerid"))
+
+    def region(self, attrs: dict, day: str) -> str | None:
+        area = self.constituency(attrs, day)
+        return None if area is None else self.codes.get(_norm(area))
+
+
+def read_lookups(pattern: str = LOOKUP_GLOB) -> pd.DataFrame:
+    """Every constituency lookup as (code, name, region); newer files win on name clashes."""
+    frames = []
+    for path in sorted(glob.glob(pattern)):
+        df = pd.read_csv(path, dtype=str)
+        pick = {
+            key: next((c for c in df.columns if re.fullmatch(rx, c, re.I)), None)
+            for key, rx in {"code": r"PCON\d{2}CD", "name": r"PCON\d{2}NM", "region": r"RGN\d{2}CD"}.items()
+        }
+        if pick["code"] is None or pick["name"] is None:
+            raise ValueError(f"{path}: no PCONyyCD / PCONyyNM columns")
+        if pick["region"] is None and df[pick["code"]].str.startswith("E").any():
+            raise ValueError(f"{path}: English constituencies but no RGNyyCD column")
+        frames.append(pd.DataFrame({
+            "code": df[pick["code"]],
+            "name": df[pick["name"]],
+            "region": df[pick["region"]] if pick["region"] else None,
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["code", "name", "region"])
+    return pd.concat(frames, ignore_index=True).drop_duplicates("name", keep="last")
+
+
+def inputs_digest(people_path: str = PEOPLE_PATH, lookup_glob: str = LOOKUP_GLOB) -> str:
+    h = hashlib.sha1()
+    for path in [people_path, *sorted(glob.glob(lookup_glob))]:
+        h.update(f"{os.path.basename(path)}:{file_hash(path) if os.path.exists(path) else '-'};".encode("utf-8"))
+    return h.hexdigest()
+
+
+# -----------------------------
+# Per-file counts
+# -----------------------------
+def iter_speeches(path: str):
+    """(attributes, full text) per speech, as iter_docs in read_hansard_files.py but with every paragraph."""
+    for _, el in ET.iterparse(path):
+        if el.tag == "speech":
+            yield dict(el.attrib), " ".join("".join(el.itertext()).split())
+            el.clear()
+
+
+def count_file(path: str, locator: SpeakerLocator) -> tuple[pd.DataFrame, dict]:
+    """Speeches mentioning each topic per (date, region) for one debates file, plus counters."""
+    counts = {}
+    stats = {"speeches": 0, "mentions": 0, "unplaced": 0, "no_region": 0}
+    for attrs, text in iter_speeches(path):
+        stats["speeches"] += 1
+        topics = [t for t, rx in TOPIC_PATTERNS.items() if rx.search(text)]
+        if not topics:
+            continue
+        m = re.search(r"\d{4}-\d{2}-\d{2}", attrs.get("id", "")) or re.search(r"\d{4}-\d{2}-\d{2}", path)
+        if m is None:
+            continue
+        day = m.group(0)
+        region = locator.region(attrs, day)
+        stats["mentions"] += len(topics)
+        if region is None:
+            area = locator.constituency(attrs, day)
+            missing = area is not None and _norm(area) in locator.no_region
+            stats["no_region" if missing else "unplaced"] += len(topics)
+            continue
+        for topic in topics:
+            counts[(day, topic, region)] = counts.get((day, topic, region), 0) + 1
+
+    part = pd.DataFrame([(*k, n) for k, n in sorted(counts.items())], columns=VIEW_COLUMNS)
+    part["date"] = pd.to_datetime(part["date"])
+    part["mentions"] = part["mentions"].astype("int32")
+    return part, stats
+
+
+# -----------------------------
+# Parts + view
+# -----------------------------
+def update_parts(
+    debates_dir: str = DEBATES_DIR,
+    derived_dir: str = DERIVED_DIR,
+    people_path: str = PEOPLE_PATH,
+    lookup_glob: str = LOOKUP_GLOB,
+    force: bool = False,
+) -> list:
+    """Recount only debate files whose content changed. Returns the files recounted or dropped."""
+    manifest_path = os.path.join(derived_dir, "manifest.json")
+    manifest = read_json(manifest_path, {})
+    digest = inputs_digest(people_path, lookup_glob)
+    if manifest.get("_inputs") != digest:
+        force = True
+    files = manifest.setdefault("files", {})
+
+    paths = {os.path.basename(p): p for p in sorted(glob.glob(os.path.join(debates_dir, "*.xml")))}
+    # Files that disappeared take their counts with them
+    changed = sorted(set(files) - set(paths))
+    for name in changed:
+        part = os.path.join(derived_dir, name.replace(".xml", ".parquet"))
+        if os.path.exists(part):
+            os.remove(part)
+        del files[name]
+
+    locator = None
+    for name, path in paths.items():
+        sha1 = file_hash(path)
+        if not force and files.get(name, {}).get("sha1") == sha1:
+            continue
+        if locator is None:
+            locator = SpeakerLocator(read_json(people_path, {}), read_lookups(lookup_glob))
+            if locator.no_region:
+                names = sorted(locator.no_region)
+                more = ", ..." if len(names) > 5 else ""
+                print(f"Warning: {len(names)} English constituencies have no region in the lookup: {', '.join(names[:5])}{more}")
+        part, stats = count_file(path, locator)
+        os.makedirs(derived_dir, exist_ok=True)
+        part.to_parquet(os.path.join(derived_dir, name.replace(".xml", ".parquet")), index=False)
+        files[name] = {"sha1": sha1, "built_at": datetime.now().isoformat(timespec="seconds"), **stats}
+        changed.append(name)
+
+    if changed or manifest.get("_inputs") != digest:
+        manifest["_inputs"] = digest
+        write_json_atomic(manifest, manifest_path)
+    return changed
+
+
+def write_view(derived_dir: str = DERIVED_DIR, view_path: str = VIEW_PATH) -> pd.DataFrame:
+    """Sum every per-file part into the (date, topic, region) view."""
+    paths = sorted(glob.glob(os.path.join(derived_dir, "*.parquet")))
+    parts = [pd.read_parquet(p) for p in paths]
+    parts = [p for p in parts if not p.empty]
+    if parts:
+        view = pd.concat(parts, ignore_index=True).groupby(["date", "topic", "region"], as_index=False)["mentions"].sum()
+    else:
+        view = pd.DataFrame(columns=VIEW_COLUMNS)
+    view = view.astype({"topic": "category", "region": "category", "mentions": "int32"})
+    view = view.sort_values(["topic", "date", "region"], ignore_index=True)
+    os.makedirs(os.path.dirname(view_path) or ".", exist_ok=True)
+    view.to_parquet(view_path + ".tmp", index=False)
+    os.replace(view_path + ".tmp", view_path)
+    return view
+
+
+def load_view(path: str = VIEW_PATH, freq: str = "W-SAT") -> pd.DataFrame:
+    """
+    The view as trends-shaped rows (date, topic_name, region, interest_value)
+    bucketed to the trends' Sunday-labelled weeks, so the map's date slider
+    indexes both layers the same way.
+    """
+    view = pd.read_parquet(path)
+    week = pd.to_datetime(view["date"]).dt.to_period(freq).dt.start_time
+    out = (
+        view.assign(date=week)
+        .groupby(["date", "topic", "region"], as_index=False, observed=True)["mentions"].sum()
+        .rename(columns={"topic": "topic_name", "mentions": "interest_value"})
+    )
+    return out.astype({"topic_name": "category", "region": "category", "interest_value": "float32"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hansard topic mentions per region")
+    parser.add_argument("--debates-dir", default=DEBATES_DIR)
+    parser.add_argument("--force", action="store_true", help="recount every file, not just changed ones")
+    args = parser.parse_args()
+
+    changed = update_parts(args.debates_dir, force=args.force)
+    print(f"Recounted {len(changed)} debate files")
+    if changed or not os.path.exists(VIEW_PATH):
+        view = write_view()
+        print(f"{len(view)} (date, topic, region) rows, {int(view['mentions'].sum())} placed mentions")
+    manifest = read_json(os.path.join(DERIVED_DIR, "manifest.json"), {})
+    unplaced = sum(f.get("unplaced", 0) for f in manifest.get("files", {}).values())
+    if unplaced:
+        print(f"{unplaced} mentions by speakers without a constituency (Lords, the Chair, unmatched names)")
+    no_region = sum(f.get("no_region", 0) for f in manifest.get("files", {}).values())
+    if no_region:
+        print(f"Warning: {no_region} mentions left off the map: English constituencies with no region in the lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+
+def build_heatmap_frames(
+    df: pd.DataFrame,
+    centroids: dict,
+    region_codes: dict | None = None,
+    freq: str = "W",
+) -> tuple[list, list]:
+    """
+    Build the HeatMapWithTime payload for one topic in a single vectorised pass.
+
+    df: rows with date, region, interest_value (already filtered to a topic)
+    centroids: {code: (lat, lon)}
+    region_codes: optional {region label: code} for data keyed by name
+    Returns (frames, labels) where each frame is [[lat, lon, weight], ...]
+    with weights normalised to 0-100 within the frame.
+    """
+    if df.empty or not centroids:
+        return [], []
+
+    codes = df["region"].astype(str)
+    if region_codes:
+        codes = codes.map(region_codes).fillna(codes)
+
+    # Group once: mean interest per (period, region)
+    period = df["date"].dt.to_period(freq).dt.start_time
+    w = (
+        pd.DataFrame({"period": period, "code": codes, "value": df["interest_value"]})
+        .groupby(["period", "code"], sort=True, observed=True)["value"]
+        .mean()
+        .reset_index()
+    )
+
+    # Join against the centroid array by position
+    centroid_codes = pd.Index(list(centroids.keys()))
+    latlon = np.asarray(list(centroids.values()), dtype=float)
+    idx = centroid_codes.get_indexer(w["code"])
+    keep = idx >= 0
+    vals = w["value"].to_numpy(dtype=float)
+    keep &= np.isfinite(vals)
+    if not keep.any():
+        return [], []
+    idx = idx[keep]
+    vals = vals[keep]
+    periods = w["period"].to_numpy()[keep]
+
+    # Rows are sorted by period, so each frame is a contiguous block
+    starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+    sizes = np.diff(np.r_[starts, len(vals)])
+
+    # Normalise per frame to 0-100 so the animation contrast stays visible
+    vmin = np.repeat(np.minimum.reduceat(vals, starts), sizes)
+    vmax = np.repeat(np.maximum.reduceat(vals, starts), sizes)
+    span = vmax - vmin
+    weights = np.divide(vals - vmin, span, out=np.zeros_like(vals), where=span > 0) * 100.0
+
+    pts = np.column_stack([latlon[idx], weights])
+    frames = [block.tolist() for block in np.split(pts, starts[1:])]
+    labels = pd.DatetimeIndex(periods[starts]).strftime("%Y-%m-%d").tolist()
+    return frames, labels
@@ -0,0 +1,335 @@
+"""
+Region hierarchy (local authority -> region -> country -> UK) built from the
+boundary GeoJSONs, and the trends data rolled up to every level of it.
+
+    h = load_hierarchy()
+    cube = RollupCube(df, h)
+    cube.values("region", "HS2", date(2025, 12, 1), "mean")
+
+A "level view" shows the finest nodes available at that level: the region
+view is the nine English regions plus Scotland, Wales and Northern Ireland,
+which have no regions of their own. Values are rolled up the tree once, so
+switching resolution or drilling down is an array slice.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import geometry
+from io_utils import file_hash, write_json_atomic
+
+LEVELS = ("lad", "region", "country", "uk")
+LEVEL_PROPS = {
+    "lad": ("LAD24CD", "LAD24NM"),
+    "region": ("RGN24CD", "RGN24NM"),
+    "country": ("CTRY24CD", "CTRY24NM"),
+}
+UK_CODE, UK_NAME = "K02000001", "United Kingdom"
+
+# Boundary file per level; add a "lad" entry when an LA boundary file is available
+BOUNDARY_FILES = {
+    "country": "data/Countries_December_2024_Boundaries_UK_BUC_7315501150803133753 (1).geojson",
+    "region": "data/Regions_December_2024_Boundaries_EN_BUC_4744747487989771477.geojson",
+}
+
+# GSS codes start with their country's letter
+COUNTRY_BY_PREFIX = {"E": "E92000001", "W": "W92000004", "S": "S92000003", "N": "N92000002"}
+
+
+class RegionHierarchy:
+    def __init__(self, codes: list, names: list, levels: list, parents: list):
+        self.codes = list(codes)
+        self.names = list(names)
+        self.levels = np.asarray(levels, dtype=np.int8)
+        self.parent = np.asarray(parents, dtype=np.int64)
+        self.index = {c: i for i, c in enumerate(self.codes)}
+        self._by_name = {str(n).lower(): i for i, n in enumerate(self.names)}
+        self._views = {}
+
+    # -----------------------------
+    # Construction
+    # -----------------------------
+    @classmethod
+    def from_geojson(cls, layers: dict) -> "RegionHierarchy":
+        """
+        layers is {level: FeatureCollection}. Each feature's parent is the
+        feature of the next coarser layer containing its label point, falling
+        back to the country in its GSS code, then to the UK.
+        """
+        codes, names, levels, parents = [UK_CODE], [UK_NAME], [LEVELS.index("uk")], [-1]
+        index = {UK_CODE: 0}
+        coarser = None
+        for level in ("country", "region", "lad"):
+            geojson = layers.get(level)
+            if not geojson:
+                continue
+            code_prop, name_prop = LEVEL_PROPS[level]
+            features = [f for f in geojson.get("features", []) if (f.get("properties") or {}).get(code_prop)]
+            points = geometry.compute_region_points({"type": "FeatureCollection", "features": features})
+
+            found = np.full(len(features), -1)
+            if coarser is not None:
+                lonlat = [points.get(str(f["properties"][code_prop]), {"label": (np.nan, np.nan)})["label"][::-1]
+                          for f in features]
+                found = geometry.locate_points(lonlat, coarser[1])
+
+            for f, hit in zip(features, found):
+                code = str(f["properties"][code_prop])
+                if code in index:
+                    continue
+                if level == "country":
+                    parent = 0
+                elif hit >= 0:
+                    parent = index[str(coarser[1][hit]["properties"][coarser[0]])]
+                else:
+                    parent = index.get(COUNTRY_BY_PREFIX.get(code[:1]), 0)
+                index[code] = len(codes)
+                codes.append(code)
+                names.append(str(f["properties"].get(name_prop) or code))
+                levels.append(LEVELS.index(level))
+                parents.append(parent)
+            coarser = (code_prop, features)
+        return cls(codes, names, levels, parents)
+
+    def to_dict(self) -> dict:
+        return {"codes": self.codes, "names": self.names, "levels": self.levels.tolist(), "parents": self.parent.tolist()}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RegionHierarchy":
+        return cls(d["codes"], d["names"], d["levels"], d["parents"])
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def code_for(self, value) -> str | None:
+        """Boundary code for a code or a (case-insensitive) name."""
+        value = str(value)
+        if value in self.index:
+            return value
+        i = self._by_name.get(value.lower())
+        return None if i is None else self.codes[i]
+
+    def code_map(self) -> dict:
+        """{name: code} for every node, for data keyed by region name."""
+        return dict(zip(self.names, self.codes))
+
+    def level_of(self, code: str) -> str:
+        return LEVELS[self.levels[self.index[code]]]
+
+    def children(self, code: str) -> list:
+        i = self.index[code]
+        return [self.codes[j] for j in np.flatnonzero(self.parent == i)]
+
+    def ancestors(self, code: str) -> list:
+        out, i = [], self.parent[self.index[code]]
+        while i >= 0:
+            out.append(self.codes[i])
+            i = self.parent[i]
+        return out
+
+    def available_levels(self) -> list:
+        """Levels that have at least one node of their own, finest first."""
+        present = set(self.levels.tolist())
+        return [lvl for i, lvl in enumerate(LEVELS) if i in present]
+
+    def view(self, level: str) -> np.ndarray:
+        """
+        Node -> index of the node that represents it in the level view, or -1.
+        The view is every node at `level` plus coarser leaf nodes (e.g.
+        Scotland in the region view); finer nodes map to their ancestor in it.
+        """
+        if level not in self._views:
+            self._views[level] = self._view(level)
+        return self._views[level]
+
+    def _view(self, level: str) -> np.ndarray:
+        target = LEVELS.index(level)
+        has_children = np.zeros(len(self), dtype=bool)
+        has_children[self.parent[self.parent >= 0]] = True
+        shown = (self.levels == target) | ((self.levels > target) & ~has_children)
+
+        out = np.full(len(self), -1, dtype=np.int64)
+        for i in range(len(self)):
+            j = i
+            while j >= 0 and not shown[j]:
+                j = self.parent[j]
+            # Coarser nodes whose children are shown have no place in the view
+            if j >= 0 and self.levels[i] <= self.levels[j]:
+                out[i] = j
+        return out
+
+    def view_codes(self, level: str, within: str | None = None) -> list:
+        """Codes shown in a level view, optionally only those under `within`."""
+        v = self.view(level)
+        shown = [i for i in range(len(self)) if v[i] == i]
+        if within is not None:
+            shown = [i for i in shown if self.codes[i] == within or within in self.ancestors(self.codes[i])]
+        return [self.codes[i] for i in shown]
+
+
+def load_hierarchy(paths: dict = BOUNDARY_FILES, cache_dir: str = geometry.CACHE_DIR) -> RegionHierarchy:
+    """RegionHierarchy for the boundary files, cached on disk by their content hashes."""
+    digest = _files_digest(paths)
+    cache_path = os.path.join(cache_dir, f"hierarchy_{digest[:16]}.json")
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return RegionHierarchy.from_dict(json.load(f))
+
+    layers = {}
+    for level, path in paths.items():
+        with open(path, "r", encoding="utf-8") as f:
+            layers[level] = json.load(f)
+    h = RegionHierarchy.from_geojson(layers)
+    write_json_atomic(h.to_dict(), cache_path)
+    return h
+
+
+def _files_digest(paths: dict) -> str:
+    h = hashlib.sha1()
+    for level in sorted(paths):
+        h.update(f"{level}:{file_hash(paths[level])};".encode("utf-8"))
+    return h.hexdigest()
+
+
+def level_geojson(h: RegionHierarchy, layers: dict, level: str, within: str | None = None) -> dict:
+    """
+    FeatureCollection of the features shown in a level view, each with
+    uniform "code", "name" and "level" properties for keying the map.
+    """
+    wanted = set(h.view_codes(level, within))
+    features = []
+    for layer_level, geojson in layers.items():
+        code_prop, _ = LEVEL_PROPS[layer_level]
+        for f in geojson.get("features", []):
+            code = str((f.get("properties") or {}).get(code_prop))
+            if code in wanted:
+                props = dict(f["properties"], code=code, name=h.names[h.index[code]], level=layer_level)
+                features.append({**f, "properties": props})
+    return {"type": "FeatureCollection", "features": features}
+
+
+# -----------------------------
+# Roll-ups
+# -----------------------------
+class RollupCube:
+    """
+    Trends values aggregated to every level view, stored per level as flat
+    arrays sorted by (topic, date, node) so a (topic, date) lookup is two
+    binary searches.
+
+    Values are rolled up bottom-up: a node uses its own rows when the data
+    has any for that date, otherwise it aggregates its child nodes' values.
+    England with only regional rows is therefore the mean (or sum) of its
+    regions, and the UK aggregates England, Scotland, Wales and Northern
+    Ireland whichever level each country's data is at. "latest" is a node's
+    last row for the date; a rolled-up node takes the mean of its children's.
+    Nodes coarser than the view (England in the region view) cannot be
+    split and are left out.
+    """
+
+    def __init__(self, df: pd.DataFrame, h: RegionHierarchy):
+        self.h = h
+        # Factorise once; names/codes are resolved per unique value, not per row
+        region_codes, regions = pd.factorize(df["region"])
+        node_of = np.array([h.index.get(h.code_for(r), -1) for r in regions] + [-1], dtype=np.int64)
+        node = node_of[region_codes]
+        keep = node >= 0
+        self.unmatched = sorted(str(r) for r, i in zip(regions, node_of) if i < 0)
+
+        topic_codes, self.topics = pd.factorize(df["topic_name"].to_numpy()[keep], sort=True)
+        date_codes, dates = pd.factorize(df["date"].to_numpy()[keep], sort=True)
+        self.topics = [str(t) for t in self.topics]
+        self.dates = pd.DatetimeIndex(dates)
+        self._topic_index = {t: i for i, t in enumerate(self.topics)}
+        self._node = node[keep]
+        self._topic = topic_codes.astype(np.int64)
+        self._date = date_codes.astype(np.int64)
+        self._value = df["interest_value"].to_numpy(dtype=float)[keep]
+        self._nodes = None
+        self._levels = {}
+
+    def _key(self, topic, date, node):
+        return (topic * len(self.dates) + date) * len(self.h) + node
+
+    def _rolled_up(self) -> pd.DataFrame:
+        """
+        mean / sum / latest / count for every (topic, date, node) with data,
+        indexed by key. Children are always at a finer level than their
+        parent, so one pass per parent level sees only final child values.
+        """
+        n = len(self.h)
+        own = pd.DataFrame({"value": self._value}).groupby(self._key(self._topic, self._date, self._node), sort=False)
+        table = pd.DataFrame({
+            "mean": own["value"].mean(),
+            "sum": own["value"].sum(),
+            "latest": own["value"].last(),
+            "count": own["value"].size(),
+        })
+        parent_level = np.where(self.h.parent >= 0, self.h.levels[np.maximum(self.h.parent, 0)], -1)
+        for lvl in range(1, len(LEVELS)):
+            keys = table.index.to_numpy(dtype=np.int64)
+            td, node = np.divmod(keys, n)
+            mask = parent_level[node] == lvl
+            if not mask.any():
+                continue
+            pkey = td[mask] * n + self.h.parent[node[mask]]
+            up = table[mask].groupby(pkey, sort=False).agg(
+                {"mean": "mean", "sum": "sum", "latest": "mean", "count": "sum"}
+            )
+            # A parent's own rows win over its children
+            table = pd.concat([table, up[~up.index.isin(table.index)]])
+        return table.sort_index()
+
+    def level(self, level: str) -> dict:
+        """Sorted keys and mean / sum / count / latest arrays for one level view."""
+        if level not in self._levels:
+            if self._nodes is None:
+                self._nodes = self._rolled_up()
+            view = self.h.view(level)
+            keys = self._nodes.index.to_numpy(dtype=np.int64)
+            node = keys % len(self.h)
+            shown = self._nodes[view[node] == node]
+            self._levels[level] = {
+                "key": shown.index.to_numpy(dtype=np.int64),
+                **{agg: shown[agg].to_numpy() for agg in ("mean", "sum", "latest", "count")},
+            }
+        return self._levels[level]
+
+    def values(self, level: str, topic: str, day, agg: str = "mean", within: str | None = None) -> pd.DataFrame:
+        """One value per node of the level view: region (code), interest_value."""
+        t = self._topic_index.get(topic)
+        d = self.dates.get_indexer([pd.Timestamp(day)])[0]
+        if t is None or d < 0:
+            return pd.DataFrame({"region": pd.Series(dtype=str), "interest_value": pd.Series(dtype=float)})
+        cube = self.level(level)
+        lo, hi = np.searchsorted(cube["key"], [self._key(t, d, 0), self._key(t, d + 1, 0)])
+        nodes = cube["key"][lo:hi] - self._key(t, d, 0)
+        out = pd.DataFrame({
+            "region": [self.h.codes[n] for n in nodes],
+            "interest_value": cube[agg][lo:hi].astype(float),
+        })
+        if within is not None:
+            out = out[out["region"].isin(self.h.view_codes(level, within))].reset_index(drop=True)
+        return out
+
+    def series(self, level: str, topic: str, agg: str = "mean") -> pd.DataFrame:
+        """A topic's full series in a level view: date, region (code), interest_value."""
+        t = self._topic_index.get(topic)
+        if t is None:
+            return pd.DataFrame(columns=["date", "topic_name", "region", "interest_value"])
+        cube = self.level(level)
+        lo, hi = np.searchsorted(cube["key"], [self._key(t, 0, 0), self._key(t + 1, 0, 0)])
+        rest = cube["key"][lo:hi] - self._key(t, 0, 0)
+        date_idx, nodes = np.divmod(rest, len(self.h))
+        return pd.DataFrame({
+            "date": self.dates[date_idx],
+            "topic_name": topic,
+            "region": np.asarray(self.h.codes, dtype=object)[nodes],
+            "interest_value": cube[agg][lo:hi].astype(float),
+        })
@@ -0,0 +1,238 @@
+"""
+Data + map building used by the Streamlit app, kept free of Streamlit so the
+same code paths can run headlessly (benchmarks, batch exports).
+"""
+import base64
+import io
+
+import folium
+import matplotlib
+
+# Headless-safe backend; Streamlit renders the PNGs itself
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import pandas as pd  # noqa: E402
+from folium import plugins  # noqa: E402
+
+import compact  # noqa: E402
+
+# Handle region mapping for Countries
+# The trends data has 'England', 'Wales', 'Scotland', 'Northern Ireland' in the 'region' column.
+# We need to map these to the CTRY24CD in the GeoJSON.
+COUNTRY_MAP = {
+    "England": "E92000001",
+    "Northern Ireland": "N92000002",
+    "Scotland": "S92000003",
+    "Wales": "W92000004"
+}
+
+
+# -----------------------------
+# Data
+# -----------------------------
+def read_csv(file_path) -> pd.DataFrame:
+    # trends_combine.py writes parquet; plain CSVs (e.g. fake data) still work
+    if str(file_path).endswith(".parquet"):
+        df = pd.read_parquet(file_path)
+    else:
+        # Parse labels straight into categoricals; object columns are never built
+        labels = {c: "category" for c in ("Program", "topic_name", "region", "region_name")}
+        df = pd.read_csv(file_path, dtype=labels)
+    # Normalize expected columns
+    # combined_google_trends_data.csv has: date, Program, region, value
+    if "Program" in df.columns:
+        df = df.rename(columns={"Program": "topic_name"})
+    if "value" in df.columns:
+        df = df.rename(columns={"value": "interest_value"})
+    
+    if "region_name" not in df.columns:
+        df["region_name"] = df["region"]
+
+    expected = {"date", "topic_name", "region", "region_name", "interest_value"}
+    missing = expected - set(df.columns)
+    if missing:
+        raise ValueError(f"CSV missing columns: {sorted(missing)}")
+
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    df["interest_value"] = pd.to_numeric(df["interest_value"], errors="coerce")
+    df = df.dropna(subset=["date", "interest_value", "region", "topic_name"])
+    # Categorical labels and float32 values: ~15 bytes a row instead of ~200
+    return compact.compact_trends(df)
+
+
+def sparkline_png_base64(series: pd.Series, title: str = "") -> str:
+    # Dark theme for sparklines
+    plt.style.use('dark_background')
+    fig = plt.figure(figsize=(3.2, 0.9), dpi=150)
+    fig.patch.set_facecolor('#1a1f3a')
+    ax = fig.add_subplot(111)
+    ax.set_facecolor('#1a1f3a')
+    ax.plot(series.index, series.values, color='#4da6ff', linewidth=2)
+    ax.set_xticks([])
+    ax.set_yticks([])
+    ax.set_title(title, fontsize=8, color='#e8eaed')
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    fig.tight_layout(pad=0.2)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight", pad_inches=0.05, facecolor='#1a1f3a')
+    plt.close(fig)
+
+    b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
+    return f"data:image/png;base64,{b64}"
+
+
+# -----------------------------
+# Filtering / aggregation
+# -----------------------------
+def filter_topic_date(df: pd.DataFrame, topic: str, selected_date) -> pd.DataFrame:
+    mask = (
+        (df["topic_name"] == topic)
+        & (df["date"].dt.date == selected_date)
+    )
+    return df.loc[mask].copy()
+
+
+def aggregate_region_values(df_f: pd.DataFrame, agg: str) -> pd.DataFrame:
+    """One value per region: mean, sum or latest."""
+    if agg == "mean":
+        region_vals = df_f.groupby("region", as_index=False, observed=True)["interest_value"].mean()
+    elif agg == "sum":
+        region_vals = df_f.groupby("region", as_index=False, observed=True)["interest_value"].sum()
+    else:  # latest
+        df_latest = df_f.sort_values("date").groupby("region", as_index=False, observed=True).tail(1)
+        region_vals = df_latest[["region", "interest_value"]].copy()
+
+    region_vals["region"] = region_vals["region"].astype(str)
+    region_vals["interest_value"] = region_vals["interest_value"].astype(float)
+    return region_vals
+
+
+# -----------------------------
+# Folium
+# -----------------------------
+def build_base_map(
+    geojson: dict,
+    region_vals: pd.DataFrame,
+    topic: str,
+    agg: str,
+    code_map: dict = COUNTRY_MAP,
+    key_prop: str = "CTRY24CD",
+) -> folium.Map:
+    """Dark-tiled map with the choropleth layer and per-region tooltips."""
+    # Center the map (roughly UK) - using dark tiles
+    m = folium.Map(location=(54.5, -3.0), zoom_start=5, tiles="CartoDB dark_matter")
+
+    # Create a mapping from region name to code (region codes pass through)
+    region_vals = region_vals.copy()
+    region_vals["region_code"] = region_vals["region"].map(code_map).fillna(region_vals["region"])
+
+    # Choropleth layer
+    folium.Choropleth(
+        geo_data=geojson,
+        data=region_vals.dropna(subset=["region_code"]),
+        columns=["region_code", "interest_value"],
+        key_on=f"feature.properties.{key_prop}",
+        fill_opacity=0.75,
+        line_opacity=0.3,
+        nan_fill_opacity=0.1,
+        legend_name=f'{topic} ({agg})',
+    ).add_to(m)
+
+    # Add tooltips showing region name + value
+    val_lookup = dict(zip(region_vals["region"], region_vals["interest_value"]))
+    val_lookup.update(zip(region_vals["region_code"], region_vals["interest_value"]))
+    for feat in geojson.get("features", []):
+        props = feat.get("properties", {})
+        # Level views (hierarchy.level_geojson) carry uniform code/name properties
+        code = str(props.get("code") or props.get("CTRY24CD") or props.get("RGN24CD") or "")
+        name = props.get("name") or props.get("CTRY24NM") or props.get("RGN24NM") or ""
+        v = val_lookup.get(name, val_lookup.get(code))
+        props["_value"] = None if v is None else float(v)
+        props["_tooltip"] = f"{name} ({code}) — {'' if v is None else round(v, 1)}"
+
+    folium.GeoJson(
+        geojson,
+        name="regions",
+        style_function=lambda x: {"fillOpacity": 0, "color": "transparent", "weight": 0},
+        tooltip=folium.GeoJsonTooltip(fields=["_tooltip"], aliases=[""], labels=False),
+    ).add_to(m)
+    return m
+
+
+def add_value_layer(
+    m: folium.Map,
+    geojson: dict,
+    region_vals: pd.DataFrame,
+    name: str,
+    key_prop: str = "code",
+    fill_color: str = "PuRd",
+    show: bool = True,
+) -> folium.Map:
+    """An extra toggleable choropleth (region, interest_value) over the same boundaries."""
+    folium.Choropleth(
+        geo_data=geojson,
+        data=region_vals,
+        columns=["region", "interest_value"],
+        key_on=f"feature.properties.{key_prop}",
+        fill_color=fill_color,
+        fill_opacity=0.6,
+        line_opacity=0.2,
+        nan_fill_opacity=0.0,
+        legend_name=name,
+        name=name,
+        overlay=True,
+        show=show,
+    ).add_to(m)
+    return m
+
+
+def add_sparkline_markers(m: folium.Map, df: pd.DataFrame, topic: str, points: dict, code_map: dict = COUNTRY_MAP) -> int:
+    """
+    One marker per region with a popup sparkline of its weekly series.
+    points is {code: (lat, lon)}. Returns the number of markers added.
+    """
+    # Build region time series, keyed by boundary code
+    df_t = df.loc[df["topic_name"] == topic, ["date", "region", "interest_value"]].copy()
+    df_t["region"] = df_t["region"].astype(str)
+    df_t["region"] = df_t["region"].map(code_map).fillna(df_t["region"])
+    ts = df_t.set_index("date").sort_index().groupby("region")["interest_value"]
+
+    n_markers = 0
+    for region_code, (lat, lon) in points.items():
+        if region_code not in ts.groups:
+            continue
+        s = ts.get_group(region_code).resample("W").mean()  # weekly mean for smoother sparkline
+        if s.empty:
+            continue
+
+        img = sparkline_png_base64(s, title=f"{topic} — {region_code}")
+        latest = float(s.dropna().iloc[-1]) if s.dropna().shape[0] else None
+
+        popup_html = (
+            f'<div style="background-color: #1a1f3a; padding: 10px; border-radius: 5px;">'
+            f'<b style="color: #e8eaed;">{region_code}</b><br>'
+            f'<span style="color: #9aa0a6;">Latest (weekly): </span><b style="color: #4da6ff;">{" " if latest is None else round(latest, 1)}</b><br>'
+            f'<img src="{img}" style="width:280px; height:auto;" />'
+            f'</div>'
+        )
+
+        folium.Marker(
+            location=(lat, lon),
+            tooltip=region_code,
+            popup=folium.Popup(popup_html, max_width=320),
+        ).add_to(m)
+        n_markers += 1
+    return n_markers
+
+
+def add_heatmap(m: folium.Map, frames: list, labels: list) -> None:
+    plugins.HeatMapWithTime(
+        data=frames,
+        index=labels,
+        auto_play=True,
+        max_opacity=0.8,
+        radius=25,
+        use_local_extrema=False,
+    ).add_to(m)
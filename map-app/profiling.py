@@ -0,0 +1,152 @@
+"""
+Per-rerun timing for the Streamlit app.
+
+    prof = RerunProfiler(session_id)
+    with prof.stage("load_trends"):
+        df = ...
+    prof.record(geojson_bytes=123)
+    prof.finish()        # appends one JSON line to the timings log
+
+Summarise the log across sessions with
+
+    python profiling.py logs/rerun_timings.jsonl
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+TIMINGS_LOG = os.environ.get("MAP_APP_TIMINGS_LOG", "logs/rerun_timings.jsonl")
+
+
+def _timings_logger(path: str = TIMINGS_LOG) -> logging.Logger:
+    # One JSON object per line; set up lazily so importing has no side effects
+    logger = logging.getLogger(f"map_app.timings.{os.path.abspath(path)}")
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        handler = logging.FileHandler(path, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+class RerunProfiler:
+    """Collects stage durations and payload sizes for one script rerun."""
+
+    def __init__(self, session_id: str | None = None, enable_cprofile: bool = False):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.rerun_id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.stages = []
+        self.sizes = {}
+        self.context = {}
+        self._record = None
+        self._cprofile = cProfile.Profile() if enable_cprofile else None
+        if self._cprofile is not None:
+            self._cprofile.enable()
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - t0))
+
+    def record(self, **sizes) -> None:
+        """Payload sizes / counts, e.g. geojson_bytes=..., markers=..."""
+        self.sizes.update(sizes)
+
+    def set_context(self, **context) -> None:
+        """What the rerun was showing (mode, topic, ...), for grouping in the log."""
+        self.context.update(context)
+
+    @property
+    def total_seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def stage_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.stages, columns=["stage", "seconds"])
+        df = df.groupby("stage", sort=False, as_index=False)["seconds"].sum()
+        total = self.total_seconds
+        df["share"] = df["seconds"] / total if total else 0.0
+        return df
+
+    def cprofile_text(self, limit: int = 25) -> str:
+        """Top functions by cumulative time, if cProfile was enabled."""
+        if self._cprofile is None:
+            return ""
+        self._cprofile.disable()
+        out = io.StringIO()
+        pstats.Stats(self._cprofile, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    def to_record(self) -> dict:
+        return {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "session_id": self.session_id,
+            "rerun_id": self.rerun_id,
+            "total_s": round(self.total_seconds, 6),
+            "stages": {name: round(sec, 6) for name, sec in self.stage_frame()[["stage", "seconds"]].values},
+            "sizes": self.sizes,
+            **self.context,
+        }
+
+    def finish(self, log_path: str = TIMINGS_LOG) -> dict:
+        """Stop cProfile and log the rerun. Only the first call logs, so it is safe in a finally block."""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._record is None:
+            self._record = self.to_record()
+            _timings_logger(log_path).info(json.dumps(self._record, default=str))
+        return self._record
+
+
+# -----------------------------
+# Log aggregation
+# -----------------------------
+def read_timings_log(path: str = TIMINGS_LOG) -> pd.DataFrame:
+    """Long frame: one row per (rerun, stage) with the rerun's context columns."""
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            base = {k: v for k, v in rec.items() if k not in ("stages", "sizes")}
+            base.update({f"size_{k}": v for k, v in (rec.get("sizes") or {}).items()})
+            for stage, seconds in (rec.get("stages") or {}).items():
+                rows.append({**base, "stage": stage, "seconds": seconds})
+    return pd.DataFrame(rows)
+
+
+def summarise_timings(df: pd.DataFrame) -> pd.DataFrame:
+    """p50 / p90 / max seconds per stage across every logged rerun."""
+    if df.empty:
+        return df
+    g = df.groupby("stage")["seconds"]
+    out = pd.DataFrame({
+        "reruns": g.size(),
+        "p50_s": g.quantile(0.5),
+        "p90_s": g.quantile(0.9),
+        "max_s": g.max(),
+        "sessions": df.groupby("stage")["session_id"].nunique(),
+    })
+    return out.sort_values("p50_s", ascending=False)
+
+
+if __name__ == "__main__":
+    log_path = sys.argv[1] if len(sys.argv) > 1 else TIMINGS_LOG
+    print(summarise_timings(read_timings_log(log_path)).to_string())
@@ -0,0 +1,456 @@
+"""
+One command to refresh every data source, as a DAG of fetch -> transform ->
+publish jobs.
+
+    python scheduler.py                     # everything that is stale
+    python scheduler.py --dry-run           # what would run, and why
+    python scheduler.py --jobs snapshots    # one job plus whatever it depends on
+    python scheduler.py --offline --force   # rebuild from local files only, no network jobs
+
+A job runs once its dependencies have finished, alongside any other ready
+job, subject to its pool: network jobs share a pool per API (one Google
+Trends request stream, one NewsAPI key) and local work is capped at the CPU
+count. A job is skipped when the sha1 of its input files matches its last
+successful run and its outputs exist; jobs with no input files (API fetches)
+are skipped while their last run is younger than max_age. Jobs whose inputs
+are absent, or whose API key / package is missing, are marked unavailable
+and their dependents carry on with the data already on disk; so are jobs
+marked network when running --offline. Jobs that start process pools run as
+scripts, since forking this multi-threaded process can deadlock.
+
+Per-job status, timings and cache hits are printed and appended to
+logs/scheduler_runs.jsonl; summarise the log with --report.
+"""
+import argparse
+import glob
+import hashlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+
+from io_utils import file_hash, read_json, write_json_atomic
+
+STATE_PATH = "data/cache/scheduler_state.json"
+RUN_LOG = os.environ.get("MAP_APP_SCHEDULER_LOG", "logs/scheduler_runs.jsonl")
+REPO_ROOT = ".."
+HANSARD_DIR = "../hansard"
+
+# Concurrent jobs per pool; the API pools are quota lanes, not CPU limits
+POOLS = {"cpu": os.cpu_count() or 1, "google": 1, "newsapi": 1}
+
+NEWS_QUERIES = ["Sizewell C", "High Speed 2", "New Hospitals Programme"]
+NEWS_LOOKBACK = timedelta(days=28)  # the NewsAPI free tier only searches the last month
+LEAD_LAG_PAIRS = [("hansard", "trends"), ("bluesky", "trends"), ("news", "trends")]
+LEAD_LAG_PATH = "exports/lead_lag.csv"
+
+# Statuses a dependent can build on; "failed" and "blocked" stop the branch
+SATISFIED = {"ran", "skipped", "unavailable", "would run"}
+
+
+class Job:
+    """
+    One node of the DAG. run is a callable or an argv list (run in cwd).
+    inputs/outputs are glob patterns relative to map-app. network marks jobs
+    that call an external service, whatever their stage.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run,
+        stage: str,
+        deps: tuple = (),
+        inputs: tuple = (),
+        outputs: tuple = (),
+        pool: str = "cpu",
+        max_age: timedelta | None = None,
+        cwd: str = ".",
+        env: dict | None = None,
+        needs_env: tuple = (),
+        needs_modules: tuple = (),
+        network: bool = False,
+    ):
+        self.name = name
+        self.run = run
+        self.stage = stage
+        self.deps = tuple(deps)
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.pool = pool
+        self.max_age = max_age
+        self.cwd = cwd
+        self.env = env or {}
+        self.needs_env = tuple(needs_env)
+        self.needs_modules = tuple(needs_modules)
+        self.network = network
+
+    def input_files(self) -> list:
+        return sorted({p for pattern in self.inputs for p in glob.glob(pattern)})
+
+    def digest(self) -> str:
+        """sha1 over the job's definition and the contents of its input files."""
+        h = hashlib.sha1(repr((self.run if isinstance(self.run, list) else self.name, self.env)).encode("utf-8"))
+        for path in self.input_files():
+            h.update(f"{path}:{file_hash(path)};".encode("utf-8"))
+        return h.hexdigest()
+
+    def outputs_exist(self) -> bool:
+        return all(glob.glob(pattern) for pattern in self.outputs)
+
+    def unavailable_reason(self) -> str | None:
+        missing_env = [v for v in self.needs_env if not os.environ.get(v)]
+        if missing_env:
+            return f"missing environment: {', '.join(missing_env)}"
+        missing_mod = [m for m in self.needs_modules if importlib.util.find_spec(m) is None]
+        if missing_mod:
+            return f"missing packages: {', '.join(missing_mod)}"
+        if self.inputs and not self.input_files():
+            return "no input files"
+        return None
+
+    def execute(self) -> None:
+        if callable(self.run):
+            self.run()
+            return
+        env = {**os.environ, **self.env}
+        proc = subprocess.run(self.run, cwd=self.cwd, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            tail = "\n".join((proc.stderr or proc.stdout).strip().splitlines()[-15:])
+            raise RuntimeError(f"exit {proc.returncode}: {tail}")
+
+
+# -----------------------------
+# Jobs
+# -----------------------------
+def _trends_fetch():
+    import trends_refresh
+
+    trends_refresh.run()
+
+
+def _trends_combine():
+    import trends_combine
+
+    trends_combine.run()
+
+
+def _bluesky_aggregate():
+    import bluesky_data
+    import bluesky_pipeline
+
+    if bluesky_pipeline.update_months() or not os.path.exists(bluesky_data.SUMMARY_PATH):
+        bluesky_pipeline.write_outputs()
+
+
+def _hansard_regions():
+    import hansard_regions
+
+    hansard_regions.update_parts()
+    hansard_regions.write_view()
+
+
+def _lead_lag():
+    import correlate
+
+    tables = []
+    for a, b in LEAD_LAG_PAIRS:
+        if correlate.missing_inputs([a, b]):
+            continue
+        tables.append(correlate.lead_lag(a, b).assign(a=a, b=b))
+    if tables:
+        os.makedirs(os.path.dirname(LEAD_LAG_PATH), exist_ok=True)
+        pd.concat(tables, ignore_index=True).to_csv(LEAD_LAG_PATH, index=False)
+
+
+def _similarity():
+    import similarity
+
+    similarity.update_index()
+
+
+def build_jobs() -> dict:
+    """Every job, keyed by name. Paths are relative to map-app."""
+    import trends_combine
+
+    programmes = sorted(set(read_json(trends_combine.MANIFEST_PATH, {}).values()))
+    trends_csvs = os.path.join(trends_combine.DATA_DIR, "*.csv")
+    news_from = (date.today() - NEWS_LOOKBACK).isoformat()
+    jobs = [
+        # Google Trends
+        Job("trends.fetch", _trends_fetch, "fetch", pool="google", max_age=timedelta(days=1),
+            outputs=(trends_combine.MANIFEST_PATH,), needs_modules=("pytrends",), network=True),
+        Job("trends.combine", _trends_combine, "transform", deps=("trends.fetch",),
+            inputs=(trends_combine.MANIFEST_PATH, trends_csvs), outputs=(trends_combine.OUTPUT_PATH,)),
+        Job("trends.report", [sys.executable, "google_trends.py", *programmes, "--no-show"], "publish",
+            deps=("trends.fetch",), pool="google", max_age=timedelta(days=7), cwd=REPO_ROOT,
+            outputs=(os.path.join(REPO_ROOT, "*_timeline.html"),), needs_modules=("pytrends", "plotly"), network=True),
+        # NewsAPI (search, scrape, summarise)
+        Job("news.fetch", [sys.executable, "newsapi.py"], "fetch", pool="newsapi", max_age=timedelta(days=1),
+            cwd=REPO_ROOT, env={"NEWS_QUERIES": ",".join(NEWS_QUERIES), "NEWS_FROM": news_from},
+            outputs=(os.path.join(REPO_ROOT, "news_articles.csv"),), needs_env=("apiKey",), network=True),
+        # BlueSky: raw monthly dumps (or bluesky_stream.py) -> typed tables
+        Job("bluesky.aggregate", _bluesky_aggregate, "transform",
+            inputs=("data/blue_sky/monthly_raw_*.csv",), outputs=("data/blue_sky/summary.parquet",)),
+        # Scripts, not callables: they start process pools, which must not fork this threaded process
+        Job("bluesky.sentiment", [sys.executable, "bluesky_sentiment.py"], "transform",
+            inputs=("data/blue_sky/monthly_raw_*.csv",), outputs=("data/blue_sky/sentiment_daily.parquet",)),
+        # Hansard: debates XML -> speeches table, and mentions per region
+        Job("hansard.speeches", [sys.executable, "read_hansard_files.py"], "transform", cwd=HANSARD_DIR,
+            inputs=(os.path.join(HANSARD_DIR, "scrapedxml/debates/*.xml"),),
+            outputs=(os.path.join(HANSARD_DIR, "hansard.csv"),)),
+        Job("hansard.regions", _hansard_regions, "transform",
+            inputs=(os.path.join(HANSARD_DIR, "scrapedxml/debates/*.xml"), os.path.join(HANSARD_DIR, "people.json"),
+                    "data/constituency_lookup*.csv"),
+            outputs=("data/hansard_mentions.parquet",)),
+        # Publish
+        Job("lead_lag", _lead_lag, "publish",
+            deps=("trends.combine", "bluesky.aggregate", "news.fetch", "hansard.speeches"),
+            inputs=(trends_combine.OUTPUT_PATH, "data/blue_sky/derived/*/daily_counts.parquet",
+                    "data/blue_sky/annual_daily_counts_*.csv", os.path.join(REPO_ROOT, "news_articles.csv"),
+                    os.path.join(HANSARD_DIR, "hansard.csv")),
+            outputs=(LEAD_LAG_PATH,)),
+        Job("similarity", _similarity, "publish", deps=("news.fetch", "hansard.speeches"),
+            inputs=(os.path.join(REPO_ROOT, "scraped_data_summaries.xlsx"), os.path.join(HANSARD_DIR, "hansard.csv"),
+                    "data/blue_sky/monthly_raw_*.csv"),
+            outputs=("data/cache/similarity/segments.npz",)),
+        Job("snapshots", [sys.executable, "export_snapshots.py"], "publish", deps=("trends.combine", "hansard.regions"),
+            inputs=(trends_combine.OUTPUT_PATH, "data/*.geojson"), outputs=("exports/snapshots/index.html",)),
+    ]
+    return {job.name: job for job in jobs}
+
+
+# -----------------------------
+# Planning
+# -----------------------------
+def topo_order(jobs: dict) -> list:
+    """Job names with every dependency before its dependents; raises on cycles."""
+    order, state = [], {}
+
+    def visit(name, path=()):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + (name,))}")
+        if name not in jobs:
+            raise KeyError(f"Unknown job: {name}")
+        state[name] = "visiting"
+        for dep in jobs[name].deps:
+            visit(dep, path + (name,))
+        state[name] = "done"
+        order.append(name)
+
+    for name in jobs:
+        visit(name)
+    return order
+
+
+def with_dependencies(jobs: dict, names: list) -> dict:
+    keep = set()
+    stack = list(names)
+    while stack:
+        name = stack.pop()
+        if name not in keep:
+            keep.add(name)
+            stack.extend(jobs[name].deps)
+    return {n: j for n, j in jobs.items() if n in keep}
+
+
+def decide(job: Job, state: dict, force: bool = False, offline: bool = False) -> tuple[str, str, str | None]:
+    """(action, reason, digest): action is "run", "skip" or "unavailable"."""
+    if offline and job.network:
+        return "unavailable", "offline", None
+    reason = job.unavailable_reason()
+    if reason:
+        return "unavailable", reason, None
+    digest = job.digest()
+    last = state.get(job.name, {})
+    if force:
+        return "run", "forced", digest
+    if not job.outputs_exist():
+        return "run", "outputs missing", digest
+    if job.inputs:
+        if last.get("digest") == digest:
+            return "skip", "inputs unchanged", digest
+        return "run", "inputs changed" if last else "never run", digest
+    if job.max_age is not None and last.get("finished_at"):
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(last["finished_at"])
+        if age < job.max_age:
+            return "skip", f"fresh ({age.total_seconds() / 3600:.1f}h old)", digest
+    return "run", "stale" if last else "never run", digest
+
+
+# -----------------------------
+# Running
+# -----------------------------
+def run(
+    jobs: dict,
+    force: bool = False,
+    offline: bool = False,
+    dry_run: bool = False,
+    state_path: str = STATE_PATH,
+    log_path: str = RUN_LOG,
+    pools: dict = POOLS,
+) -> list:
+    """
+    Run the DAG. A job is decided (run / skip) only once its dependencies are
+    done, so it sees the files they wrote. Returns one result dict per job.
+    """
+    state = read_json(state_path, {})
+    order = topo_order(jobs)
+    results = {}
+    running = {}
+    in_pool = {p: 0 for p in pools}
+    started = datetime.now(timezone.utc)
+
+    def finish(name, status, reason, seconds=0.0, digest=None):
+        results[name] = {"job": name, "stage": jobs[name].stage, "status": status, "reason": reason,
+                         "seconds": round(seconds, 3)}
+        if status == "ran" and digest is not None:
+            state[name] = {"digest": digest, "finished_at": datetime.now(timezone.utc).isoformat(),
+                           "seconds": round(seconds, 3)}
+            write_json_atomic(state, state_path)
+
+    def timed(job):
+        t0 = time.perf_counter()
+        job.execute()
+        return time.perf_counter() - t0
+
+    max_workers = sum(pools.values())
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while len(results) < len(order):
+            progressed = False
+            for name in order:
+                if name in results or name in running:
+                    continue
+                job = jobs[name]
+                dep_status = [results.get(d, {}).get("status") for d in job.deps]
+                if any(s is None for s in dep_status):
+                    continue
+                if any(s not in SATISFIED for s in dep_status):
+                    finish(name, "blocked", "a dependency failed")
+                    progressed = True
+                    continue
+                if in_pool.get(job.pool, 0) >= pools.get(job.pool, 1):
+                    continue
+                action, reason, digest = decide(job, state, force, offline)
+                progressed = True
+                if action == "skip":
+                    finish(name, "skipped", reason)
+                elif action == "unavailable":
+                    finish(name, "unavailable", reason)
+                elif dry_run:
+                    finish(name, "would run", reason)
+                else:
+                    print(f"-> {name} ({reason})")
+                    in_pool[job.pool] = in_pool.get(job.pool, 0) + 1
+                    running[name] = (pool.submit(timed, job), digest, reason)
+            if running and not progressed:
+                done, _ = wait([f for f, _, _ in running.values()], return_when=FIRST_COMPLETED)
+                for name in [n for n, (f, _, _) in running.items() if f in done]:
+                    future, digest, reason = running.pop(name)
+                    in_pool[jobs[name].pool] -= 1
+                    try:
+                        finish(name, "ran", reason, future.result(), digest)
+                        print(f"   {name} done in {results[name]['seconds']:.1f}s")
+                    except Exception as e:
+                        finish(name, "failed", f"{type(e).__name__}: {e}")
+                        print(f"!! {name} failed\n{traceback.format_exception_only(e)[-1].strip()}")
+            elif not running and not progressed:
+                raise RuntimeError("Scheduler stalled: no job can start")
+
+    out = [results[n] for n in order]
+    if not dry_run:
+        record = {
+            "run_id": uuid.uuid4().hex[:12],
+            "started": started.isoformat(timespec="seconds"),
+            "total_s": round((datetime.now(timezone.utc) - started).total_seconds(), 3),
+            "jobs": out,
+        }
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    return out
+
+
+def summarise(results: list) -> pd.DataFrame:
+    return pd.DataFrame(results, columns=["job", "stage", "status", "seconds", "reason"])
+
+
+def report(log_path: str = RUN_LOG) -> pd.DataFrame:
+    """Per job across logged runs: runs, cache hit rate, p50 / max seconds when it ran, failures."""
+    rows = []
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                rows.extend({**job, "run_id": rec["run_id"]} for job in rec["jobs"])
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+    ran = df[df["status"] == "ran"].groupby("job")["seconds"]
+    g = df.groupby("job")
+    return pd.DataFrame({
+        "runs": g.size(),
+        # Of the runs where the job could run at all, how often it was skipped
+        "hit_rate": g["status"].apply(lambda s: (s == "skipped").sum() / s.isin(["skipped", "ran"]).sum()
+                                      if s.isin(["skipped", "ran"]).any() else float("nan")),
+        "p50_s": ran.median(),
+        "max_s": ran.max(),
+        "failed": g["status"].apply(lambda s: int((s == "failed").sum())),
+    }).round(3).reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh every data source in dependency order")
+    parser.add_argument("--jobs", default=None, help="comma list of jobs to run (plus their dependencies)")
+    parser.add_argument("--force", action="store_true", help="run even jobs whose inputs are unchanged")
+    parser.add_argument("--offline", action="store_true", help="skip every job that uses the network")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan without running anything")
+    parser.add_argument("--cpu", type=int, default=None, help="concurrent local jobs (default: CPU count)")
+    parser.add_argument("--report", action="store_true", help="summarise the run log and exit")
+    parser.add_argument("--list", action="store_true", help="list the jobs and their dependencies")
+    args = parser.parse_args()
+
+    if args.report:
+        print(report().to_string(index=False))
+        return
+    try:
+        # newsapi.py reads its key from the repo's .env; make it visible to the availability check
+        from dotenv import load_dotenv
+
+        load_dotenv(os.path.join(REPO_ROOT, ".env"))
+    except ImportError:
+        pass
+    jobs = build_jobs()
+    if args.list:
+        for name in topo_order(jobs):
+            job = jobs[name]
+            net = "network" if job.network else "local"
+            print(f"{name:<18} {job.stage:<10} pool={job.pool:<8} {net:<8} after: {', '.join(job.deps) or '-'}")
+        return
+    if args.jobs:
+        jobs = with_dependencies(jobs, [j for j in args.jobs.split(",") if j])
+    pools = dict(POOLS, cpu=args.cpu or POOLS["cpu"])
+
+    t0 = time.perf_counter()
+    results = run(jobs, args.force, args.offline, args.dry_run, pools=pools)
+    table = summarise(results)
+    print(table.to_string(index=False))
+    counts = table["status"].value_counts().to_dict()
+    hits = counts.get("skipped", 0)
+    print(f"{time.perf_counter() - t0:.1f}s, cache hits {hits}/{hits + counts.get('ran', 0)}, {counts}")
+    if counts.get("failed"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,267 @@
-import pandas as pd
-import numpy as np
-import random
+"""
+Synthetic Google Trends + BlueSky data for load-testing the dashboard.
+
+    python seed_fake_data.py                                  # small default set
+    python seed_fake_data.py --topics 200 --regions 400 --days 1825 \\
+        --format parquet --out data/fake_google_trends_data.parquet \\
+        --posts-dir data/fake_blue_sky --posts-per-day 50
+
+Series are built topic by topic with NumPy (no per-row Python) and streamed
+to disk, so memory stays at one topic's worth of rows whatever the total size.
+Same --seed, same data.
+"""
+import argparse
 import json
-from datetime import datetime, timedelta
+import os
+
+import numpy as np
+import pandas as pd
+
+GEOJSON_PATH = "data/Regions_December_2024_Boundaries_EN_BUC_4744747487989771477.geojson"
+
+# Topics
+TOPIC_NAMES = [
+    "HS2",  # ✅ ensure present
+    "Sizewell C",
+    "New Hospital Programme",
+    "Climate Change", "Technology", "Health", "Education", "Economy",
+    "Housing", "Brexit", "NHS", "Cost of Living", "Energy Prices",
+    "Immigration", "Transport", "Tourism", "Football", "Royal Family"
+]
+
+POST_WORDS = np.array(
+    "the a new plan delay cost budget government minister report update today "
+    "project build line station site work jobs local council review funding "
+    "billion years late finally again really why how this that more less".split()
+)
+
 
 def load_regions_from_geojson(geojson_path):
-    """Extract region codes from the geojson file using RGN24CD and RGN24NM"""
-    with open(geojson_path, 'r') as f:
+    """Extract region codes from the geojson file using RGN24CD/RGN24NM (or CTRY24CD/CTRY24NM)"""
+    with open(geojson_path, 'r', encoding='utf-8') as f:
         geojson_data = json.load(f)
-    
+
     regions = {}
     for feature in geojson_data['features']:
-        # Use RGN24CD for region code and RGN24NM for region name
-        region_code = feature['properties'].get('RGN24CD')
-        region_name = feature['properties'].get('RGN24NM')
-        
+        props = feature['properties']
+        region_code = props.get('RGN24CD') or props.get('CTRY24CD')
+        region_name = props.get('RGN24NM') or props.get('CTRY24NM')
+
         if region_code:
             regions[region_code] = region_name
-    
+
     return regions
 
-def seed_fake_data_from_geojson(geojson_path, entries_per_region=10):
-    """Generate fake data for all regions in the geojson"""
-    
-    # Load actual regions from geojson
-    regions = load_regions_from_geojson(geojson_path)
-    print(f"Loaded {len(regions)} regions from geojson")
-    
-# Topics
-    topic_names = [
-        "HS2",  # ✅ ensure present
-        "Sizewell C",
-        "New Hospital Programme",
-        "Climate Change", "Technology", "Health", "Education", "Economy",
-        "Housing", "Brexit", "NHS", "Cost of Living", "Energy Prices",
-        "Immigration", "Transport", "Tourism", "Football", "Royal Family"
-    ]
-
-    
-    data = []
-    
-    # Generate data for each region
-    for region_code, region_name in regions.items():
-        for _ in range(entries_per_region):
-            date = datetime.now() - timedelta(days=random.randint(0, 365))
-            topic_name = random.choice(topic_names)
-            
-            # Create more realistic interest values
-            base_interest = random.randint(20, 80)
-            interest_value = max(0, min(100, base_interest + random.randint(-15, 15)))
-            
-            data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'topic_name': topic_name,
-                'region': region_code,
-                'region_name': region_name,
-                'interest_value': interest_value
-            })
-    
-    df = pd.DataFrame(data)
-    df = df.sort_values('date').reset_index(drop=True)
-    return df
+
+def expand_regions(regions: dict, n_regions: int | None) -> dict:
+    """Pad the real regions with synthetic ones (or trim) to exactly n_regions."""
+    if n_regions is None:
+        return regions
+    codes = list(regions)[:n_regions]
+    out = {c: regions[c] for c in codes}
+    for i in range(n_regions - len(out)):
+        out[f"X{i:08d}"] = f"Synthetic Region {i + 1}"
+    return out
+
+
+def expand_topics(n_topics: int | None) -> list:
+    if n_topics is None:
+        return list(TOPIC_NAMES)
+    topics = TOPIC_NAMES[:n_topics]
+    return topics + [f"Topic {i + 1}" for i in range(n_topics - len(topics))]
+
+
+# -----------------------------
+# Trends series
+# -----------------------------
+def ar1(shocks: np.ndarray, phi: float, block: int = 256) -> np.ndarray:
+    """
+    x[t] = phi * x[t-1] + shocks[t], vectorised within fixed-size blocks
+    (phi ** k stays well away from underflow) with the state carried across.
+    """
+    out = np.empty_like(shocks)
+    powers = phi ** np.arange(block)
+    state = 0.0
+    for start in range(0, len(shocks), block):
+        s = shocks[start:start + block]
+        p = powers[:len(s)]
+        out[start:start + len(s)] = np.cumsum(s / p) * p + state * phi * p
+        state = out[start + len(s) - 1]
+    return out
+
+
+def topic_series(rng: np.random.Generator, dates: pd.DatetimeIndex, n_regions: int) -> np.ndarray:
+    """
+    (days, regions) interest values in 0-100 for one topic: a shared national
+    signal (level + yearly/weekly seasonality + AR(1) drift + decaying news
+    spikes) that each region follows with its own loading, plus regional noise.
+    """
+    n_days = len(dates)
+    t = np.arange(n_days)
+    doy = dates.dayofyear.to_numpy()
+    dow = dates.dayofweek.to_numpy()
+
+    level = rng.uniform(15, 55)
+    yearly = rng.uniform(2, 12) * np.sin(2 * np.pi * (doy / 365.25 + rng.uniform()))
+    weekly = rng.uniform(0, 4) * np.where(dow >= 5, -1.0, 0.4)
+
+    drift = ar1(rng.normal(0, 2.0, n_days), 0.97)
+
+    # News spikes: Poisson arrivals with exponential decay
+    spikes = np.zeros(n_days)
+    n_spikes = rng.poisson(max(n_days / 90, 1))
+    for day, height, decay in zip(
+        rng.integers(0, max(n_days, 1), n_spikes), rng.uniform(20, 60, n_spikes), rng.uniform(0.2, 0.6, n_spikes)
+    ):
+        tail = t[day:] - day
+        spikes[day:] += height * np.exp(-decay * tail)
+
+    national = level + yearly + weekly + drift + spikes
+
+    # Correlated regions: each region scales the national signal
+    loading = rng.lognormal(0.0, 0.25, n_regions)
+    offset = rng.normal(0, 5, n_regions)
+    noise = rng.normal(0, 3, (n_days, n_regions))
+    values = national[:, None] * loading[None, :] + offset[None, :] + noise
+    return np.clip(np.rint(values), 0, 100)
+
+
+def iter_trends_frames(topics, regions, dates, seed):
+    """One long DataFrame per topic: date, topic_name, region, region_name, interest_value."""
+    codes = list(regions.keys())
+    name_codes, name_cats = pd.factorize(pd.Series(list(regions.values())))
+    code_cat = pd.Categorical.from_codes(np.tile(np.arange(len(codes)), len(dates)), categories=codes)
+    name_cat = pd.Categorical.from_codes(np.tile(name_codes, len(dates)), categories=name_cats)
+    date_col = np.repeat(dates.to_numpy(), len(codes))
+
+    for i, topic in enumerate(topics):
+        # Independent stream per topic so results don't depend on topic count
+        rng = np.random.default_rng([seed, i])
+        values = topic_series(rng, dates, len(codes))
+        yield pd.DataFrame({
+            "date": date_col,
+            "topic_name": pd.Categorical.from_codes(np.full(len(date_col), i), categories=topics),
+            "region": code_cat,
+            "region_name": name_cat,
+            "interest_value": values.ravel().astype("int16"),
+        })
+
+
+# -----------------------------
+# BlueSky-like posts
+# -----------------------------
+def posts_frame(rng: np.random.Generator, topic: str, dates: pd.DatetimeIndex, posts_per_day: float, n_authors: int):
+    """Raw posts for one topic in the monthly_raw_YYYY_MM.csv column layout."""
+    counts = rng.poisson(posts_per_day * rng.lognormal(0, 0.5, len(dates)))
+    n = int(counts.sum())
+    day = np.repeat(dates.to_numpy(), counts)
+    created = pd.to_datetime(day) + pd.to_timedelta(rng.integers(0, 86_400_000, n), unit="ms")
+
+    # Heavy-tailed engagement: most posts get nothing, a few go viral
+    likes = np.floor(rng.pareto(1.3, n) * rng.uniform(0, 3, n)).astype("int64")
+    reposts = rng.binomial(likes, 0.18)
+    replies = rng.binomial(likes, 0.12)
+
+    # Zipf-ish authors: a few accounts post a lot
+    author_ids = np.minimum(rng.zipf(1.6, n), n_authors) - 1
+    authors = np.char.add("user", author_ids.astype(str))
+    authors = np.char.add(authors, ".bsky.social")
+
+    n_words = rng.integers(6, 30, n)
+    words = POST_WORDS[rng.integers(0, len(POST_WORDS), int(n_words.sum()))]
+    splits = np.cumsum(n_words)[:-1]
+    texts = [f"{topic} " + " ".join(w) for w in np.split(words, splits)] if n else []
+
+    created_iso = created.strftime("%Y-%m-%dT%H:%M:%S.%f").str[:-3] + "Z"
+    uri_ids = rng.integers(0, 2**62, n)
+    return pd.DataFrame({
+        "uri": [f"at://did:plc:fake/app.bsky.feed.post/{u:x}" for u in uri_ids],
+        "author": authors,
+        "author_name": authors,
+        "text": texts,
+        "created_at": created_iso,
+        "indexed_at": created_iso,
+        "likes": likes,
+        "reposts": reposts,
+        "replies": replies,
+        "has_media": rng.random(n) < 0.35,
+        "keyword": topic,
+    })
+
+
+def write_posts(topics, dates, seed, posts_dir, posts_per_day, n_authors=50_000):
+    """Write posts month by month as monthly_raw_YYYY_MM.csv, like the real dumps."""
+    os.makedirs(posts_dir, exist_ok=True)
+    total = 0
+    for period, month_dates in pd.Series(dates, index=dates).groupby(dates.to_period("M")):
+        path = os.path.join(posts_dir, f"monthly_raw_{period.year}_{period.month:02d}.csv")
+        header = True
+        for i, topic in enumerate(topics):
+            rng = np.random.default_rng([seed, i, period.year, period.month])
+            frame = posts_frame(rng, topic, pd.DatetimeIndex(month_dates.index), posts_per_day, n_authors)
+            frame.to_csv(path, mode="w" if header else "a", header=header, index=False)
+            header = False
+            total += len(frame)
+    return total
+
+
+# -----------------------------
+# Writers
+# -----------------------------
+def write_trends(frames, out_path: str, fmt: str) -> int:
+    """Stream per-topic frames to one CSV or parquet file. Returns rows written."""
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    rows = 0
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for frame in frames:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(out_path, table.schema)
+                writer.write_table(table)
+                rows += len(frame)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    for i, frame in enumerate(frames):
+        frame.to_csv(out_path, mode="w" if i == 0 else "a", header=i == 0, index=False, date_format="%Y-%m-%d")
+        rows += len(frame)
+    return rows
+
 
 def main():
-    geo_json_path = 'data/Regions_December_2024_Boundaries_EN_BFC_1195854647342073399.geojson'
-    
-    fake_data_df = seed_fake_data_from_geojson(geo_json_path, entries_per_region=15)
-    
-    print("Created fake data")
-    print(f"Date range: {fake_data_df['date'].min()} to {fake_data_df['date'].max()}")
-    print(f"Unique regions: {fake_data_df['region'].nunique()}")
-    print(f"Unique topics: {fake_data_df['topic_name'].nunique()}")
-    print(f"Total entries: {len(fake_data_df)}")
-    print("\nSample regions:")
-    print(fake_data_df[['region', 'region_name']].drop_duplicates().head(10))
-    
-    fake_data_df.to_csv('data/fake_google_trends_data.csv', index=False)
-    print("\nSaved fake data to data/fake_google_trends_data.csv")
+    parser = argparse.ArgumentParser(description="Generate synthetic trends / BlueSky data")
+    parser.add_argument("--geojson", default=GEOJSON_PATH, help="boundary file to take real region codes from")
+    parser.add_argument("--topics", type=int, default=None, help="number of topics (default: the built-in list)")
+    parser.add_argument("--regions", type=int, default=None, help="number of regions, padded with synthetic ones")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--end", default=None, help="last date (default: today)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--out", default="data/fake_google_trends_data.csv")
+    parser.add_argument("--posts-dir", default=None, help="also write BlueSky-like monthly_raw files here")
+    parser.add_argument("--posts-per-day", type=float, default=20.0, help="mean posts per topic per day")
+    args = parser.parse_args()
+
+    regions = expand_regions(load_regions_from_geojson(args.geojson), args.regions)
+    topics = expand_topics(args.topics)
+    end = pd.Timestamp(args.end) if args.end else pd.Timestamp.today().normalize()
+    dates = pd.date_range(end=end, periods=args.days, freq="D")
+    print(f"Generating {len(topics)} topics × {len(regions)} regions × {len(dates)} days")
+
+    rows = write_trends(iter_trends_frames(topics, regions, dates, args.seed), args.out, args.format)
+    print(f"Saved {rows:,} trends rows to {args.out}")
+
+    if args.posts_dir:
+        n_posts = write_posts(topics, dates, args.seed, args.posts_dir, args.posts_per_day)
+        print(f"Saved {n_posts:,} posts to {args.posts_dir}")
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
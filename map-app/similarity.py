@@ -0,0 +1,530 @@
+"""
+Offline similarity search across news summaries, Hansard speeches and
+BlueSky posts.
+
+    python similarity.py build                              # add new documents only
+    python similarity.py query "rail link cancelled" --corpus bluesky -k 5
+    python similarity.py like "uk.org.publicwhip/debate/2025-01-08a.123.4" --corpus bluesky
+    python similarity.py bench --queries 200
+
+Documents are hashed bag-of-words vectors (2^20 buckets, sublinear tf)
+stored as CSR segments; each segment also keeps the transposed postings
+(bucket -> documents), so a query only touches the documents sharing a term
+with it. IDF is global and recomputed from document frequencies when
+documents are added. Queries are batched: every (query, document)
+contribution of a batch goes through one bincount per segment, then a top-k
+over the positive scores. Terms in more than COMMON_DF of all documents
+("hs2" in the HS2 posts) are skipped in that pass and added to the best
+documents by the other terms afterwards, then to any other document whose
+upper bound (from its score on the other terms) could still reach the k-th
+result; when a document sharing only common terms could, they are scanned.
+Results are exact.
+
+`build` reads only source files whose hash changed and appends their new
+documents as a segment; segments are merged once there are more than
+MAX_SEGMENTS. The index lives in data/cache/similarity.
+"""
+import argparse
+import glob
+import os
+import re
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from compact import STRING
+from io_utils import file_hash, read_json, write_json_atomic
+
+INDEX_DIR = "data/cache/similarity"
+N_FEATURES = 1 << 20
+MAX_SEGMENTS = 8
+SNIPPET = 280
+# Terms in more than this share of documents only rescore candidates
+COMMON_DF = 0.1
+CANDIDATES = 4
+# (queries x documents) scores held at once per segment
+BATCH_CELLS = 1 << 22
+
+CORPORA = ("news", "hansard", "bluesky")
+NEWS_SUMMARIES = "../scraped_data_summaries.xlsx"
+HANSARD_CSV = "../hansard/hansard.csv"
+BLUESKY_RAW_GLOB = "data/blue_sky/monthly_raw_*.csv"
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9']+")
+STOP_WORDS = frozenset(
+    "the and for that this with are was were have has had not but you your they them their its it's our out "
+    "from what which who will would can could should there here been being into than then also just about "
+    "all any more most some such only very over when where how why his her him she he we us of to in on at "
+    "is be as by or an if so do does did no yes my me i".split()
+)
+
+
+# -----------------------------
+# Vectorising
+# -----------------------------
+class HashingVectorizer:
+    """Text -> sorted (bucket, 1 + log tf) pairs. Buckets are crc32, so stable across runs."""
+
+    def __init__(self, n_features: int = N_FEATURES):
+        self.mask = n_features - 1
+        self._buckets = {}
+
+    def _bucket(self, token: str) -> int:
+        b = self._buckets.get(token)
+        if b is None:
+            b = self._buckets[token] = zlib.crc32(token.encode("utf-8")) & self.mask
+        return b
+
+    def transform(self, texts) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """CSR (indptr, indices, data) of sublinear term frequencies."""
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            tokens = [t for t in TOKEN_RE.findall(text.lower() if isinstance(text, str) else "") if t not in STOP_WORDS]
+            counts = Counter(self._bucket(t) for t in tokens)
+            for b in sorted(counts):
+                indices.append(b)
+                data.append(counts[b])
+            indptr.append(len(indices))
+        data = np.asarray(data, dtype=np.float32)
+        return (
+            np.asarray(indptr, dtype=np.int64),
+            np.asarray(indices, dtype=np.int32),
+            (1.0 + np.log(data)) if data.size else data,
+        )
+
+
+class Segment:
+    """An immutable block of documents: rows (CSR) plus postings (bucket -> rows)."""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray):
+        self.indptr, self.indices, self.data = indptr, indices, data
+        self.n = len(indptr) - 1
+        self.rows = np.repeat(np.arange(self.n, dtype=np.int32), np.diff(indptr))
+        order = np.argsort(indices, kind="stable")
+        self.buckets, starts = np.unique(indices[order], return_index=True)
+        self.ptr = np.append(starts, len(order)).astype(np.int64)
+        self.post_rows = self.rows[order]
+        self.post_vals = data[order]
+        self.idf = self.inv_norms = self.max_impact = None
+
+    def doc_frequencies(self, n_features: int) -> np.ndarray:
+        return np.bincount(self.indices, minlength=n_features).astype(np.int32)
+
+    def update_norms(self, idf: np.ndarray) -> None:
+        self.idf = idf
+        sq = (self.data * idf[self.indices]) ** 2
+        norms = np.sqrt(np.bincount(self.rows, weights=sq, minlength=self.n))
+        self.inv_norms = 1.0 / np.where(norms > 0, norms, 1.0)
+        # Per bucket, the most one query weight unit can add to any row's score
+        impact = self.post_vals * self.inv_norms[self.post_rows]
+        self.max_impact = np.maximum.reduceat(impact, self.ptr[:-1]) if len(impact) else np.zeros(0)
+
+    def _dense(self, pos: np.ndarray, q_rows: np.ndarray, q_weights: np.ndarray, n_queries: int) -> np.ndarray:
+        """(n_queries, n) cosine contributions of the given matched query terms."""
+        starts, lengths = self.ptr[pos], self.ptr[pos + 1] - self.ptr[pos]
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros((n_queries, self.n))
+        # Flat positions of every posting of every query term
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        flat = offsets + np.arange(total)
+        contrib = self.post_vals[flat] * np.repeat(q_weights, lengths)
+        target = np.repeat(q_rows.astype(np.int64), lengths) * self.n + self.post_rows[flat]
+        out = np.bincount(target, weights=contrib, minlength=n_queries * self.n).reshape(n_queries, self.n)
+        out *= self.inv_norms
+        return out
+
+    def _common_scores(self, rows: np.ndarray, pos: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Contributions of the given query terms to the given rows' scores."""
+        out = np.zeros(len(rows))
+        # Postings are in row order, so each term is one searchsorted over the rows
+        for p, w in zip(pos, weights):
+            lo, hi = self.ptr[p], self.ptr[p + 1]
+            post = self.post_rows[lo:hi]
+            at = np.minimum(np.searchsorted(post, rows), hi - lo - 1)
+            found = post[at] == rows
+            out[found] += w * self.post_vals[lo + at[found]] * self.inv_norms[rows[found]]
+        return out
+
+    def _with_common(self, row, nz, pos, weights, units, rare_norm, k, allowed):
+        """
+        (rows, exact scores) covering every row of `row` (scores without the
+        common terms) that could make the top k once the common terms at
+        `pos` are added. By Cauchy-Schwarz a row scoring r on the other terms
+        (unit-query norm rare_norm) can gain at most
+        |common| * sqrt(1 - (r / rare_norm)^2), and never more than the terms'
+        max_impact. The best CANDIDATES * k rows are rescored first; then every
+        other row whose bound beats the k-th of those. If even a row matching
+        no other term could, the common terms are scanned instead.
+        """
+        vals = row[nz]
+        seg_rows = nz if allowed is None else allowed[nz]
+        cap = weights @ self.max_impact[pos]
+        common_norm = np.sqrt(units @ units)
+
+        def bound(r):
+            return r + np.minimum(common_norm * np.sqrt(np.clip(1.0 - (r / rare_norm) ** 2, 0.0, None)), cap)
+
+        kc = k * CANDIDATES
+        if len(nz) > kc:
+            part = np.argpartition(vals, len(nz) - kc)
+            cand, rest = part[len(nz) - kc:], part[:len(nz) - kc]
+        else:
+            cand, rest = np.arange(len(nz)), np.zeros(0, dtype=np.int64)
+        # The candidates' bounds cap their k-th score, which may settle the scan without rescoring
+        kth = np.partition(bound(vals[cand]), len(cand) - k)[len(cand) - k] if len(cand) >= k else 0.0
+        if bound(0.0) <= kth:
+            exact = vals[cand] + self._common_scores(seg_rows[cand], pos, weights)
+            kth = np.partition(exact, len(exact) - k)[len(exact) - k]
+        if bound(0.0) > kth:
+            extra = self._dense(pos, np.zeros(len(pos), dtype=np.int64), weights, 1)[0]
+            row = row + (extra if allowed is None else extra[allowed])
+            nz = np.flatnonzero(row > 0)
+            return nz, row[nz]
+        more = rest[bound(vals[rest]) > kth]
+        if len(more):
+            cand = np.concatenate([cand, more])
+            exact = np.concatenate([exact, vals[more] + self._common_scores(seg_rows[more], pos, weights)])
+        return nz[cand], exact
+
+    def top_k(self, q_rows, q_buckets, q_weights, common, n_queries: int, k: int, allowed=None, exclude=None):
+        """
+        The k best rows per query as (scores, rows), unsorted and exact.
+        q_weights are the normalised query tf-idf times idf; `common` flags
+        query terms in a large share of documents. Those are left out of the
+        dense pass and added by _with_common to the rows that could still
+        make the top k.
+        """
+        pos = np.minimum(np.searchsorted(self.buckets, q_buckets), len(self.buckets) - 1)
+        hit = self.buckets[pos] == q_buckets
+        pos, q_rows, q_weights, common = pos[hit], q_rows[hit], q_weights[hit], common[hit]
+        # A query made only of common terms has to scan them
+        has_rare = np.bincount(q_rows[~common], minlength=n_queries) > 0
+        common = common & has_rare[q_rows]
+
+        scores = self._dense(pos[~common], q_rows[~common], q_weights[~common], n_queries)
+        if exclude is not None:
+            own = np.flatnonzero(exclude >= 0)
+            scores[own, exclude[own]] = -np.inf
+        # `allowed` is the row numbers a query may return (one corpus)
+        if allowed is not None:
+            scores = scores[:, allowed]
+        # The query's unit-vector components; q_rows is sorted, so each query's common terms are one slice
+        units = q_weights / self.idf[q_buckets[hit]]
+        rare_norms = np.sqrt(np.bincount(q_rows[~common], weights=units[~common] ** 2, minlength=n_queries))
+        c_rows, c_pos, c_weights, c_units = q_rows[common], pos[common], q_weights[common], units[common]
+        bounds = np.searchsorted(c_rows, np.arange(n_queries + 1))
+
+        rows = np.full((n_queries, k), -1, dtype=np.int64)
+        top = np.full((n_queries, k), -np.inf)
+        for i, row in enumerate(scores):
+            sl = slice(bounds[i], bounds[i + 1])
+            # Most scores are 0; working on only the positive ones is much cheaper than the whole row
+            nz = np.flatnonzero(row > 0)
+            if sl.start < sl.stop:
+                nz, vals = self._with_common(row, nz, c_pos[sl], c_weights[sl], c_units[sl], rare_norms[i], k, allowed)
+            else:
+                vals = row[nz]
+            if len(nz) > k:
+                best = np.argpartition(vals, len(nz) - k)[len(nz) - k:]
+                nz, vals = nz[best], vals[best]
+            rows[i, :len(nz)] = nz if allowed is None else allowed[nz]
+            top[i, :len(nz)] = vals
+        return top, rows
+
+    def to_arrays(self, prefix: str) -> dict:
+        return {f"{prefix}_indptr": self.indptr, f"{prefix}_indices": self.indices, f"{prefix}_data": self.data}
+
+
+def _merge(segments: list) -> Segment:
+    indptr = [np.zeros(1, dtype=np.int64)]
+    offset = 0
+    for s in segments:
+        indptr.append(s.indptr[1:] + offset)
+        offset += s.indptr[-1]
+    return Segment(
+        np.concatenate(indptr),
+        np.concatenate([s.indices for s in segments]),
+        np.concatenate([s.data for s in segments]),
+    )
+
+
+# -----------------------------
+# Index
+# -----------------------------
+class SimilarityIndex:
+    def __init__(self, n_features: int = N_FEATURES):
+        self.n_features = n_features
+        self.vectorizer = HashingVectorizer(n_features)
+        self.segments = []
+        self.df = np.zeros(n_features, dtype=np.int32)
+        self.docs = pd.DataFrame({c: pd.Series(dtype=STRING) for c in ("key", "corpus", "date", "text")})
+        self._keys = set()
+        self._idf = self._common = None
+        self._positions = None
+        self._corpus_rows_cache = {}
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # -- building --
+    def add(self, docs: pd.DataFrame) -> int:
+        """Add documents (key, corpus, date, text) not already indexed. Returns how many were added."""
+        docs = docs.drop_duplicates("key")
+        docs = docs[~docs["key"].astype(str).isin(self._keys)]
+        if docs.empty:
+            return 0
+        seg = Segment(*self.vectorizer.transform(docs["text"]))
+        self.segments.append(seg)
+        self.df += seg.doc_frequencies(self.n_features)
+        meta = pd.DataFrame({
+            "key": docs["key"].astype(str).to_numpy(),
+            "corpus": docs["corpus"].astype(str).to_numpy(),
+            "date": docs["date"].astype(str).to_numpy() if "date" in docs else "",
+            "text": docs["text"].astype(str).str.slice(0, SNIPPET).to_numpy(),
+        }).astype(STRING)
+        self.docs = pd.concat([self.docs, meta], ignore_index=True)
+        self._keys.update(meta["key"].tolist())
+        self._idf = self._positions = None
+        self._corpus_rows_cache = {}
+        if len(self.segments) > MAX_SEGMENTS:
+            self.compact()
+        return len(meta)
+
+    def compact(self) -> None:
+        """Merge every segment into one (fewer, longer postings scan faster)."""
+        if len(self.segments) > 1:
+            self.segments = [_merge(self.segments)]
+            self._idf = None
+            self._corpus_rows_cache = {}
+
+    def _prepare(self) -> np.ndarray:
+        if self._idf is None:
+            n = max(len(self.docs), 1)
+            self._idf = (np.log((1.0 + n) / (1.0 + self.df)) + 1.0).astype(np.float64)
+            self._common = self.df > COMMON_DF * n
+            for seg in self.segments:
+                seg.update_norms(self._idf)
+        return self._idf
+
+    # -- querying --
+    def _query_vectors(self, indptr, indices, data, idf):
+        weights = data * idf[indices]
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(indptr) - 1))
+        # The document side's idf is folded into the query weight, so postings can stay raw tf
+        return rows, indices, weights * idf[indices] / np.where(norms > 0, norms, 1.0)[rows]
+
+    def _corpus_rows(self, corpus: str) -> list:
+        """Per segment, the rows belonging to `corpus`."""
+        if corpus not in self._corpus_rows_cache:
+            mask = (self.docs["corpus"] == corpus).to_numpy(dtype=bool)
+            starts = np.cumsum([0] + [s.n for s in self.segments])
+            self._corpus_rows_cache[corpus] = [np.flatnonzero(mask[a:b]) for a, b in zip(starts[:-1], starts[1:])]
+        return self._corpus_rows_cache[corpus]
+
+    def _search(self, indptr, indices, data, k: int, corpus: str | None, exclude: list | None) -> pd.DataFrame:
+        idf = self._prepare()
+        n_queries = len(indptr) - 1
+        allowed = [None] * len(self.segments) if corpus is None else self._corpus_rows(corpus)
+        exclude = np.full(n_queries, -1, dtype=np.int64) if exclude is None else np.asarray(exclude, dtype=np.int64)
+        starts = np.cumsum([0] + [s.n for s in self.segments])
+        out = []
+        size = max(1, BATCH_CELLS // max(max((s.n for s in self.segments), default=1), 1))
+        for lo in range(0, n_queries, size):
+            hi = min(lo + size, n_queries)
+            sub_ptr = indptr[lo:hi + 1] - indptr[lo]
+            sl = slice(indptr[lo], indptr[hi])
+            q_rows, q_buckets, q_weights = self._query_vectors(sub_ptr, indices[sl], data[sl], idf)
+            best_scores, best_docs = [], []
+            for seg, base, rows_allowed in zip(self.segments, starts, allowed):
+                own = exclude[lo:hi] - base
+                own[(own < 0) | (own >= seg.n)] = -1
+                scores, rows = seg.top_k(
+                    q_rows, q_buckets, q_weights, self._common[q_buckets], hi - lo, k,
+                    rows_allowed, own,
+                )
+                best_scores.append(scores)
+                best_docs.append(rows + base)
+            if not best_scores:
+                continue
+            scores, docs = np.hstack(best_scores), np.hstack(best_docs)
+            order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+            scores, docs = np.take_along_axis(scores, order, axis=1), np.take_along_axis(docs, order, axis=1)
+            for i in range(hi - lo):
+                keep = np.isfinite(scores[i]) & (scores[i] > 0)
+                for rank, (doc, score) in enumerate(zip(docs[i][keep], scores[i][keep]), 1):
+                    out.append((lo + i, rank, int(doc), float(score)))
+
+        res = pd.DataFrame(out, columns=["query", "rank", "doc", "score"])
+        meta = self.docs.iloc[res.pop("doc").to_numpy()].reset_index(drop=True)
+        res["score"] = res["score"].round(4)
+        return pd.concat([res, meta], axis=1)
+
+    def query(self, texts: list, k: int = 10, corpus: str | None = None) -> pd.DataFrame:
+        """Top-k documents per query text: query (position), rank, score, key, corpus, date, text."""
+        return self._search(*self.vectorizer.transform(texts), k, corpus, None)
+
+    def similar_to(self, keys: list, k: int = 10, corpus: str | None = None) -> pd.DataFrame:
+        """Top-k documents like already-indexed ones (by key), excluding each document itself."""
+        if self._positions is None:
+            self._positions = {key: i for i, key in enumerate(self.docs["key"].tolist())}
+        missing = [key for key in keys if key not in self._positions]
+        if missing:
+            raise KeyError(f"Not indexed: {missing}")
+        positions = [self._positions[key] for key in keys]
+        starts = np.cumsum([0] + [s.n for s in self.segments])
+        indptr, indices, data = [0], [], []
+        for p in positions:
+            s = int(np.searchsorted(starts, p, side="right")) - 1
+            seg, r = self.segments[s], p - starts[s]
+            lo, hi = seg.indptr[r], seg.indptr[r + 1]
+            indices.append(seg.indices[lo:hi])
+            data.append(seg.data[lo:hi])
+            indptr.append(indptr[-1] + hi - lo)
+        return self._search(np.asarray(indptr, dtype=np.int64), np.concatenate(indices), np.concatenate(data),
+                            k, corpus, positions)
+
+    # -- persistence --
+    def save(self, path: str = INDEX_DIR) -> None:
+        os.makedirs(path, exist_ok=True)
+        arrays = {"df": self.df, "n_features": np.array([self.n_features])}
+        for i, seg in enumerate(self.segments):
+            arrays.update(seg.to_arrays(f"s{i}"))
+        np.savez(os.path.join(path, "segments.tmp.npz"), **arrays)
+        os.replace(os.path.join(path, "segments.tmp.npz"), os.path.join(path, "segments.npz"))
+        self.docs.to_parquet(os.path.join(path, "docs.parquet"), index=False)
+
+    @classmethod
+    def load(cls, path: str = INDEX_DIR) -> "SimilarityIndex":
+        seg_path = os.path.join(path, "segments.npz")
+        if not os.path.exists(seg_path):
+            return cls()
+        with np.load(seg_path) as z:
+            index = cls(int(z["n_features"][0]))
+            index.df = z["df"]
+            n_segments = len([name for name in z.files if name.endswith("_indptr")])
+            index.segments = [Segment(z[f"s{i}_indptr"], z[f"s{i}_indices"], z[f"s{i}_data"]) for i in range(n_segments)]
+        index.docs = pd.read_parquet(os.path.join(path, "docs.parquet")).astype(STRING)
+        index._keys = set(index.docs["key"].tolist())
+        return index
+
+
+# -----------------------------
+# Corpora: each reader yields frames of key, corpus, date, text from one file
+# -----------------------------
+def read_news(path: str):
+    """Article summaries written by newsapi.py (generate_summary)."""
+    df = pd.read_excel(path)
+    text = df["summary"].fillna(df["headline"]) if "headline" in df else df["summary"]
+    yield pd.DataFrame({"key": df["url"], "corpus": "news", "date": "", "text": text})
+
+
+def read_hansard(path: str, chunk_size: int = 100_000):
+    """Speeches as read by read_hansard_files.py (iter_docs)."""
+    for chunk in pd.read_csv(path, usecols=["id", "data"], dtype=str, chunksize=chunk_size):
+        chunk = chunk.dropna()
+        yield pd.DataFrame({
+            "key": chunk["id"],
+            "corpus": "hansard",
+            "date": chunk["id"].str.extract(r"(\d{4}-\d{2}-\d{2})")[0].fillna(""),
+            "text": chunk["data"],
+        })
+
+
+def read_bluesky(path: str):
+    """Post text from a monthly raw dump."""
+    import bluesky_pipeline
+
+    for chunk in bluesky_pipeline.iter_raw_chunks(path):
+        yield pd.DataFrame({
+            "key": chunk["uri"],
+            "corpus": "bluesky",
+            "date": chunk["created_at"].dt.strftime("%Y-%m-%d"),
+            "text": chunk["text"],
+        })
+
+
+SOURCES = {
+    "news": (NEWS_SUMMARIES, read_news),
+    "hansard": (HANSARD_CSV, read_hansard),
+    "bluesky": (BLUESKY_RAW_GLOB, read_bluesky),
+}
+
+
+def update_index(path: str = INDEX_DIR, corpora: tuple = CORPORA) -> tuple[SimilarityIndex, dict]:
+    """
+    Load the saved index and add the documents of source files that changed
+    since the last build (sources.json holds their hashes). Documents are
+    keyed (url, speech id, post uri), so a changed file only adds what is new.
+    Returns (index, documents added per corpus).
+    """
+    manifest_path = os.path.join(path, "sources.json")
+    manifest = read_json(manifest_path, {})
+    index = SimilarityIndex.load(path)
+    added = {}
+    for corpus in corpora:
+        pattern, reader = SOURCES[corpus]
+        added[corpus] = 0
+        for source in sorted(glob.glob(pattern)):
+            sha1 = file_hash(source)
+            if manifest.get(source) == sha1:
+                continue
+            added[corpus] += sum(index.add(frame) for frame in reader(source))
+            manifest[source] = sha1
+    if any(added.values()):
+        index.save(path)
+    if len(index):
+        write_json_atomic(manifest, manifest_path)
+    return index, added
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Similarity search across news, Hansard and BlueSky text")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="index new documents")
+    b.add_argument("--corpora", default=",".join(CORPORA))
+    q = sub.add_parser("query", help="documents similar to some text")
+    q.add_argument("text", nargs="+")
+    lk = sub.add_parser("like", help="documents similar to indexed ones, by key")
+    lk.add_argument("keys", nargs="+")
+    for p in (q, lk):
+        p.add_argument("-k", type=int, default=10)
+        p.add_argument("--corpus", choices=CORPORA, default=None)
+    bench = sub.add_parser("bench", help="time batched queries drawn from the index")
+    bench.add_argument("--queries", type=int, default=100)
+    bench.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index, added = update_index(corpora=tuple(c for c in args.corpora.split(",") if c))
+        print(f"Added {added}; {len(index):,} documents in {len(index.segments)} segment(s)")
+        return
+
+    index = SimilarityIndex.load()
+    if not len(index):
+        raise SystemExit("Index is empty; run `python similarity.py build` first")
+    pd.set_option("display.max_colwidth", 100)
+    if args.command == "query":
+        print(index.query(args.text, args.k, args.corpus).to_string(index=False))
+    elif args.command == "like":
+        print(index.similar_to(args.keys, args.k, args.corpus).to_string(index=False))
+    else:
+        keys = index.docs["key"].sample(min(args.queries, len(index)), random_state=0).tolist()
+        index.similar_to(keys[:1], args.k)  # idf and norms are computed once, not timed
+        t0 = time.perf_counter()
+        index.similar_to(keys, args.k)
+        batch = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for key in keys[:20]:
+            index.similar_to([key], args.k)
+        single = (time.perf_counter() - t0) / min(20, len(keys))
+        print(f"{len(index):,} documents: {len(keys)} queries batched in {batch * 1000:.1f} ms "
+              f"({batch / len(keys) * 1000:.2f} ms each); single query {single * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The app's modules are flat scripts in map-app/, imported by name
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+
+RAW_COLUMNS = ["uri", "author", "author_name", "text", "created_at", "indexed_at",
+               "likes", "reposts", "replies", "has_media", "keyword"]
+
+
+def make_raw_posts(n: int, month: str = "2025-03", seed: int = 0, topics=("HS2", "Sizewell C", "New Hospital Programme")):
+    """
+    A raw monthly dump frame (monthly_raw_YYYY_MM.csv layout) with n posts.
+    The first n // 10 are also found by a second keyword, and n // 50 rows are
+    repeated outright.
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(f"{month}-01", tz="UTC")
+    seconds = rng.integers(0, 27 * 86400, n)
+    created = (start + pd.to_timedelta(np.sort(seconds), unit="s")).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    words = np.array(["hs2", "great", "terrible", "not", "very", "delay", "cost", "good", "bad", "project"])
+    df = pd.DataFrame({
+        "uri": [f"at://did:plc:{seed}/app.bsky.feed.post/{i}" for i in range(n)],
+        "author": [f"user{a}.bsky.social" for a in rng.integers(0, max(n // 3, 1), n)],
+        "author_name": "x",
+        "text": [" ".join(rng.choice(words, 6)) for _ in range(n)],
+        "created_at": created,
+        "indexed_at": created,
+        "likes": rng.integers(0, 50, n),
+        "reposts": rng.integers(0, 10, n),
+        "replies": rng.integers(0, 10, n),
+        "has_media": rng.random(n) < 0.3,
+        "keyword": rng.choice(list(topics), n),
+    })
+    # A post matching two keywords is in the dump under each of them
+    second = df.iloc[: n // 10].copy()
+    second["keyword"] = second["keyword"].map(dict(zip(topics, topics[1:] + topics[:1])))
+    return pd.concat([df, second, df.iloc[n // 10: n // 10 + n // 50]], ignore_index=True)[RAW_COLUMNS]
+
+
+@pytest.fixture
+def raw_month(tmp_path):
+    """Write make_raw_posts output as monthly_raw_YYYY_MM.csv; returns the path."""
+    def write(n: int = 300, month: str = "2025-03", seed: int = 0, raw_dir=None):
+        out = raw_dir or tmp_path / "raw"
+        out.mkdir(parents=True, exist_ok=True)
+        path = out / f"monthly_raw_{month.replace('-', '_')}.csv"
+        make_raw_posts(n, month, seed).to_csv(path, index=False)
+        return str(path)
+
+    return write
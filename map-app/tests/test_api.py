@@ -0,0 +1,103 @@
+import gc
+import json
+import threading
+import weakref
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+import api_client
+import api_server
+import backend
+from conftest import APP_DIR
+
+
+@pytest.fixture(scope="module")
+def data():
+    # DashboardData reads (and caches under) the app's relative data paths
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(APP_DIR)
+        yield backend.DashboardData()
+
+
+@pytest.fixture(scope="module")
+def server(data):
+    srv = api_server.serve("127.0.0.1", 0, data)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def fetch(url: str, etag: str | None = None):
+    headers = {"If-None-Match": etag} if etag else {}
+    try:
+        with urlopen(Request(url, headers=headers)) as resp:
+            return resp.status, resp.headers.get("ETag"), resp.read()
+    except HTTPError as e:
+        return e.code, e.headers.get("ETag"), e.read()
+
+
+def test_etag_revalidation(server):
+    status, etag, body = fetch(f"{server}/meta")
+    assert status == 200 and etag and json.loads(body)["topics"]
+    status, etag2, body = fetch(f"{server}/meta", etag)
+    assert (status, etag2, body) == (304, etag, b"")
+    assert fetch(f"{server}/meta", '"stale"')[0] == 200
+
+
+def test_client_reuses_payload_on_304(server):
+    client = api_client.ApiClient(server)
+    first = client.meta()
+    assert client.meta() is first
+
+
+def test_client_cache_is_bounded(server, data):
+    client = api_client.ApiClient(server, max_entries=2)
+    for topic in list(data.meta()["topics"])[:3]:
+        client.trends_cube(topic)
+    assert len(client._cache) == 2
+
+
+def test_missing_parameter_is_400_and_unknown_path_404(server):
+    status, _, body = fetch(f"{server}/region_values?date=2025-01-04")
+    assert status == 400 and "topic" in json.loads(body)["error"]
+    assert fetch(f"{server}/cube")[0] == 400
+    assert fetch(f"{server}/nope")[0] == 404
+
+
+def test_backend_errors_are_500_not_404(monkeypatch, data, server):
+    def broken(topic):
+        raise KeyError(topic)
+
+    monkeypatch.setattr(data, "trends_cube", broken)
+    # A topic no other test asked for, so the response cache does not answer it
+    status, _, body = fetch(f"{server}/cube?topic=broken")
+    assert status == 500 and "KeyError" in json.loads(body)["error"]
+    # The connection is still answered, and later requests are unaffected
+    assert fetch(f"{server}/meta")[0] == 200
+
+
+def test_cube_route_matches_backend(server, data):
+    topic = data.meta()["topics"][0]
+    cube = api_client.ApiClient(server).trends_cube(topic)
+    assert cube == json.loads(json.dumps(data.trends_cube(topic)))
+    assert len(cube["values"]) == len(cube["dates"])
+    assert all(len(row) == len(cube["regions"]) for row in cube["values"])
+
+
+def test_caches_are_per_instance_and_released(monkeypatch, data):
+    monkeypatch.chdir(APP_DIR)
+    other = backend.DashboardData()
+    topic = data.meta()["topics"][0]
+    heat = data.heatmap(topic)
+    other.heatmap(topic)
+    other.reload()
+    # Reloading one instance leaves the other's cache alone
+    assert data.heatmap(topic)["frames"] is heat["frames"]
+    ref = weakref.ref(other)
+    del other
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,40 @@
+from datetime import date
+
+import pandas as pd
+
+import bluesky_data
+import bluesky_index
+import bluesky_pipeline
+
+
+def build_outputs(path: str, tmp_path) -> pd.DataFrame:
+    derived = tmp_path / "derived"
+    raw_dir = str(tmp_path / "raw")
+    bluesky_pipeline.update_months(raw_dir, str(derived))
+    bluesky_pipeline.write_outputs(raw_dir, str(derived), str(tmp_path / "extract.csv"))
+    return bluesky_data.load_top_posts(str(tmp_path / "raw" / "top_posts.parquet"))
+
+
+def test_day_lookup_sees_posts_outside_the_month_top_k(raw_month, tmp_path):
+    path = raw_month(900)
+    index = bluesky_index.index_from_top_posts(build_outputs(path, tmp_path))
+    raw = bluesky_index.prepare_posts(pd.read_csv(path).drop_duplicates(subset=["uri", "keyword"]))
+
+    served_from_day = 0
+    for (topic, day), grp in raw.groupby(["topic", "day"]):
+        posts, fallback = bluesky_index.lookup_posts(index, topic, day)
+        assert fallback is None
+        expected = grp.sort_values(["engagement", "likes"], ascending=False).head(bluesky_pipeline.DAY_K)
+        assert [p["likes"] + p["reposts"] + p["replies"] for p in posts] == expected["engagement"].tolist()
+        served_from_day += 1
+    # 900 posts over 3 topics and 27 days: far more (topic, day) pairs than a month's top 10 cover
+    assert served_from_day > 3 * bluesky_pipeline.TOP_K
+
+
+def test_day_without_posts_falls_back_to_month(raw_month, tmp_path):
+    index = bluesky_index.index_from_top_posts(build_outputs(raw_month(200), tmp_path))
+    posts, fallback = bluesky_index.lookup_posts(index, "HS2", date(2025, 3, 30))
+    assert fallback == "March 2025"
+    assert len(posts) == bluesky_pipeline.TOP_K
+    engagement = [p["likes"] + p["reposts"] + p["replies"] for p in posts]
+    assert engagement == sorted(engagement, reverse=True)
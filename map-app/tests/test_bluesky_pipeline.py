@@ -0,0 +1,63 @@
+import os
+
+import pandas as pd
+
+import bluesky_index
+import bluesky_pipeline
+
+
+def reference(path: str) -> pd.DataFrame:
+    """The whole raw file read at once, one row per (post, topic), as a plain frame."""
+    df = pd.read_csv(path).rename(columns={"keyword": "topic"}).drop_duplicates(subset=["uri", "topic"])
+    df["created_at"] = pd.to_datetime(df["created_at"], utc=True)
+    df["engagement"] = df["likes"] + df["reposts"] + df["replies"]
+    return df
+
+
+def test_aggregate_month_matches_whole_file_reference(raw_month):
+    path = raw_month(600)
+    # Small chunks so heaps, repeats and sums cross chunk boundaries
+    tables = bluesky_pipeline.aggregate_month(path, top_k=5, chunk_size=64)
+    ref = reference(path)
+
+    summary = tables["summary"].set_index("topic")
+    by_topic = ref.groupby("topic")
+    assert summary["total_posts"].to_dict() == by_topic.size().to_dict()
+    assert summary["total_likes"].to_dict() == by_topic["likes"].sum().to_dict()
+    assert summary["posts_with_media"].to_dict() == by_topic["has_media"].sum().to_dict()
+    assert summary["unique_authors"].to_dict() == by_topic["author"].nunique().to_dict()
+
+    daily = tables["daily_counts"].groupby(["date", "topic"], observed=True)["posts"].sum()
+    ref_daily = ref.groupby([ref["created_at"].dt.tz_convert(None).dt.normalize().rename("date"), "topic"]).size()
+    assert daily.to_dict() == ref_daily.to_dict()
+
+    # Top posts by engagement then likes, the same key bluesky_index uses
+    for topic, grp in tables["top_posts"].groupby("topic"):
+        expected = ref[ref["topic"] == topic].sort_values(["engagement", "likes", "uri"], ascending=False).head(5)
+        assert grp["uri"].tolist() == expected["uri"].tolist()
+
+
+def test_top_posts_agree_with_post_index(raw_month):
+    path = raw_month(400)
+    tables = bluesky_pipeline.aggregate_month(path, top_k=3)
+    index = bluesky_index.build_post_index(reference(path), k=3)
+    for topic, grp in tables["top_posts"].groupby("topic"):
+        posts = index["month"][(topic, "2025-03")]
+        assert [p["likes"] + p["reposts"] + p["replies"] for p in posts] == grp["engagement"].tolist()
+
+
+def test_update_months_skips_unchanged_and_prunes_deleted(raw_month, tmp_path):
+    derived = tmp_path / "derived"
+    march = raw_month(100, "2025-03")
+    raw_month(100, "2025-04", seed=1)
+    raw_dir = os.path.dirname(march)
+    assert bluesky_pipeline.update_months(raw_dir, str(derived)) == ["2025_03", "2025_04"]
+    assert bluesky_pipeline.update_months(raw_dir, str(derived)) == []
+
+    # Other modules' tables in the month directory are left alone
+    (derived / "2025_03" / "post_sentiment.parquet").write_bytes(b"")
+    os.remove(march)
+    assert bluesky_pipeline.update_months(raw_dir, str(derived)) == ["2025_03"]
+    assert sorted(os.listdir(derived / "2025_03")) == ["post_sentiment.parquet"]
+    assert bluesky_pipeline.read_months("summary", str(derived))["month"].unique().tolist() == ["2025-04"]
+    assert "2025_03" not in bluesky_pipeline.read_json(str(derived / "manifest.json"), {})
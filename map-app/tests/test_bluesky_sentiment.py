@@ -0,0 +1,118 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import bluesky_pipeline
+import bluesky_sentiment as bs
+
+
+def reference_score(text: str, lexicon: dict = bs.LEXICON) -> tuple[float, int]:
+    """VADER-style scoring one token at a time, as the module docstring describes it."""
+    total, hits, clause = 0.0, 0, []
+    for tok in bs.TOKEN_RE.findall(text.lower().replace("’", "'")):
+        if tok in bs.CLAUSE_BREAKS:
+            clause = []
+            continue
+        plain = tok.replace("'", "")
+        v = bs.PHRASES.get(tok, lexicon.get(plain, 0.0))
+        if v and clause:
+            v += math.copysign(bs.BOOST, v) * bs.BOOSTERS.get(clause[-1][1], 0)
+        if v and any(p in bs.NEGATIONS or t.endswith("n't") for t, p in clause[-bs.NEGATION_WINDOW:]):
+            v *= bs.NEGATION_SCALAR
+        total += v
+        hits += v != 0
+        clause.append((tok, plain))
+    return total / math.sqrt(total * total + bs.ALPHA), hits
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("good", 1.9 / math.sqrt(1.9 ** 2 + 15)),
+    ("not good", -1.406 / math.sqrt(1.406 ** 2 + 15)),
+    ("very good", 2.193 / math.sqrt(2.193 ** 2 + 15)),
+    ("isn't very good", -0.74 * 2.193 / math.sqrt((0.74 * 2.193) ** 2 + 15)),
+    # Negation reaches three words back, and not past the end of a clause
+    ("not at all a good", 1.9 / math.sqrt(1.9 ** 2 + 15)),
+    ("not, good", 1.9 / math.sqrt(1.9 ** 2 + 15)),
+    # A phrase is scored once, not as its words
+    ("a waste of money", -2.6 / math.sqrt(2.6 ** 2 + 15)),
+    ("hs2 station", 0.0),
+])
+def test_hand_checked_scores(text, expected):
+    compound, hits = bs.score_texts([text])
+    assert compound[0] == pytest.approx(expected, abs=1e-6)
+    assert hits[0] == (expected != 0)
+
+
+def test_batch_scoring_matches_reference():
+    rng = np.random.default_rng(0)
+    words = ["good", "great", "not", "never", "didn't", "very", "slightly", "delay", "disaster", "hs2",
+             "white elephant", "value for money", "waste", "of", "money", ".", ",", "!", "the", "rail", "😡"]
+    texts = [" ".join(rng.choice(words, rng.integers(0, 15))) for _ in range(500)]
+    compound, hits = bs.score_texts(texts)
+    expected = [reference_score(t) for t in texts]
+    np.testing.assert_allclose(compound, [c for c, _ in expected], atol=1e-6)
+    assert hits.tolist() == [h for _, h in expected]
+
+
+def test_pool_scores_match_serial(raw_month):
+    path = raw_month(400)
+    serial = bs.score_month(path, bs.LEXICON, chunk_size=64)
+    with ProcessPoolExecutor(2, initializer=bs._init_worker, initargs=(bs.LEXICON,)) as pool:
+        pooled = bs.score_month(path, bs.LEXICON, pool, in_flight=3, chunk_size=64)
+    for name in serial:
+        pd.testing.assert_frame_equal(serial[name], pooled[name])
+
+
+def test_weighted_daily_view_matches_posts(raw_month, tmp_path):
+    path = raw_month(400)
+    derived, view_path = str(tmp_path / "derived"), str(tmp_path / "view.parquet")
+    assert bs.update_months(os.path.dirname(path), derived) == ["2025_03"]
+    view = bs.write_view(derived, view_path)
+
+    posts = bluesky_pipeline.read_month("2025_03", "post_sentiment", derived)
+    posts = posts[posts["topic"] == "HS2"]
+    # Repeated posts in the raw dump are scored once
+    assert len(posts) == posts["uri"].nunique()
+    weight = 1 + np.log1p(posts["engagement"].astype(float))
+    day = posts["created_at"].dt.tz_convert(None).dt.normalize()
+    sentiment = posts["sentiment"].astype(float)
+    expected = pd.DataFrame({
+        "sentiment": sentiment.groupby(day).mean(),
+        "weighted_sentiment": (weight * sentiment).groupby(day).sum() / weight.groupby(day).sum(),
+    })
+
+    series = bs.sentiment_series(view, "HS2", freq="D").set_index("date")
+    np.testing.assert_allclose(series["sentiment"], expected["sentiment"].round(4), atol=1e-4)
+    np.testing.assert_allclose(series["weighted_sentiment"], expected["weighted_sentiment"].round(4), atol=1e-4)
+    assert series["posts"].tolist() == day.value_counts().sort_index().tolist()
+
+
+def test_update_months_prunes_deleted(raw_month, tmp_path):
+    derived = tmp_path / "derived"
+    march = raw_month(100, "2025-03")
+    raw_month(100, "2025-04", seed=1)
+    raw_dir = os.path.dirname(march)
+    assert bs.update_months(raw_dir, str(derived)) == ["2025_03", "2025_04"]
+    assert bs.update_months(raw_dir, str(derived)) == []
+
+    os.remove(march)
+    assert bs.update_months(raw_dir, str(derived)) == ["2025_03"]
+    assert not (derived / "2025_03").exists()
+    assert list(bs.read_json(str(derived / bs.MANIFEST_NAME), {})["months"]) == ["2025_04"]
+    view = bs.write_view(str(derived), str(tmp_path / "view.parquet"))
+    assert pd.to_datetime(view["date"]).dt.month.unique().tolist() == [4]
+
+
+def test_post_under_two_keywords_is_scored_for_both(raw_month, tmp_path):
+    raw = pd.read_csv(raw_month(50)).head(1)
+    both = pd.concat([raw.assign(keyword="HS2"), raw.assign(keyword="Sizewell C"), raw.assign(keyword="HS2")])
+    path = tmp_path / "monthly_raw_2025_03.csv"
+    both.to_csv(path, index=False)
+
+    scored = bs.score_month(str(path), bs.LEXICON)
+    assert sorted(scored["post_sentiment"]["topic"].astype(str)) == ["HS2", "Sizewell C"]
+    assert scored["daily_sentiment"].groupby("topic", observed=True)["posts"].sum().to_dict() == {"HS2": 1, "Sizewell C": 1}
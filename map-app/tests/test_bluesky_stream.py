@@ -0,0 +1,151 @@
+import itertools
+import os
+
+import pandas as pd
+
+import bluesky_pipeline
+import bluesky_stream
+
+
+def aggregator(tmp_path, raw_dir=None, derived_dir=None):
+    out = raw_dir or str(tmp_path / "replay")
+    return bluesky_stream.StreamAggregator(
+        top_k=5,
+        out_dir=out,
+        derived_dir=derived_dir or os.path.join(out, "derived"),
+        top_posts_csv=os.path.join(out, "blue_sky_top_posts.csv"),
+        flush_every=1e9,
+    )
+
+
+def post(uri: str, topic: str = "HS2", author: str = "new.bsky.social", likes: int = 1000) -> dict:
+    return {
+        "uri": uri, "author": author, "text": "cancelled hs2",
+        "created_at": pd.Timestamp("2025-03-20T12:00:00Z"),
+        "likes": likes, "reposts": 0, "replies": 0, "has_media": False, "topic": topic,
+    }
+
+
+def test_stream_matches_batch(raw_month, tmp_path):
+    path = raw_month(500)
+    agg = aggregator(tmp_path)
+    stats = bluesky_stream.run(bluesky_stream.replay([path]), agg)
+    batch = bluesky_pipeline.aggregate_month(path, top_k=5)
+    assert stats["duplicates"] == 10
+
+    for name in ["summary", "daily_counts", "top_posts", "daily_top_posts", "authors"]:
+        streamed = bluesky_pipeline.read_month("2025_03", name, agg.derived_dir)
+        expected = batch[name]
+        keys = [c for c in ["date", "topic", "author"] if c in expected.columns]
+        streamed = streamed.sort_values(keys, kind="stable").reset_index(drop=True)
+        expected = expected.sort_values(keys, kind="stable").reset_index(drop=True)
+        for col in expected.columns:
+            assert streamed[col].astype(str).tolist() == expected[col].astype(str).tolist(), (name, col)
+
+
+def test_streamed_post_adds_to_batch_month(raw_month, tmp_path):
+    path = raw_month(300)
+    raw_dir, derived = os.path.dirname(path), str(tmp_path / "derived")
+    bluesky_pipeline.update_months(raw_dir, derived)
+    before = bluesky_pipeline.read_month("2025_03", "summary", derived).set_index("topic")
+
+    agg = aggregator(tmp_path, raw_dir, derived)
+    agg.add(post("at://new/1"))
+    # Already counted by the batch build under its keyword
+    first = pd.read_csv(path).iloc[0]
+    agg.add(post(first["uri"], topic=first["keyword"]))
+    agg.flush()
+    assert agg.stats["duplicates"] == 1
+
+    after = bluesky_pipeline.read_month("2025_03", "summary", derived).set_index("topic")
+    assert after.loc["HS2", "total_posts"] == before.loc["HS2", "total_posts"] + 1
+    assert after.loc["HS2", "total_likes"] == before.loc["HS2", "total_likes"] + 1000
+    assert after.loc["HS2", "unique_authors"] == before.loc["HS2", "unique_authors"] + 1
+    others = before.index != "HS2"
+    assert after[others]["total_posts"].to_dict() == before[others]["total_posts"].to_dict()
+    assert bluesky_pipeline.read_month("2025_03", "top_posts", derived)["uri"].iloc[0] == "at://new/1"
+
+    # A restarted stream neither double-counts the post nor loses it
+    agg = aggregator(tmp_path, raw_dir, derived)
+    agg.add(post("at://new/1"))
+    agg.add(post("at://new/2", author="user0.bsky.social"))
+    agg.flush()
+    again = bluesky_pipeline.read_month("2025_03", "summary", derived).set_index("topic")
+    assert again.loc["HS2", "total_posts"] == before.loc["HS2", "total_posts"] + 2
+    assert agg.windows["2025_03"].new_authors == {}
+
+
+def test_post_under_two_keywords_counts_for_both(tmp_path):
+    agg = aggregator(tmp_path)
+    agg.add(post("at://both/1", topic="HS2"))
+    agg.add(post("at://both/1", topic="Sizewell C"))
+    agg.add(post("at://both/1", topic="HS2"))
+    agg.flush()
+    summary = bluesky_pipeline.read_month("2025_03", "summary", agg.derived_dir).set_index("topic")
+    assert summary["total_posts"].to_dict() == {"HS2": 1, "Sizewell C": 1}
+    assert agg.stats["duplicates"] == 1
+
+
+def test_replaying_a_batch_month_counts_nothing_twice(raw_month, tmp_path):
+    path = raw_month(500)
+    raw_dir, derived = os.path.dirname(path), str(tmp_path / "derived")
+    bluesky_pipeline.update_months(raw_dir, derived)
+    before = bluesky_pipeline.read_month("2025_03", "summary", derived)
+
+    agg = aggregator(tmp_path, raw_dir, derived)
+    stats = bluesky_stream.run(bluesky_stream.replay([path]), agg)
+    assert stats["posts"] == 0 and stats["duplicates"] == 560
+    pd.testing.assert_frame_equal(bluesky_pipeline.read_month("2025_03", "summary", derived), before)
+
+
+def test_rebuilding_a_month_drops_what_was_streamed(raw_month, tmp_path):
+    path = raw_month(300)
+    raw_dir, derived = os.path.dirname(path), str(tmp_path / "derived")
+    bluesky_pipeline.update_months(raw_dir, derived)
+    before = bluesky_pipeline.read_month("2025_03", "summary", derived)
+
+    agg = aggregator(tmp_path, raw_dir, derived)
+    agg.add(post("at://new/1"))
+    agg.flush()
+    assert bluesky_pipeline.read_month("2025_03", "stream_posts", derived)["uri"].tolist() == ["at://new/1"]
+
+    bluesky_pipeline.update_months(raw_dir, derived, force=True)
+    assert bluesky_pipeline.read_month("2025_03", "stream_posts", derived).empty
+    pd.testing.assert_frame_equal(bluesky_pipeline.read_month("2025_03", "summary", derived), before)
+    # No longer marked as seen, so streaming it again counts it
+    agg = aggregator(tmp_path, raw_dir, derived)
+    agg.add(post("at://new/1"))
+    agg.flush()
+    after = bluesky_pipeline.read_month("2025_03", "summary", derived).set_index("topic")
+    assert after.loc["HS2", "total_posts"] == before.set_index("topic").loc["HS2", "total_posts"] + 1
+
+
+class FakeSession:
+    """Serves searchPosts pages of two posts each, linked by cursor."""
+
+    def __init__(self, pages: int):
+        self.pages = pages
+        self.calls = []
+
+    def get(self, url, params, timeout):
+        self.calls.append(dict(params))
+        page = int(params.get("cursor", 0))
+        body = {"posts": [
+            {"uri": f"at://p/{page}/{i}", "author": {"handle": "a"}, "indexedAt": f"2025-03-0{page + 1}T00:0{i}:00Z"}
+            for i in range(2)
+        ]}
+        if page + 1 < self.pages:
+            body["cursor"] = str(page + 1)
+        return type("Response", (), {"raise_for_status": lambda self: None, "json": lambda self: body})()
+
+
+def test_poll_search_follows_cursor():
+    session = FakeSession(pages=3)
+    posts = list(itertools.islice(bluesky_stream.poll_search(["HS2"], 0, session), 6))
+    assert [p["uri"] for p in posts] == [f"at://p/{n}/{i}" for n in range(3) for i in range(2)]
+    assert [c.get("cursor") for c in session.calls] == [None, "1", "2"]
+
+    capped = FakeSession(pages=3)
+    posts = list(itertools.islice(bluesky_stream.poll_search(["HS2"], 0, capped, max_pages=2), 4))
+    assert len(capped.calls) == 2
+    assert posts[-1]["uri"] == "at://p/1/1"
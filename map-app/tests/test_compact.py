@@ -0,0 +1,48 @@
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import bluesky_data
+import compact
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_committed_bluesky_tables_use_the_declared_widths():
+    # A rebuild must not change the committed artifacts' schema
+    for rel, dtypes in [
+        (bluesky_data.SUMMARY_PATH, bluesky_data.SUMMARY_DTYPES),
+        (bluesky_data.TOP_POSTS_PATH, bluesky_data.TOP_POSTS_DTYPES),
+    ]:
+        schema = pq.read_schema(os.path.join(APP_DIR, rel))
+        for col, dtype in dtypes.items():
+            if dtype.startswith("int"):
+                assert str(schema.field(col).type) == dtype, (rel, col)
+
+
+def test_top_posts_round_trip_keeps_compact_dtypes(tmp_path):
+    row = {
+        "period": "2025-01", "period_type": "month", "topic": "HS2", "rank": 1, "uri": "at://1",
+        "author": "a", "text": "t", "likes": 3, "reposts": 2, "replies": 1, "engagement": 6,
+        "created_at": pd.Timestamp("2025-01-02", tz="UTC"),
+    }
+    path = str(tmp_path / "top_posts.parquet")
+    bluesky_data.write_top_posts(pd.DataFrame([row]), path)
+    df = bluesky_data.load_top_posts(path)
+    assert df["likes"].dtype == "int32" and df["engagement"].dtype == "int32"
+    assert df["topic"].dtype == "category"
+    assert df["uri"].dtype == compact.STRING
+
+
+def test_compact_trends_shrinks_and_keeps_values():
+    df = pd.DataFrame({
+        "topic_name": ["HS2", "Sizewell C"] * 500,
+        "region": ["E92000001"] * 1000,
+        "interest_value": [12.25, 50.5] * 500,
+    })
+    small = compact.compact_trends(df)
+    assert small["interest_value"].dtype == "float32"
+    assert (small["interest_value"].astype(float) == df["interest_value"]).all()
+    report = compact.memory_report({"before": df, "after": small}).set_index("frame")
+    assert report.loc["after", "bytes_per_row"] < report.loc["before", "bytes_per_row"]
@@ -0,0 +1,59 @@
+import sys
+
+import numpy as np
+import pytest
+
+import correlate
+
+
+def brute_lag(a, b, lag):
+    """Pearson of a[t] with b[t + lag] over the periods where both are present."""
+    if lag >= 0:
+        x, y = a[: len(a) - lag], b[lag:]
+    else:
+        x, y = a[-lag:], b[: len(b) + lag]
+    ok = np.isfinite(x) & np.isfinite(y)
+    if ok.sum() < 3 or np.std(x[ok]) == 0 or np.std(y[ok]) == 0:
+        return np.nan
+    return np.corrcoef(x[ok], y[ok])[0, 1]
+
+
+def series(rng, n, gaps):
+    a = rng.normal(size=(3, n)).cumsum(axis=1)
+    # b follows a three periods later, plus noise
+    b = np.roll(a, 3, axis=1) + rng.normal(scale=0.5, size=(3, n))
+    if gaps:
+        a[rng.random(a.shape) < 0.1] = np.nan
+        b[rng.random(b.shape) < 0.1] = np.nan
+    return a, b
+
+
+@pytest.mark.parametrize("gaps", [False, True])
+def test_lag_correlations_match_brute_force(gaps):
+    rng = np.random.default_rng(1)
+    a, b = series(rng, 60, gaps)
+    corr, n = correlate.lag_correlations(a, b, 8)
+    for row in range(3):
+        for i, lag in enumerate(range(-8, 9)):
+            expected = brute_lag(a[row], b[row], lag)
+            assert corr[row, i] == pytest.approx(expected, abs=1e-9, nan_ok=True)
+    assert (np.nanargmax(corr, axis=1) - 8 == 3).all()
+    assert n[0, 8] == (np.isfinite(a[0]) & np.isfinite(b[0])).sum()
+
+
+def test_rolling_correlation_matches_brute_force():
+    rng = np.random.default_rng(2)
+    a, b = series(rng, 40, gaps=False)
+    r = correlate.rolling_correlation(a, b, window=10, lag=3)
+    for t in range(12, 40):
+        x, y = a[0, t - 3 - 9:t - 3 + 1], b[0, t - 9:t + 1]
+        assert r[0, t] == pytest.approx(np.corrcoef(x, y)[0, 1], abs=1e-9)
+    assert np.isnan(r[0, :9]).all()
+
+
+def test_missing_source_is_a_clear_exit(monkeypatch, tmp_path):
+    monkeypatch.setattr(correlate, "HANSARD_PATH", str(tmp_path / "hansard.csv"))
+    assert set(correlate.missing_inputs(["hansard"])) == {"hansard"}
+    monkeypatch.setattr(sys, "argv", ["correlate.py", "--a", "hansard", "--b", "hansard"])
+    with pytest.raises(SystemExit, match="hansard.csv not found"):
+        correlate.main()
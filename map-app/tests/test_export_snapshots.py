@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+import backend
+import export_snapshots
+from conftest import APP_DIR
+
+DAYS = ["2025-06-01", "2025-06-08", "2025-06-15"]
+region_values = backend.DashboardData.region_values
+render_batch = export_snapshots._render_batch
+
+
+def shifted(self, topic, day, agg="mean", level=backend.DEFAULT_LEVEL, within=None):
+    """region_values with the middle week's values moved, as a data refresh would."""
+    out = region_values(self, topic, day, agg, level, within)
+    return out.assign(interest_value=out["interest_value"] + 1) if str(day) == DAYS[1] else out
+
+
+def failing_batch(jobs, out_dir, formats):
+    if any(day == DAYS[-1] for _, day, _ in jobs):
+        raise RuntimeError("render failed")
+    return render_batch(jobs, out_dir, formats)
+
+
+@pytest.fixture
+def export(tmp_path, monkeypatch):
+    # Workers fork from here, so they see the same data and the same patches
+    monkeypatch.chdir(APP_DIR)
+    monkeypatch.setattr(export_snapshots, "BATCH_SIZE", 1)
+    out_dir = str(tmp_path / "snapshots")
+
+    def run(**kw):
+        return export_snapshots.export(out_dir, topics=["HS2"], aggs=["mean"], since=DAYS[0], until=DAYS[-1],
+                                       formats=("html",), workers=1, **kw)
+
+    return run, out_dir
+
+
+def manifest(out_dir: str) -> dict:
+    with open(os.path.join(out_dir, "manifest.json")) as f:
+        return json.load(f)["snapshots"]
+
+
+def test_rerun_renders_only_changed_snapshots(export, monkeypatch):
+    run, out_dir = export
+    assert run()["rendered"] == 3
+    first = manifest(out_dir)
+    assert sorted(e["date"] for e in first.values()) == DAYS
+    assert run()["rendered"] == 0
+
+    monkeypatch.setattr(backend.DashboardData, "region_values", shifted)
+    assert run()["rendered"] == 1
+    changed = {name for name, e in manifest(out_dir).items() if e["sha1"] != first[name]["sha1"]}
+    assert changed == {export_snapshots.snapshot_name("HS2", DAYS[1], "mean")}
+
+
+def test_failed_batch_keeps_what_was_rendered(export, monkeypatch):
+    run, out_dir = export
+    monkeypatch.setattr(export_snapshots, "_render_batch", failing_batch)
+    with pytest.raises(RuntimeError, match="render failed"):
+        run()
+    assert sorted(e["date"] for e in manifest(out_dir).values()) == DAYS[:2]
+
+    monkeypatch.setattr(export_snapshots, "_render_batch", render_batch)
+    assert run()["rendered"] == 1
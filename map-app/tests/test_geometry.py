@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+
+import geometry
+
+
+def square(x0, y0, size):
+    return [[x0, y0], [x0 + size, y0], [x0 + size, y0 + size], [x0, y0 + size], [x0, y0]]
+
+
+def feature(code, gtype, coords):
+    return {"type": "Feature", "properties": {"RGN24CD": code}, "geometry": {"type": gtype, "coordinates": coords}}
+
+
+def test_centroid_of_square_with_hole():
+    # 4x4 square minus a 1x1 hole in its lower-left corner: area 15,
+    # centroid = (16 * 2 - 1 * 0.5) / 15 on both axes
+    outer = square(0, 0, 4)
+    hole = square(0, 0, 1)[::-1]
+    res = geometry.compute_centroids([feature("A", "Polygon", [outer, hole])])
+    assert res["area"][0] == 15.0
+    np.testing.assert_allclose(res["centroid"][0], [31.5 / 15, 31.5 / 15])
+
+
+def test_multipolygon_parts_weighted_by_area_and_winding_ignored():
+    big = square(0, 0, 2)  # area 4, centroid (1, 1)
+    small = square(10, 0, 1)[::-1]  # area 1, centroid (10.5, 0.5), clockwise
+    res = geometry.compute_centroids([feature("A", "MultiPolygon", [[big], [small]])])
+    assert res["area"][0] == 5.0
+    np.testing.assert_allclose(res["centroid"][0], [(4 * 1 + 10.5) / 5, (4 * 1 + 0.5) / 5])
+
+
+def test_unusable_geometry_gives_nan():
+    res = geometry.compute_centroids([feature("A", "Point", [0, 0]), feature("B", "Polygon", [[[0, 0], [1, 1]]])])
+    assert np.isnan(res["centroid"]).all()
+    assert (res["area"] == 0).all()
+
+
+def test_label_point_inside_concave_shape():
+    # U shape whose centroid falls in the notch
+    u = [[0, 0], [3, 0], [3, 3], [2, 3], [2, 1], [1, 1], [1, 3], [0, 3], [0, 0]]
+    feats = [feature("A", "Polygon", [u])]
+    res = geometry.compute_centroids(feats)
+    cx, cy = res["centroid"][0]
+    assert not geometry.points_in_rings([cx], [cy], np.array(u[:-1], dtype=float))[0]
+    label = geometry.compute_label_points(feats, res["centroid"])[0]
+    assert geometry.locate_points([label], feats)[0] == 0
+
+
+def test_locate_points_respects_holes():
+    outer = square(0, 0, 4)
+    hole = square(1, 1, 2)
+    feats = [feature("A", "Polygon", [outer, hole]), feature("B", "Polygon", [square(1.5, 1.5, 1)])]
+    got = geometry.locate_points([[0.5, 0.5], [2, 2], [1.2, 1.2], [9, 9]], feats)
+    assert got.tolist() == [0, 1, -1, -1]
+
+
+def test_region_points_cached_by_content(tmp_path):
+    path = tmp_path / "regions.geojson"
+    gj = {"type": "FeatureCollection", "features": [feature("E1", "Polygon", [square(0, 0, 2)])]}
+    path.write_text(json.dumps(gj))
+    cache = tmp_path / "cache"
+    first = geometry.load_region_points(str(path), cache_dir=str(cache))
+    assert first["E1"]["centroid"] == (1.0, 1.0)
+    assert len(list(cache.iterdir())) == 1
+    assert geometry.load_region_points(str(path), cache_dir=str(cache)) == first
+
+
+def test_simplify_keeps_corners_and_drops_collinear_points():
+    ring = np.array([[0, 0], [1, 0], [2, 0], [2, 1], [2, 2], [1, 2], [0, 2], [0, 1]], dtype=float)
+    out = geometry.simplify_ring(ring, 0.01)
+    assert sorted(map(tuple, out.tolist())) == [(0, 0), (0, 2), (2, 0), (2, 2)]
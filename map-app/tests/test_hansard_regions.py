@@ -0,0 +1,111 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import hansard_regions
+
+PEOPLE = {
+    "posts": [
+        {"id": "p1", "organization_id": "house-of-commons", "area": {"name": "Leeds Central and Headingley"}},
+        {"id": "p2", "organization_id": "house-of-commons", "area": {"name": "Nowhere North"}},
+        {"id": "p3", "organization_id": "house-of-commons", "area": {"name": "Cardiff East"}},
+    ],
+    "memberships": [
+        {"id": "m1", "post_id": "p1", "person_id": "leeds", "start_date": "2024-07-04"},
+        {"id": "m2", "post_id": "p2", "person_id": "nowhere", "start_date": "2024-07-04"},
+        {"id": "m3", "post_id": "p3", "person_id": "cardiff", "start_date": "2024-07-04"},
+    ],
+}
+LOOKUP = pd.DataFrame({
+    "code": ["E14001328", "E14009999", "W07000081"],
+    "name": ["Leeds Central and Headingley", "Nowhere North", "Cardiff East"],
+    "region": ["E12000003", None, None],
+})
+
+
+def speeches(*people, day="2025-03-04"):
+    body = "".join(
+        f'<speech id="uk.org.publicwhip/debate/{day}a.1.{i}" person_id="{p}"><p>HS2 again</p></speech>'
+        for i, p in enumerate(people)
+    )
+    return f"<publicwhip>{body}</publicwhip>"
+
+
+def test_english_seat_without_region_is_counted_not_placed_on_england(tmp_path):
+    locator = hansard_regions.SpeakerLocator(PEOPLE, LOOKUP)
+    assert locator.no_region == {"nowhere north"}
+
+    path = tmp_path / "debates2025-03-04a.xml"
+    path.write_text(speeches("leeds", "nowhere", "nowhere", "cardiff", "lord"))
+    part, stats = hansard_regions.count_file(str(path), locator)
+    assert dict(zip(part["region"], part["mentions"])) == {"E12000003": 1, "W92000004": 1}
+    assert stats == {"speeches": 5, "mentions": 5, "unplaced": 1, "no_region": 2}
+
+
+def test_lookup_without_region_column_is_rejected(tmp_path):
+    pd.DataFrame({"PCON24CD": ["E14001328"], "PCON24NM": ["Leeds Central and Headingley"]}).to_csv(
+        tmp_path / "constituency_lookup.csv", index=False
+    )
+    with pytest.raises(ValueError, match="RGNyyCD"):
+        hansard_regions.read_lookups(str(tmp_path / "constituency_lookup*.csv"))
+
+    # Scotland, Wales and Northern Ireland have no regions, so such a lookup is fine for them
+    pd.DataFrame({"PCON24CD": ["S14000021"], "PCON24NM": ["Edinburgh East"]}).to_csv(
+        tmp_path / "constituency_lookup.csv", index=False
+    )
+    assert hansard_regions.read_lookups(str(tmp_path / "constituency_lookup*.csv"))["name"].tolist() == ["Edinburgh East"]
+
+
+def test_update_parts_recounts_only_what_changed(tmp_path, monkeypatch):
+    debates, derived = tmp_path / "debates", str(tmp_path / "derived")
+    debates.mkdir()
+    people, lookup = tmp_path / "people.json", tmp_path / "constituency_lookup.csv"
+    people.write_text(json.dumps(PEOPLE))
+    LOOKUP.rename(columns={"code": "PCON24CD", "name": "PCON24NM", "region": "RGN24CD"}).to_csv(lookup, index=False)
+    (debates / "debates2025-03-04a.xml").write_text(speeches("leeds", "cardiff"))
+    (debates / "debates2025-03-06a.xml").write_text(speeches("leeds", "leeds", day="2025-03-06"))
+
+    counted = []
+    count_file = hansard_regions.count_file
+
+    def counting(path, locator):
+        counted.append(os.path.basename(path))
+        return count_file(path, locator)
+
+    monkeypatch.setattr(hansard_regions, "count_file", counting)
+
+    def update():
+        """(files the update reports, files it actually read)"""
+        counted.clear()
+        changed = hansard_regions.update_parts(str(debates), derived, str(people), str(tmp_path / "constituency_lookup*.csv"))
+        return changed, sorted(counted)
+
+    both = ["debates2025-03-04a.xml", "debates2025-03-06a.xml"]
+    assert update() == (both, both)
+    assert update() == ([], [])
+
+    view_path = str(tmp_path / "view.parquet")
+    view = hansard_regions.write_view(derived, view_path)
+    assert view.groupby("region", observed=True)["mentions"].sum().to_dict() == {"E12000003": 3, "W92000004": 1}
+    # Both days fall in the trends week starting Sunday 2 March
+    weekly = hansard_regions.load_view(view_path)
+    assert weekly["date"].astype(str).unique().tolist() == ["2025-03-02"]
+    assert dict(zip(weekly["region"], weekly["interest_value"])) == {"E12000003": 3.0, "W92000004": 1.0}
+
+    # Edit one file and delete the other: only the edited one is read, the deleted one's part goes
+    (debates / "debates2025-03-04a.xml").write_text(speeches("leeds", "leeds", "cardiff"))
+    (debates / "debates2025-03-06a.xml").unlink()
+    assert update() == (["debates2025-03-06a.xml", "debates2025-03-04a.xml"], ["debates2025-03-04a.xml"])
+    assert sorted(os.listdir(derived)) == ["debates2025-03-04a.parquet", "manifest.json"]
+    view = hansard_regions.write_view(derived, view_path)
+    assert view.groupby("region", observed=True)["mentions"].sum().to_dict() == {"E12000003": 2, "W92000004": 1}
+
+    # New members or a new lookup can move speakers, so every file is recounted
+    people.write_text(json.dumps({**PEOPLE, "memberships": PEOPLE["memberships"][1:]}))
+    assert update() == (["debates2025-03-04a.xml"], ["debates2025-03-04a.xml"])
+    assert hansard_regions.write_view(derived, view_path)["region"].astype(str).tolist() == ["W92000004"]
+    lookup.write_text(lookup.read_text().replace("E12000003", "E12000004"))
+    assert update() == (["debates2025-03-04a.xml"], ["debates2025-03-04a.xml"])
+    assert update() == ([], [])
@@ -0,0 +1,98 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import hierarchy
+
+DAY = date(2025, 1, 4)
+
+
+CODES = ["K02000001", "E92000001", "S92000003", "W92000004", "E12000001", "E12000002"]
+NAMES = ["United Kingdom", "England", "Scotland", "Wales", "North East", "North West"]
+LEVELS = [3, 2, 2, 2, 1, 1]
+PARENTS = [-1, 0, 0, 0, 1, 1]
+
+
+@pytest.fixture
+def tree():
+    # UK -> England (two regions), Scotland, Wales
+    return hierarchy.RegionHierarchy(CODES, NAMES, LEVELS, PARENTS)
+
+
+@pytest.fixture
+def tree_with_la():
+    # As tree, plus one local authority directly under Wales
+    return hierarchy.RegionHierarchy(CODES + ["W06000001"], NAMES + ["Anglesey"], LEVELS + [0], PARENTS + [3])
+
+
+def frame(rows):
+    return pd.DataFrame(
+        [{"topic_name": "HS2", "date": pd.Timestamp(DAY), "region": r, "interest_value": v} for r, v in rows]
+    )
+
+
+def values(cube, level, agg):
+    out = cube.values(level, "HS2", DAY, agg)
+    return dict(zip(out["region"], out["interest_value"]))
+
+
+def test_parents_aggregate_children_not_rows(tree):
+    # England only as regions; Scotland and Wales as countries
+    cube = hierarchy.RollupCube(frame([("E12000001", 10), ("E12000002", 20), ("Scotland", 5), ("W92000004", 7)]), tree)
+    assert values(cube, "country", "mean") == {"E92000001": 15, "S92000003": 5, "W92000004": 7}
+    assert values(cube, "country", "sum") == {"E92000001": 30, "S92000003": 5, "W92000004": 7}
+    assert values(cube, "uk", "mean") == {"K02000001": pytest.approx((15 + 5 + 7) / 3)}
+    assert values(cube, "uk", "sum") == {"K02000001": 42}
+    assert values(cube, "region", "mean") == {"E12000001": 10, "E12000002": 20, "S92000003": 5, "W92000004": 7}
+
+
+def test_own_rows_win_and_mixed_levels_roll_up(tree_with_la):
+    tree = tree_with_la
+    # England has its own row; Wales only has an LA row, two levels down
+    cube = hierarchy.RollupCube(
+        frame([("E92000001", 50), ("E12000001", 10), ("E12000002", 20), ("W06000001", 8), ("W06000001", 4)]), tree
+    )
+    country = values(cube, "country", "mean")
+    assert country == {"E92000001": 50, "W92000004": 6}
+    assert values(cube, "country", "sum")["W92000004"] == 12
+    assert values(cube, "uk", "mean") == {"K02000001": 28}
+
+
+def test_latest_is_last_row_or_mean_of_children(tree):
+    cube = hierarchy.RollupCube(frame([("E12000001", 10), ("E12000001", 12), ("E12000002", 20)]), tree)
+    assert values(cube, "region", "latest") == {"E12000001": 12, "E12000002": 20}
+    assert values(cube, "country", "latest") == {"E92000001": 16}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_brute_force_on_random_data(tree_with_la, seed):
+    tree = tree_with_la
+    rng = np.random.default_rng(seed)
+    rows = [(str(r), float(rng.integers(0, 100))) for r in rng.choice(tree.codes[1:], rng.integers(1, 12))]
+    cube = hierarchy.RollupCube(frame(rows), tree)
+
+    def brute(code):
+        own = [v for r, v in rows if r == code]
+        if own:
+            return np.mean(own)
+        kids = [brute(c) for c in tree.children(code)]
+        kids = [k for k in kids if k is not None]
+        return np.mean(kids) if kids else None
+
+    for level in ("lad", "region", "country", "uk"):
+        got = values(cube, level, "mean")
+        for code in tree.view_codes(level):
+            expected = brute(code)
+            if expected is None:
+                assert code not in got
+            else:
+                assert got[code] == pytest.approx(expected)
+
+
+def test_view_and_cube_caches_are_per_instance(tree):
+    other = hierarchy.RegionHierarchy(tree.codes, tree.names, tree.levels, tree.parent)
+    assert tree.view("region") is tree.view("region")
+    assert other.view("region") is not tree.view("region")
+    assert np.array_equal(other.view("region"), tree.view("region"))
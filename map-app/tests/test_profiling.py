@@ -0,0 +1,47 @@
+import json
+import sys
+
+import pytest
+
+import profiling
+
+
+class FakeStop(BaseException):
+    """Stands in for streamlit's StopException, which is not an Exception."""
+
+
+def render(prof):
+    with prof.stage("load_data_source"):
+        pass
+    raise FakeStop()
+
+
+def test_early_stop_is_logged_once_and_profiler_disabled(tmp_path):
+    log = str(tmp_path / "timings.jsonl")
+    prof = profiling.RerunProfiler("s1", enable_cprofile=True)
+    with pytest.raises(FakeStop):
+        try:
+            render(prof)
+        finally:
+            prof.finish(log)
+    assert sys.getprofile() is None
+    prof.finish(log)
+
+    lines = open(log).read().splitlines()
+    assert len(lines) == 1
+    rec = json.loads(lines[0])
+    assert rec["session_id"] == "s1" and list(rec["stages"]) == ["load_data_source"]
+    assert "function calls" in prof.cprofile_text()
+
+
+def test_summary_across_reruns(tmp_path):
+    log = str(tmp_path / "timings.jsonl")
+    for i in range(3):
+        prof = profiling.RerunProfiler(f"s{i % 2}")
+        prof.stages += [("build_map", 0.1 * (i + 1)), ("build_map", 0.1)]
+        prof.record(markers=i)
+        prof.finish(log)
+    summary = profiling.summarise_timings(profiling.read_timings_log(log))
+    row = summary.loc["build_map"]
+    assert row["reruns"] == 3 and row["sessions"] == 2
+    assert row["max_s"] == pytest.approx(0.4)
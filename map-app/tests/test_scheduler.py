@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+import scheduler
+from scheduler import Job
+
+
+def dag(calls: list, fail=(), **extra):
+    """fetch -> a -> b, a separate c, and extra jobs; each job appends its name to calls when run."""
+    def task(name):
+        def run():
+            calls.append(name)
+            if name in fail:
+                raise RuntimeError(f"{name} broke")
+        return run
+
+    jobs = [
+        Job("fetch", task("fetch"), "fetch", pool="api", network=True),
+        Job("a", task("a"), "transform", deps=("fetch",)),
+        Job("b", task("b"), "publish", deps=("a",)),
+        Job("c", task("c"), "transform"),
+        *(Job(name, task(name), **kw) for name, kw in extra.items()),
+    ]
+    return {job.name: job for job in jobs}
+
+
+def run(jobs, tmp_path, **kw):
+    kw.setdefault("pools", {"cpu": 2, "api": 1})
+    results = scheduler.run(jobs, state_path=str(tmp_path / "state.json"), log_path=str(tmp_path / "runs.jsonl"), **kw)
+    return {r["job"]: r["status"] for r in results}
+
+
+def test_topo_order_puts_dependencies_first():
+    jobs = scheduler.build_jobs()
+    order = scheduler.topo_order(jobs)
+    assert sorted(order) == sorted(jobs)
+    for name in order:
+        assert all(order.index(dep) < order.index(name) for dep in jobs[name].deps)
+
+    cyclic = {"x": Job("x", print, "transform", deps=("y",)), "y": Job("y", print, "transform", deps=("x",))}
+    with pytest.raises(ValueError, match="cycle"):
+        scheduler.topo_order(cyclic)
+    with pytest.raises(KeyError):
+        scheduler.topo_order({"x": Job("x", print, "transform", deps=("missing",))})
+
+
+def test_with_dependencies_keeps_only_ancestors():
+    jobs = dag([])
+    assert sorted(scheduler.with_dependencies(jobs, ["b"])) == ["a", "b", "fetch"]
+    assert sorted(scheduler.with_dependencies(jobs, ["c"])) == ["c"]
+
+
+def test_failure_blocks_only_dependents(tmp_path):
+    calls = []
+    status = run(dag(calls, fail={"a"}), tmp_path)
+    assert status == {"fetch": "ran", "a": "failed", "b": "blocked", "c": "ran"}
+    assert "b" not in calls
+
+
+def test_offline_skips_network_jobs_of_any_stage(tmp_path):
+    calls = []
+    jobs = dag(calls, report={"stage": "publish", "pool": "api", "network": True})
+    status = run(jobs, tmp_path, offline=True)
+    assert status == {"fetch": "unavailable", "a": "ran", "b": "ran", "c": "ran", "report": "unavailable"}
+    assert sorted(calls) == ["a", "b", "c"]
+
+
+def test_unchanged_inputs_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "in.csv").write_text("1\n")
+    calls = []
+
+    def build():
+        calls.append("build")
+        (tmp_path / "out.csv").write_text("done\n")
+
+    jobs = {"build": Job("build", build, "transform", inputs=("in.csv",), outputs=("out.csv",))}
+    assert run(jobs, tmp_path) == {"build": "ran"}
+    assert run(jobs, tmp_path) == {"build": "skipped"}
+    (tmp_path / "in.csv").write_text("2\n")
+    assert run(jobs, tmp_path) == {"build": "ran"}
+    (tmp_path / "out.csv").unlink()
+    assert run(jobs, tmp_path) == {"build": "ran"}
+    assert calls == ["build"] * 3
+
+
+def test_pool_limits_concurrency(tmp_path):
+    lock = threading.Lock()
+    active = {"api": 0, "cpu": 0}
+    peak = {"api": 0, "cpu": 0}
+
+    def task(pool):
+        def run():
+            with lock:
+                active[pool] += 1
+                peak[pool] = max(peak[pool], active[pool])
+            time.sleep(0.05)
+            with lock:
+                active[pool] -= 1
+        return run
+
+    jobs = {f"{pool}{i}": Job(f"{pool}{i}", task(pool), "fetch", pool=pool) for pool in ["api", "cpu"] for i in range(4)}
+    status = run(jobs, tmp_path, pools={"api": 1, "cpu": 2})
+    assert set(status.values()) == {"ran"}
+    assert peak == {"api": 1, "cpu": 2}
+
+
+def test_network_and_process_pool_jobs_are_marked():
+    jobs = scheduler.build_jobs()
+    assert {n for n, j in jobs.items() if j.network} == {"trends.fetch", "trends.report", "news.fetch"}
+    # Jobs whose code starts a ProcessPoolExecutor run as their own process
+    for name in ["bluesky.sentiment", "snapshots"]:
+        assert isinstance(jobs[name].run, list)
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+import similarity
+
+N_FEATURES = 1 << 12
+
+
+def dense(index, texts) -> np.ndarray:
+    """Plain tf-idf rows, L2-normalised."""
+    indptr, indices, data = index.vectorizer.transform(texts)
+    out = np.zeros((len(texts), index.n_features))
+    for i in range(len(texts)):
+        sl = slice(indptr[i], indptr[i + 1])
+        out[i, indices[sl]] = data[sl] * index._prepare()[indices[sl]]
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.where(norms > 0, norms, 1.0)
+
+
+def brute_force(index, docs: pd.DataFrame, queries: list, k: int, corpus=None, exclude=None) -> list:
+    """Per query, the k best cosine scores over every (allowed) document."""
+    scores = dense(index, queries) @ dense(index, docs["text"].tolist()).T
+    if corpus is not None:
+        scores[:, (docs["corpus"] != corpus).to_numpy()] = -np.inf
+    if exclude is not None:
+        scores[np.arange(len(queries)), exclude] = -np.inf
+    best = -np.sort(-scores, axis=1)[:, :k]
+    return [row[np.isfinite(row) & (row > 0)].round(4).tolist() for row in best]
+
+
+def results(res: pd.DataFrame, n: int) -> list:
+    return [res.loc[res["query"] == i, "score"].tolist() for i in range(n)]
+
+
+def corpus(n: int, seed: int = 0) -> pd.DataFrame:
+    """Texts over a Zipf-ish vocabulary, so a few terms are in most documents."""
+    rng = np.random.default_rng(seed)
+    vocab = np.array(["hs2", "rail", "cost", "delay", "cancelled", "station", "euston", "birmingham",
+                      "sizewell", "nuclear", "hospital", "nhs", "budget", "minister", "tunnel", "route"])
+    p = 1.0 / np.arange(1, len(vocab) + 1) ** 1.2
+    texts = [" ".join(rng.choice(vocab, rng.integers(1, 9), p=p / p.sum())) for _ in range(n)]
+    return pd.DataFrame({
+        "key": [f"d{i}" for i in range(n)],
+        "corpus": rng.choice(["news", "bluesky"], n),
+        "date": "",
+        "text": texts,
+    })
+
+
+def build(docs: pd.DataFrame, segments: int = 1) -> similarity.SimilarityIndex:
+    index = similarity.SimilarityIndex(N_FEATURES)
+    for rows in np.array_split(np.arange(len(docs)), segments):
+        index.add(docs.iloc[rows])
+    return index
+
+
+def test_common_terms_do_not_hide_the_best_match():
+    # "hs2" is in well over COMMON_DF of the documents; plain "cancelled" posts win on the other terms
+    texts = (["cancelled"] * 12 + ["cancelled hs2 hs2 hs2 hs2"] + ["hs2 update"] * 40
+             + ["sizewell budget"] * 100)
+    docs = pd.DataFrame({"key": [f"d{i}" for i in range(len(texts))], "corpus": "bluesky", "date": "", "text": texts})
+    index = build(docs)
+    res = index.query(["cancelled hs2"], k=1)
+    assert res["key"].tolist() == ["d12"]
+    assert results(res, 1) == brute_force(index, docs, ["cancelled hs2"], 1)
+
+
+def test_query_matches_brute_force_cosine():
+    docs = corpus(400)
+    index = build(docs, segments=3)
+    queries = corpus(60, seed=1)["text"].tolist()
+    for k in (1, 5):
+        assert results(index.query(queries, k), len(queries)) == brute_force(index, docs, queries, k)
+    got = results(index.query(queries, 5, corpus="news"), len(queries))
+    assert got == brute_force(index, docs, queries, 5, corpus="news")
+
+
+def test_similar_to_matches_brute_force_and_skips_itself():
+    docs = corpus(300, seed=2)
+    index = build(docs, segments=2)
+    positions = list(range(0, 300, 7))
+    res = index.similar_to(docs["key"].iloc[positions].tolist(), k=5)
+    queries = docs["text"].iloc[positions].tolist()
+    assert results(res, len(positions)) == brute_force(index, docs, queries, 5, exclude=positions)
+    for i, p in enumerate(positions):
+        assert docs["key"].iloc[p] not in res.loc[res["query"] == i, "key"].tolist()
+
+
+def test_update_index_only_adds_new_documents(tmp_path, monkeypatch):
+    docs = corpus(50)
+    source = tmp_path / "posts.csv"
+    docs.to_csv(source, index=False)
+    monkeypatch.setitem(similarity.SOURCES, "bluesky", (str(source), lambda path: iter([pd.read_csv(path)])))
+
+    index, added = similarity.update_index(str(tmp_path / "index"), corpora=("bluesky",))
+    assert added == {"bluesky": 50}
+    index, added = similarity.update_index(str(tmp_path / "index"), corpora=("bluesky",))
+    assert added == {"bluesky": 0}
+
+    pd.concat([docs, corpus(60, seed=5).iloc[50:]]).to_csv(source, index=False)
+    index, added = similarity.update_index(str(tmp_path / "index"), corpora=("bluesky",))
+    assert added == {"bluesky": 10}
+    # A small addition is its own segment rather than a rebuild of the whole index
+    assert len(index) == 60 and len(index.segments) == 2
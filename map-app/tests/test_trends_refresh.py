@@ -0,0 +1,103 @@
+import json
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import trends_combine
+import trends_refresh
+
+SUNDAYS = pd.date_range("2025-01-05", periods=20, freq="W-SUN")
+# What Google would report on one fixed scale; each request comes back at half of it
+TRUE = pd.Series(np.arange(20) % 5 * 10 + 10.0, index=SUNDAYS)
+
+
+class FakeFetch:
+    """Serves TRUE (or a given series) for the requested weeks, scaled down, and records each request."""
+
+    def __init__(self, series: pd.Series = TRUE, factor: float = 0.5):
+        self.series, self.factor = series, factor
+        self.calls = []
+
+    def __call__(self, term, geo, start, end):
+        self.calls.append((geo, start))
+        return self.series.loc[pd.Timestamp(start):pd.Timestamp(end)] * self.factor
+
+
+@pytest.fixture
+def trends_dir(tmp_path, monkeypatch):
+    """A programme file with the first 12 weeks of TRUE for England and Wales."""
+    monkeypatch.setattr(trends_refresh, "REQUEST_DELAY", 0)
+    data_dir = tmp_path / "google_data"
+    data_dir.mkdir()
+    pd.DataFrame({"date": SUNDAYS[:12].strftime("%Y-%m-%d"), "England": TRUE[:12].to_numpy(),
+                  "Wales": TRUE[:12].to_numpy()}).to_csv(data_dir / "hs2.csv", index=False)
+    (data_dir / "manifest.json").write_text(json.dumps({"hs2.csv": "HS2"}))
+    return data_dir
+
+
+def refresh(data_dir, fetch, end=SUNDAYS[-1], **kw):
+    return trends_refresh.run(
+        end=end.date(), fetch=fetch, manifest_path=str(data_dir / "manifest.json"), data_dir=str(data_dir),
+        state_path=str(data_dir / "state.json"), output_path=str(data_dir / "combined.parquet"),
+        csv_output_path=str(data_dir / "combined.csv"), **kw,
+    )
+
+
+def test_to_weeks_buckets_days_and_drops_partial_weeks():
+    days = pd.Series(1.0, index=pd.date_range("2025-01-05", "2025-01-22"))
+    days.loc["2025-01-12":"2025-01-18"] = 8.0
+    weekly = trends_refresh.to_weeks(days)
+    assert weekly.index.strftime("%Y-%m-%d").tolist() == ["2025-01-05", "2025-01-12"]
+    assert weekly.tolist() == [1.0, 8.0]
+    # Weekly input is already on Sundays and is kept whole
+    pd.testing.assert_series_equal(trends_refresh.to_weeks(TRUE), TRUE, check_freq=False)
+
+
+def test_overlap_scale():
+    assert trends_refresh.overlap_scale(np.array([2.0, 4.0]), np.array([1.0, 2.0])) == pytest.approx(2.0)
+    assert trends_refresh.overlap_scale(np.array([0.0, 0.0]), np.array([1.0, 2.0])) is None
+    assert trends_refresh.overlap_scale(np.array([1.0, 2.0]), np.array([0.0, 0.0])) is None
+
+
+def test_new_weeks_are_rescaled_and_appended_once(trends_dir):
+    trends_combine.run(str(trends_dir / "manifest.json"), str(trends_dir), str(trends_dir / "combined.parquet"),
+                       str(trends_dir / "combined.csv"))
+    fetch = FakeFetch()
+    rows = refresh(trends_dir, fetch)
+    assert sorted(rows["date"].unique()) == list(SUNDAYS[12:])
+    # Fitted back onto the stored scale over the overlap
+    assert rows.set_index(["region", "date"])["value"].tolist() == TRUE[12:].tolist() * 2
+
+    wide = pd.read_csv(trends_dir / "hs2.csv", parse_dates=["date"])
+    assert wide["date"].tolist() == list(SUNDAYS)
+    assert wide["England"].tolist() == TRUE.tolist()
+
+    # Nothing new the second time, and no week is written twice
+    assert refresh(trends_dir, FakeFetch()).empty
+    assert len(pd.read_csv(trends_dir / "hs2.csv")) == 20
+
+    # The combined outputs are what a full rebuild from the extended file gives
+    rebuilt = trends_combine.combine(trends_combine.load_manifest(str(trends_dir / "manifest.json")), str(trends_dir))
+    pd.testing.assert_frame_equal(pd.read_parquet(trends_dir / "combined.parquet"), rebuilt)
+    csv = pd.read_csv(trends_dir / "combined.csv", parse_dates=["date"])
+    assert len(csv) == 40
+    assert csv[["Program", "region"]].astype(str).values.tolist() == rebuilt[["Program", "region"]].astype(str).values.tolist()
+    assert csv["date"].tolist() == rebuilt["date"].tolist()
+
+
+def test_flat_overlap_widens_the_window(trends_dir):
+    # The last 6 stored weeks are zeros, so a 4-week overlap has nothing to fit against
+    flat = TRUE.copy()
+    flat.iloc[6:12] = 0.0
+    wide = pd.read_csv(trends_dir / "hs2.csv")
+    wide["England"] = wide["Wales"] = flat[:12].to_numpy()
+    wide.to_csv(trends_dir / "hs2.csv", index=False)
+
+    fetch = FakeFetch(flat, factor=0.25)
+    rows = refresh(trends_dir, fetch)
+    starts = sorted({start for _, start in fetch.calls})
+    assert starts == [(SUNDAYS[11] - timedelta(weeks=w)).date() for w in (8, 4)]
+    assert rows["value"].tolist() == flat[12:].tolist() * 2
+    assert len(pd.read_csv(trends_dir / "hs2.csv")) == 20
@@ -0,0 +1,109 @@
+"""
+Combine the per-programme Google Trends files into one long dataset.
+
+    python trends_combine.py            # skips if inputs are unchanged
+    python trends_combine.py --force
+
+Programme files are listed in data/google_data/manifest.json as
+{file name: programme name}. Every non-date column of a file is treated as a
+region, so files can carry any set of regions.
+"""
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from io_utils import file_hash, read_json, write_json_atomic
+
+DATA_DIR = "data/google_data"
+MANIFEST_PATH = os.path.join(DATA_DIR, "manifest.json")
+OUTPUT_PATH = "data/combined_google_trends_data.parquet"
+CSV_OUTPUT_PATH = "data/combined_google_trends_data.csv"
+
+# Columns pytrends adds that are not regions
+NON_REGION_COLS = {"date", "isPartial", "Program"}
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    manifest = read_json(path)
+    if not manifest:
+        raise FileNotFoundError(f"No programme manifest at {path}")
+    return manifest
+
+
+def inputs_digest(manifest: dict, data_dir: str = DATA_DIR) -> str:
+    """One hash over the manifest and the contents of every listed file."""
+    h = hashlib.sha1(json.dumps(manifest, sort_keys=True).encode("utf-8"))
+    for file_name in sorted(manifest):
+        h.update(file_name.encode("utf-8"))
+        h.update(file_hash(os.path.join(data_dir, file_name)).encode("utf-8"))
+    return h.hexdigest()
+
+
+def read_programme_file(path: str, program: str) -> pd.DataFrame:
+    """One programme file melted to date / Program / region / value."""
+    wide = pd.read_csv(path, parse_dates=["date"])
+    region_cols = [c for c in wide.columns if c not in NON_REGION_COLS]
+    long_df = wide.melt(id_vars=["date"], value_vars=region_cols, var_name="region", value_name="value")
+    long_df["Program"] = program
+    return long_df
+
+
+def combine(manifest: dict, data_dir: str = DATA_DIR, max_workers: int = 8) -> pd.DataFrame:
+    """Read every programme file in parallel and concatenate once."""
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        frames = list(
+            pool.map(
+                lambda item: read_programme_file(os.path.join(data_dir, item[0]), item[1]),
+                sorted(manifest.items()),
+            )
+        )
+    if not frames:
+        return pd.DataFrame(columns=["date", "Program", "region", "value"])
+
+    long_df = pd.concat(frames, ignore_index=True)[["date", "Program", "region", "value"]]
+    long_df["Program"] = long_df["Program"].astype("category")
+    long_df["region"] = long_df["region"].astype("category")
+    long_df["value"] = pd.to_numeric(long_df["value"], errors="coerce").astype("float32")
+    return long_df.sort_values(["Program", "region", "date"], ignore_index=True)
+
+
+def run(
+    manifest_path: str = MANIFEST_PATH,
+    data_dir: str = DATA_DIR,
+    output_path: str = OUTPUT_PATH,
+    csv_output_path: str | None = CSV_OUTPUT_PATH,
+    force: bool = False,
+) -> bool:
+    """Rebuild the combined dataset unless the inputs hash matches the last run. Returns True if rebuilt."""
+    manifest = load_manifest(manifest_path)
+    digest = inputs_digest(manifest, data_dir)
+    stamp_path = output_path + ".sha1.json"
+    stamp = read_json(stamp_path, {})
+    if not force and stamp.get("inputs") == digest and os.path.exists(output_path):
+        return False
+
+    long_df = combine(manifest, data_dir)
+    long_df.to_parquet(output_path, index=False)
+    if csv_output_path:
+        long_df.to_csv(csv_output_path, index=False, date_format="%Y-%m-%d")
+    write_json_atomic({"inputs": digest, "rows": len(long_df)}, stamp_path)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Combine Google Trends programme files")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the inputs are unchanged")
+    args = parser.parse_args()
+
+    if run(force=args.force):
+        print(f"Wrote {OUTPUT_PATH}")
+    else:
+        print("Inputs unchanged, nothing to do")
+
+
+if __name__ == "__main__":
+    main()
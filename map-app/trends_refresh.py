@@ -0,0 +1,276 @@
+"""
+Incremental refresh of the Google Trends programme files.
+
+    python trends_refresh.py                    # every programme in the manifest
+    python trends_refresh.py --programmes HS2 --overlap-weeks 6
+    python trends_refresh.py --dry-run
+
+For each (programme, region) the last ingested week is kept in
+data/google_data/refresh_state.json (rebuilt from the files if missing). Only
+the window from a few weeks before that date is fetched. Google Trends
+rescales every request to its own 0-100 peak, so the new window is fitted
+onto the stored values over the overlapping weeks before the new weeks are
+appended to the programme file and to the combined dataset. If the overlap
+is all zeros the window is widened (up to a year) until there is something
+to fit against.
+"""
+import argparse
+import os
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import trends_combine
+from io_utils import read_json, write_json_atomic
+
+STATE_PATH = os.path.join(trends_combine.DATA_DIR, "refresh_state.json")
+OVERLAP_WEEKS = 4
+MAX_OVERLAP_WEEKS = 52
+REQUEST_DELAY = 2.0  # seconds between Google Trends requests
+
+# Region columns in the programme files -> Google Trends geo codes
+REGION_GEOS = {
+    "England": "GB-ENG",
+    "Wales": "GB-WLS",
+    "Scotland": "GB-SCT",
+    "Northern Ireland": "GB-NIR",
+}
+
+
+# -----------------------------
+# Fetching
+# -----------------------------
+def fetch_pytrends(term: str, geo: str, start: date, end: date) -> pd.Series:
+    """Interest over time for one term and geo, complete periods only."""
+    from pytrends.request import TrendReq
+
+    pytrends = TrendReq(hl="en-GB", tz=0)
+    pytrends.build_payload([term], timeframe=f"{start:%Y-%m-%d} {end:%Y-%m-%d}", geo=geo)
+    df = pytrends.interest_over_time()
+    if df.empty:
+        return pd.Series(dtype=float)
+    if "isPartial" in df.columns:
+        df = df.loc[~df["isPartial"].astype(bool)]
+    return df[term].astype(float)
+
+
+def to_weeks(series: pd.Series) -> pd.Series:
+    """
+    Sunday-labelled weekly means, matching the stored files. Short windows
+    come back daily, so they are bucketed; incomplete weeks are dropped.
+    """
+    if series.empty:
+        return series
+    idx = pd.DatetimeIndex(series.index).normalize()
+    week_start = idx - pd.to_timedelta((idx.dayofweek + 1) % 7, unit="D")
+    grouped = pd.Series(series.to_numpy(), index=idx).groupby(week_start)
+    weekly = grouped.mean()
+    spacing = pd.Series(idx).diff().median() if len(idx) > 1 else pd.Timedelta(days=7)
+    if spacing < pd.Timedelta(days=7):
+        weekly = weekly[grouped.size() >= 7]
+    return weekly
+
+
+# -----------------------------
+# Rescaling
+# -----------------------------
+def overlap_pairs(stored: pd.Series, fetched: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    both = pd.concat([stored, fetched], axis=1, join="inner").dropna()
+    return both.iloc[:, 0].to_numpy(float), both.iloc[:, 1].to_numpy(float)
+
+
+def overlap_scale(s: np.ndarray, f: np.ndarray) -> float | None:
+    """
+    Least-squares factor k minimising |s - k * f| over the shared weeks, or
+    None when the overlap carries no signal (all zeros on either side).
+    """
+    denom = float(np.dot(f, f))
+    if denom == 0.0 or not s.any():
+        return None
+    return float(np.dot(s, f)) / denom
+
+
+# -----------------------------
+# State
+# -----------------------------
+def last_dates(wide: pd.DataFrame) -> dict:
+    """Last date with a value, per region column of a programme file."""
+    out = {}
+    for col in wide.columns:
+        if col in trends_combine.NON_REGION_COLS:
+            continue
+        valid = wide.loc[wide[col].notna(), "date"]
+        if not valid.empty:
+            out[col] = valid.max().strftime("%Y-%m-%d")
+    return out
+
+
+def load_state(manifest: dict, data_dir: str = trends_combine.DATA_DIR, path: str = STATE_PATH) -> dict:
+    """{programme: {region: "YYYY-MM-DD"}}, rebuilt from the files for programmes missing from the state."""
+    state = read_json(path, {})
+    for file_name, program in manifest.items():
+        if program not in state:
+            wide = pd.read_csv(os.path.join(data_dir, file_name), parse_dates=["date"])
+            state[program] = last_dates(wide)
+    return state
+
+
+# -----------------------------
+# Refresh
+# -----------------------------
+def refresh_programme(
+    path: str,
+    program: str,
+    last: dict,
+    end: date,
+    fetch=fetch_pytrends,
+    overlap_weeks: int = OVERLAP_WEEKS,
+    dry_run: bool = False,
+) -> pd.DataFrame:
+    """
+    Fetch, rescale and append the new weeks for one programme file.
+    Returns the appended rows in long form (date, Program, region, value).
+    """
+    wide = pd.read_csv(path, parse_dates=["date"])
+    regions = [c for c in wide.columns if c not in trends_combine.NON_REGION_COLS]
+    file_last = wide["date"].max()
+
+    stored = wide.set_index("date")
+
+    def fetch_all(weeks_back: int):
+        fetched, pairs = {}, {}
+        for i, region in enumerate(regions):
+            geo = REGION_GEOS.get(region)
+            if geo is None:
+                continue
+            start = (pd.Timestamp(last.get(region, file_last)) - timedelta(weeks=weeks_back)).date()
+            if start >= end:
+                continue
+            if i:
+                time.sleep(REQUEST_DELAY)
+            weeks = to_weeks(fetch(program, geo, start, end))
+            if not weeks.empty:
+                fetched[region] = weeks
+                pairs[region] = overlap_pairs(stored[region], weeks)
+        return fetched, pairs
+
+    # Widen the overlap only when no region has any signal in it
+    weeks_back = overlap_weeks
+    while True:
+        fetched, pairs = fetch_all(weeks_back)
+        scales = {r: overlap_scale(*p) for r, p in pairs.items()}
+        informative = [pairs[r] for r, k in scales.items() if k is not None]
+        if informative or not fetched or weeks_back >= MAX_OVERLAP_WEEKS:
+            break
+        weeks_back = min(weeks_back * 2, MAX_OVERLAP_WEEKS)
+
+    # Regions with a flat overlap (e.g. all zeros) borrow the programme-wide fit
+    pooled = overlap_scale(*map(np.concatenate, zip(*informative))) if informative else None
+    new_cols = {
+        region: (weeks * (scales[region] or pooled or 1.0)).round(2)
+        for region, weeks in fetched.items()
+    }
+
+    if not new_cols:
+        return pd.DataFrame(columns=["date", "Program", "region", "value"])
+
+    new_wide = pd.DataFrame(new_cols)
+    new_wide = new_wide.loc[new_wide.index > file_last].reindex(columns=regions)
+    new_wide.index.name = "date"
+    new_wide = new_wide.reset_index()
+    if new_wide.empty:
+        return pd.DataFrame(columns=["date", "Program", "region", "value"])
+
+    if not dry_run:
+        # Plain append: history already on disk is never rewritten
+        new_wide[["date", *regions]].to_csv(path, mode="a", header=False, index=False, date_format="%Y-%m-%d")
+
+    long_df = new_wide.melt(id_vars=["date"], value_vars=regions, var_name="region", value_name="value")
+    long_df["Program"] = program
+    return long_df.dropna(subset=["value"])[["date", "Program", "region", "value"]]
+
+
+def append_combined(new_rows: pd.DataFrame, output_path: str = trends_combine.OUTPUT_PATH,
+                    csv_output_path: str | None = trends_combine.CSV_OUTPUT_PATH) -> None:
+    """
+    Add new long rows to the combined dataset. Both files are rewritten in
+    the combine step's (Program, region, date) order, so they match a full
+    rebuild.
+    """
+    new_rows = new_rows.copy()
+    new_rows["value"] = pd.to_numeric(new_rows["value"], errors="coerce").astype("float32")
+
+    combined = pd.read_parquet(output_path)
+    out = pd.concat([combined.astype({"Program": str, "region": str}), new_rows], ignore_index=True)
+    out = out.drop_duplicates(["Program", "region", "date"], keep="first")
+    out["Program"] = out["Program"].astype("category")
+    out["region"] = out["region"].astype("category")
+    out = out.sort_values(["Program", "region", "date"], ignore_index=True)[["date", "Program", "region", "value"]]
+    out.to_parquet(output_path, index=False)
+    if csv_output_path:
+        out.to_csv(csv_output_path, index=False, date_format="%Y-%m-%d")
+
+
+def run(
+    programmes: list | None = None,
+    end: date | None = None,
+    overlap_weeks: int = OVERLAP_WEEKS,
+    fetch=fetch_pytrends,
+    manifest_path: str = trends_combine.MANIFEST_PATH,
+    data_dir: str = trends_combine.DATA_DIR,
+    state_path: str = STATE_PATH,
+    dry_run: bool = False,
+    output_path: str = trends_combine.OUTPUT_PATH,
+    csv_output_path: str | None = trends_combine.CSV_OUTPUT_PATH,
+) -> pd.DataFrame:
+    """Refresh every (or the named) programme. Returns all appended rows."""
+    manifest = trends_combine.load_manifest(manifest_path)
+    state = load_state(manifest, data_dir, state_path)
+    end = end or date.today()
+
+    appended = []
+    for file_name, program in sorted(manifest.items()):
+        if programmes and program not in programmes:
+            continue
+        path = os.path.join(data_dir, file_name)
+        rows = refresh_programme(path, program, state.get(program, {}), end, fetch, overlap_weeks, dry_run)
+        print(f"{program}: {rows['date'].nunique()} new weeks")
+        if not rows.empty:
+            appended.append(rows)
+            for region, grp in rows.groupby("region"):
+                state.setdefault(program, {})[region] = grp["date"].max().strftime("%Y-%m-%d")
+
+    new_rows = pd.concat(appended, ignore_index=True) if appended else pd.DataFrame()
+    if dry_run or new_rows.empty:
+        return new_rows
+
+    if os.path.exists(output_path):
+        append_combined(new_rows, output_path, csv_output_path)
+        # Keep the combine step's skip stamp in line with the files we just extended
+        digest = trends_combine.inputs_digest(manifest, data_dir)
+        stamp = read_json(output_path + ".sha1.json", {})
+        write_json_atomic({"inputs": digest, "rows": stamp.get("rows", 0) + len(new_rows)}, output_path + ".sha1.json")
+    else:
+        trends_combine.run(manifest_path, data_dir, output_path, csv_output_path, force=True)
+    write_json_atomic(state, state_path)
+    return new_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append new weeks of Google Trends data")
+    parser.add_argument("--programmes", default=None, help="comma list of programme names (default: all)")
+    parser.add_argument("--end", default=None, help="last date to fetch (default: today)")
+    parser.add_argument("--overlap-weeks", type=int, default=OVERLAP_WEEKS)
+    parser.add_argument("--dry-run", action="store_true", help="fetch and rescale but write nothing")
+    args = parser.parse_args()
+
+    programmes = [p for p in args.programmes.split(",") if p] if args.programmes else None
+    end = date.fromisoformat(args.end) if args.end else None
+    rows = run(programmes, end, args.overlap_weeks, dry_run=args.dry_run)
+    print(f"Appended {len(rows)} rows" + (" (dry run)" if args.dry_run else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,13 +12,15 @@ load_dotenv()
 
 apiKey = os.getenv("apiKey")
 
-queries = ["Sizewell C", "High Speed 2", "New Hospitals Programme"]
+# Overridable from the environment (map-app/scheduler.py passes both)
+queries = os.getenv("NEWS_QUERIES", "Sizewell C,High Speed 2,New Hospitals Programme").split(",")
+from_date = os.getenv("NEWS_FROM", "2025-11-25")
 
 all_dfs = []
 
 # Iterate through each query
 for query in queries:
-    url = f"https://newsapi.org/v2/everything?q={query}&language=en&from=2025-11-25&sortBy=popularity&apiKey={apiKey}"
+    url = f"https://newsapi.org/v2/everything?q={query}&language=en&from={from_date}&sortBy=popularity&apiKey={apiKey}"
 
     response = requests.get(url)
     data = response.json()
@@ -34,6 +36,8 @@ for query in queries:
 if all_dfs:
     df = pd.concat(all_dfs, ignore_index=True)
     df_unique = df.drop_duplicates(subset="url", keep="first")
+    # Dated article list for map-app/correlate.py
+    df_unique[["publishedAt", "search_query", "title", "url"]].to_csv("news_articles.csv", index=False)
 else:
     print("No articles found for any query")
     df_unique = pd.DataFrame()